@@ -0,0 +1,57 @@
+import argparse
+import sys
+
+import benchmarks.runner as runner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Hot path benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run benchmarks and store the results')
+    run.add_argument('-k', '--select', default=None, help='only run benchmarks whose name contains this')
+    run.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per repeat')
+    run.add_argument('--repeats', type=int, default=5)
+    run.add_argument('--output', default=None, help='results file, defaults to benchmarks/results/')
+    run.add_argument('--save-baseline', action='store_true', help='also store the run as the tracked baseline')
+
+    compare = commands.add_parser('compare', help='flag regressions against the baseline')
+    compare.add_argument('current', nargs='?', default=None, help='results file, defaults to the latest run')
+    compare.add_argument('--baseline', default=runner.BASELINE_PATH)
+    compare.add_argument('--threshold', type=float, default=0.1, help='relative slowdown flagged, 0.1 = 10%%')
+
+    memory = commands.add_parser('memory', help='report allocations and garbage collector time per iteration')
+    memory.add_argument('-k', '--select', default=None, help='only run benchmarks whose name contains this')
+    memory.add_argument('--number', type=int, default=20, help='iterations timed for garbage collections')
+
+    arguments = parser.parse_args()
+
+    if arguments.command == 'run':
+        report = runner.run(arguments.select, arguments.min_time, arguments.repeats)
+        print(f'Results written to {runner.save(report, arguments.output)}')
+        if arguments.save_baseline:
+            runner.save(report, runner.BASELINE_PATH)
+            print(f'Baseline written to {runner.BASELINE_PATH}')
+        return 0
+
+    if arguments.command == 'memory':
+        print(runner.format_memory(runner.run_memory(arguments.select, arguments.number)))
+        return 0
+
+    current = arguments.current or runner.latest_result()
+    if current is None:
+        parser.error('no results to compare, run the benchmarks first')
+    rows = runner.compare(runner.load(arguments.baseline), runner.load(current), arguments.threshold)
+    print(runner.format_comparison(rows))
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {arguments.threshold:.0%}')
+    # a benchmark missing from the baseline is never checked, so it fails the comparison as well
+    unchecked = [row[0] for row in rows if row[4] == 'new']
+    if unchecked:
+        print(f'{len(unchecked)} benchmark(s) without a baseline, store one with run --save-baseline')
+    return 1 if regressions or unchecked else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
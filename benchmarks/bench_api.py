@@ -0,0 +1,86 @@
+import contextlib
+
+import chainflip.utils.codec as codecs
+import chainflip.utils.constants as CONSTANTS
+
+from benchmarks.runner import benchmark
+from chainflip.exchange.api import ApiCall
+from chainflip.market_maker.order_management import OMS
+from chainflip.testing.mock_node import MockChainflipNode
+from chainflip.utils.data_types import LimitOrder
+
+
+class _SerialisingApiCall(ApiCall):
+    """
+    ApiCall stopping at the serialised request body instead of sending it
+    """
+
+    async def await_response(self, header: dict, data):
+        return {'result': data if isinstance(data, bytes) else codecs.get_codec().encode(data)}
+
+
+@benchmark('api.build_limit_order_payload')
+@contextlib.asynccontextmanager
+async def build_limit_order_payload():
+    api = _SerialisingApiCall('benchmark')
+
+    async def build():
+        await api(CONSTANTS.APICommands.SetLimitOrder, 'ETH', 'USDC', CONSTANTS.Side.BUY, 1, 2000.0, 1.5)
+    yield build
+
+
+@benchmark('api.build_range_order_payload')
+@contextlib.asynccontextmanager
+async def build_range_order_payload():
+    api = _SerialisingApiCall('benchmark')
+
+    async def build():
+        await api(CONSTANTS.APICommands.SetRangeOrderByLiquidity, 'ETH', 'USDC', 1, 1.5, 1900.0, 2100.0)
+    yield build
+
+
+@benchmark('oms.limit_order_round_trip')
+@contextlib.asynccontextmanager
+async def limit_order_round_trip():
+    """
+    create and delete a limit order through the OMS against a local mock node
+    """
+    async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+        oms = OMS('benchmark', node.lp_account, api_calls=ApiCall('benchmark', url=node.lp_url))
+        order = LimitOrder(
+            amount=0.1, price=2000.0, base_asset='ETH', quote_asset='USDC', id=1, side=CONSTANTS.Side.SELL
+        )
+
+        async def round_trip():
+            order.amount = 0.1
+            await oms.create_new_limit_order(order)
+            await oms.delete_limit_order(order)
+        yield round_trip
+
+
+@benchmark('api.render_limit_order_template')
+def render_limit_order_template():
+    template = ApiCall('benchmark').limit_order_template('ETH', 'USDC', CONSTANTS.Side.BUY)
+    template.prepare(2000.0)
+    return lambda: template.render(1, 2000.0, 1.5)
+
+
+@benchmark('oms.cancel_all', orders=[10, 100, 1000])
+@contextlib.asynccontextmanager
+async def cancel_all(orders: int):
+    """
+    time to flat: cancel every open limit order of the LP account through the OMS against a local mock node
+    """
+    async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+        oms = OMS('benchmark', node.lp_account, api_calls=ApiCall('benchmark', url=node.lp_url))
+        open_orders = [
+            LimitOrder(0.01, 2000.0 + i, base_asset='ETH', quote_asset='USDC', id=i, side=CONSTANTS.Side.SELL)
+            for i in range(orders)
+        ]
+
+        async def flatten():
+            for order in open_orders:
+                node.exchange.set_limit_order(node.lp_account, 'ETH', 'USDC', order.side, order.id, order.price, 0.01)
+                oms._order_tracker.add_limit_order(order)
+            await oms.cancel_all(trigger='benchmark')
+        yield flatten
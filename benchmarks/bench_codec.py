@@ -0,0 +1,95 @@
+import contextlib
+import random
+
+import aiohttp
+
+import chainflip.utils.codec as codecs
+import chainflip.utils.constants as CONSTANTS
+
+from benchmarks.runner import benchmark
+from chainflip.testing.mock_node import MockChainflipNode
+
+
+_recorded = dict()
+
+_SUBSCRIPTIONS = {
+    'pool_price': ('rpc', 'cf_subscribe_pool_price', ['ETH', 'USDC']),
+    'prewitness_swaps': ('rpc', 'cf_subscribe_prewitness_swaps', ['USDC', 'ETH']),
+    'order_fills': ('lp', 'lp_subscribe_order_fills', [])
+}
+
+
+async def record_stream(blocks: int = 200, orders_per_block: int = 10, seed: int = 1) -> dict:
+    """
+    record the websocket frames a market maker receives from a mock node, with swaps, price moves and fills of
+    our orders every block
+    :return: dict of subscription to list of raw frames
+    """
+    frames = {name: list() for name in _SUBSCRIPTIONS}
+    rng = random.Random(seed)
+    async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, seed=seed) as node:
+        async with aiohttp.ClientSession() as session:
+            sockets = dict()
+            for name, (api, method, params) in _SUBSCRIPTIONS.items():
+                url = node.rpc_ws_url if api == 'rpc' else node.lp_ws_url
+                sockets[name] = await session.ws_connect(url)
+                await sockets[name].send_str(codecs.JsonCodec().encode_text(
+                    {'id': 1, 'jsonrpc': '2.0', 'method': method, 'params': params}
+                ))
+                await sockets[name].receive()
+
+            price = node.price('ETH')
+            order_id = 0
+            for _ in range(blocks):
+                for _ in range(orders_per_block):
+                    order_id += 1
+                    side = rng.choice((CONSTANTS.Side.BUY, CONSTANTS.Side.SELL))
+                    node.exchange.set_limit_order(
+                        node.lp_account, 'ETH', 'USDC', side, order_id, price * rng.uniform(0.99, 1.01), 0.1
+                    )
+                price *= rng.uniform(0.98, 1.02)
+                node.set_price('ETH', price)
+                await node.inject_swap('USDC', 'ETH', rng.uniform(100, 10000))
+                await node.produce_block()
+                for name, websocket in sockets.items():
+                    frames[name].append((await websocket.receive()).data)
+
+            for websocket in sockets.values():
+                await websocket.close()
+    return frames
+
+
+@benchmark('codec.decode_stream', codec=codecs.available_codecs(), subscription=list(_SUBSCRIPTIONS))
+@contextlib.asynccontextmanager
+async def decode_stream(codec: str, subscription: str):
+    """
+    decode 200 recorded frames of a subscription the way the streams do
+    """
+    if not _recorded:
+        _recorded.update(await record_stream())
+    frames = _recorded[subscription]
+    decoder = getattr(codecs.create_codec(codec), f'decode_{subscription}')
+
+    async def decode():
+        for frame in frames:
+            decoder(frame)
+    yield decode
+
+
+@benchmark('codec.encode_request', codec=codecs.available_codecs())
+def encode_request(codec: str):
+    encode = codecs.create_codec(codec).encode
+    data = {
+        'id': 'benchmark',
+        'jsonrpc': '2.0',
+        'method': 'lp_set_limit_order',
+        'params': {
+            'base_asset': 'ETH',
+            'quote_asset': 'USDC',
+            'side': 'sell',
+            'id': 1,
+            'tick': -195000,
+            'sell_amount': hex(1500000000000000000)
+        }
+    }
+    return lambda: encode(data)
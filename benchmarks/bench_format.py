@@ -0,0 +1,35 @@
+import chainflip.utils.format as formatter
+
+from benchmarks.runner import benchmark
+
+
+@benchmark('format.asset_to_str')
+def asset_to_str():
+    return lambda: formatter.asset_to_str('Eth')
+
+
+@benchmark('format.amount_in_asset')
+def amount_in_asset():
+    return lambda: formatter.amount_in_asset('ETH', 1.2345)
+
+
+@benchmark('format.price_to_tick')
+def price_to_tick():
+    return lambda: formatter.price_to_tick(2012.34, 'ETH')
+
+
+@benchmark('format.tick_to_price')
+def tick_to_price():
+    return lambda: formatter.tick_to_price(-195000, 'ETH')
+
+
+@benchmark('format.hex_price_to_decimal')
+def hex_price_to_decimal():
+    price = hex(int(2012.34 * 10 ** 6 / 10 ** 18 * (1 << 128)))
+    return lambda: formatter.hex_price_to_decimal(price, 'ETH')
+
+
+@benchmark('format.hex_amount_to_decimal')
+def hex_amount_to_decimal():
+    amount = hex(1234500000000000000)
+    return lambda: formatter.hex_amount_to_decimal(amount, 'ETH')
@@ -0,0 +1,44 @@
+import contextlib
+import logging
+import tempfile
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.logger as log
+
+from benchmarks.runner import benchmark
+from chainflip.utils.data_types import LimitOrder
+
+
+_ORDER = LimitOrder(
+    amount=1.0, price=2000.0, base_asset='ETH', quote_asset='USDC', id='0x1', side=CONSTANTS.Side.BUY
+)
+
+
+@benchmark('logging.order_log_call', mode=['direct', 'queue', 'queue_sampled'])
+@contextlib.asynccontextmanager
+async def order_log_call(mode: str):
+    """
+    cost on the calling thread of logging an order to a file
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        name = f'benchmark_logging_{mode}'
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = logging.FileHandler(f'{directory}/{mode}.log')
+        handler.setFormatter(logging.Formatter(fmt='%(asctime)s - %(levelname)s - %(module)s - %(message)s'))
+        logger.addHandler(handler)
+        log.loggers[name] = logger
+        if mode != 'direct':
+            log.enable_queue_logging(name, sample_rate=10 if mode == 'queue_sampled' else 1)
+
+        async def log_order():
+            logger.info('Chainflip v.%s: creating limit order - %s', CONSTANTS.version, _ORDER)
+        try:
+            yield log_order
+        finally:
+            log.disable_queue_logging(name)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            del log.loggers[name]
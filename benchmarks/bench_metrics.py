@@ -0,0 +1,18 @@
+import chainflip.utils.metrics as metrics
+
+from benchmarks.runner import benchmark
+
+
+_REGISTRY = metrics.MetricsRegistry()
+
+
+@benchmark('metrics.histogram_observe')
+def histogram_observe():
+    child = metrics.Histogram('benchmark_seconds', 'Benchmark', ('command',), registry=_REGISTRY).labels('Bench')
+    return lambda: child.observe(0.0042)
+
+
+@benchmark('metrics.counter_labels_inc')
+def counter_labels_inc():
+    counter = metrics.Counter('benchmark_messages', 'Benchmark', ('subscription',), registry=_REGISTRY)
+    return lambda: counter.labels('cf_subscribe_pool_price').inc()
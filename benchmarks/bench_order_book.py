@@ -0,0 +1,60 @@
+import random
+
+import chainflip.utils.format as formatter
+
+from benchmarks.runner import benchmark
+from chainflip.market_maker.order_book import OrderBook
+
+
+def synthetic_pool_orders(orders: int, base_asset: str = 'ETH', price: float = 2000.0, seed: int = 1) -> dict:
+    """
+    build a cf_pool_orders result with the given number of limit orders split between bids and asks,
+    plus one range order per hundred limit orders
+    """
+    rng = random.Random(seed)
+    mid_tick = formatter.price_to_tick(price, base_asset)
+    bids, asks = list(), list()
+    for order_id in range(orders):
+        lp = f'cFlp{rng.randrange(50)}'
+        if order_id % 2:
+            bids.append({
+                'lp': lp, 'id': hex(order_id), 'tick': mid_tick - rng.randrange(1, 2000),
+                'sell_amount': hex(rng.randrange(1, 10 ** 5) * 10 ** 6)
+            })
+        else:
+            asks.append({
+                'lp': lp, 'id': hex(order_id), 'tick': mid_tick + rng.randrange(1, 2000),
+                'sell_amount': hex(rng.randrange(1, 10 ** 3) * 10 ** 16)
+            })
+    range_orders = [
+        {
+            'lp': f'cFlp{rng.randrange(50)}', 'id': order_id,
+            'range': {'start': mid_tick - rng.randrange(10, 5000), 'end': mid_tick + rng.randrange(10, 5000)},
+            'liquidity': rng.randrange(1, 10 ** 6) * 10 ** 12
+        }
+        for order_id in range(max(orders // 100, 1))
+    ]
+    return {'limit_orders': {'asks': asks, 'bids': bids}, 'range_orders': range_orders}
+
+
+@benchmark('order_book.process_order_book', orders=[100, 10000, 100000])
+def process_order_book(orders: int):
+    data = synthetic_pool_orders(orders)
+
+    def process():
+        OrderBook('ETH', lp_id='cFlp0')._process_order_book(data)
+    return process
+
+
+@benchmark('order_book.refresh_order_book', orders=[10000, 100000])
+def refresh_order_book(orders: int):
+    """
+    steady state refresh of one order book, entries are recycled between refreshes
+    """
+    data = synthetic_pool_orders(orders)
+    order_book = OrderBook('ETH', lp_id='cFlp0')
+
+    def refresh():
+        order_book._process_order_book(data)
+        order_book.open_lp_orders.clear()
+    return refresh
@@ -0,0 +1,38 @@
+import chainflip.utils.constants as CONSTANTS
+
+from benchmarks.runner import benchmark
+from chainflip.market_maker.order_tracker import OrderTracker
+from chainflip.backtest.exchange import asset_balances_result
+from chainflip.utils.data_types import LimitOrder
+
+
+def _limit_orders(count: int) -> list:
+    return [
+        LimitOrder(
+            amount=1.0, price=2000.0 + i, base_asset='ETH', quote_asset='USDC', id=hex(i),
+            side=CONSTANTS.Side.BUY if i % 2 else CONSTANTS.Side.SELL
+        )
+        for i in range(count)
+    ]
+
+
+@benchmark('order_tracker.add_get_remove_limit_orders', orders=[100, 10000])
+def add_get_remove(orders: int):
+    limit_orders = _limit_orders(orders)
+
+    def cycle():
+        tracker = OrderTracker()
+        for order in limit_orders:
+            tracker.add_limit_order(order)
+        for order in limit_orders:
+            tracker.get_limit_order_by_key(order.id)
+        for order in limit_orders:
+            tracker.remove_limit_order_by_key(order.id)
+    return cycle
+
+
+@benchmark('order_tracker.update_balance')
+def update_balance():
+    tracker = OrderTracker()
+    response = {'result': asset_balances_result({'ETH': 12.5, 'BTC': 0.75, 'USDC': 250000.0, 'DOT': 100.0})}
+    return lambda: tracker.update_balance(response)
@@ -0,0 +1,23 @@
+import contextlib
+import datetime
+
+from benchmarks.runner import benchmark
+from chainflip.exchange.prewitnessing import PrewitnessedSwaps
+from chainflip.utils.data_types import PrewitnessedSwap
+
+
+@benchmark('prewitness.append_return_swaps', swaps=[10, 200])
+@contextlib.asynccontextmanager
+async def append_return_swaps(swaps: int):
+    stream = PrewitnessedSwaps('ETH')
+    now = datetime.datetime.now()
+    pending = [
+        PrewitnessedSwap('ETH', 'USDC', 1.0, now + datetime.timedelta(seconds=i % 3)) for i in range(swaps)
+    ]
+
+    async def cycle():
+        stream.swaps.extend(pending)
+        await stream.return_swaps()
+        await stream.remove_expired_swaps()
+        stream.swaps.clear()
+    yield cycle
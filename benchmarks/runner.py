@@ -0,0 +1,312 @@
+import asyncio
+import datetime
+import gc
+import importlib
+import itertools
+import json
+import logging
+import os
+import pkgutil
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from typing import Optional
+
+import chainflip.utils.logger as log
+
+
+logger = log.setup_custom_logger('root')
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+_BENCHMARKS = dict()
+
+
+def benchmark(name: str, **parameters):
+    """
+    register a benchmark factory. The factory is called once per combination of parameters and returns either
+    the callable to time or an async context manager yielding the coroutine function to time.
+    e.g. @benchmark('order_book.process', orders=[100, 10000]) registers order_book.process[orders=100] ...
+    :param name: str benchmark name, dotted by area
+    :param parameters: parameter name to list of values
+    """
+    def register(factory):
+        names = list(parameters)
+        for values in itertools.product(*parameters.values()):
+            kwargs = dict(zip(names, values))
+            label = name
+            if kwargs:
+                label += '[' + ','.join(f'{key}={value}' for key, value in kwargs.items()) + ']'
+            _BENCHMARKS[label] = (factory, kwargs)
+        return factory
+    return register
+
+
+def discover() -> dict:
+    """
+    import every bench_* module in this package
+    :return: dict of benchmark name to (factory, parameters)
+    """
+    package = os.path.dirname(__file__)
+    for module in pkgutil.iter_modules([package]):
+        if module.name.startswith('bench_'):
+            importlib.import_module(f'{__package__}.{module.name}')
+    return _BENCHMARKS
+
+
+def _time(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
+
+
+async def _time_async(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await function()
+    return time.perf_counter() - start
+
+
+async def _measure(timer, function, min_time: float, repeats: int) -> dict:
+    number = 1
+    for number in itertools.chain.from_iterable((i, 2 * i, 5 * i) for i in (10 ** p for p in range(10))):
+        elapsed = await timer(function, number)
+        if elapsed >= min_time:
+            break
+    timings = [elapsed / number]
+    for _ in range(repeats - 1):
+        timings.append(await timer(function, number) / number)
+    return {
+        'iterations': number,
+        'repeats': repeats,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0
+    }
+
+
+async def _run_one(factory, parameters: dict, min_time: float, repeats: int) -> dict:
+    target = factory(**parameters)
+    if hasattr(target, '__aenter__'):
+        async with target as function:
+            return await _measure(_time_async, function, min_time, repeats)
+
+    async def timer(function, number):
+        return _time(function, number)
+    return await _measure(timer, target, min_time, repeats)
+
+
+class _GcTimer(object):
+    """
+    time spent in garbage collections, through gc.callbacks
+    """
+
+    def __init__(self):
+        self.collections = 0
+        self.seconds = 0.0
+        self._start = None
+
+    def __call__(self, phase: str, info: dict):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.collections += 1
+            self.seconds += time.perf_counter() - self._start
+            self._start = None
+
+
+async def _profile_memory(factory, parameters: dict, number: int) -> dict:
+    target = factory(**parameters)
+    if hasattr(target, '__aenter__'):
+        async with target as function:
+            return await _measure_memory(function, number, asynchronous=True)
+    return await _measure_memory(target, number, asynchronous=False)
+
+
+async def _measure_memory(function, number: int, asynchronous: bool) -> dict:
+    if asynchronous:
+        await function()
+    else:
+        function()
+    gc.collect()
+    timer = _GcTimer()
+    gc.callbacks.append(timer)
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            if asynchronous:
+                await function()
+            else:
+                function()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(timer)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        if asynchronous:
+            await function()
+        else:
+            function()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'iterations': number,
+        'seconds': elapsed / number,
+        'peak_bytes': peak - before,
+        'retained_bytes': retained - before,
+        'gc_collections': timer.collections / number,
+        'gc_seconds': timer.seconds / number
+    }
+
+
+def run_memory(selection: Optional[str] = None, number: int = 20) -> dict:
+    """
+    run the registered benchmarks for allocations and garbage collector time instead of speed
+    :param selection: optional substring a benchmark name must contain
+    :param number: integer iterations timed for garbage collections, one more is traced for allocations
+    :return: dict of benchmark name to seconds, peak_bytes and retained_bytes of one iteration, gc_collections
+    and gc_seconds per iteration
+    """
+    results = dict()
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for name, (factory, parameters) in sorted(discover().items()):
+            if selection and selection not in name:
+                continue
+            results[name] = asyncio.run(_profile_memory(factory, parameters, number))
+    finally:
+        logger.setLevel(previous_level)
+    return results
+
+
+def format_memory(results: dict) -> str:
+    lines = [f'{"benchmark":<60} {"time":>12} {"peak":>10} {"retained":>10} {"gc/iter":>8} {"gc time":>12}']
+    for name, result in results.items():
+        lines.append(
+            f'{name:<60} {_format_seconds(result["seconds"]):>12} {result["peak_bytes"] / 2 ** 20:>8.2f}MB '
+            f'{result["retained_bytes"] / 2 ** 20:>8.2f}MB {result["gc_collections"]:>8.2f} '
+            f'{_format_seconds(result["gc_seconds"]):>12}'
+        )
+    return '\n'.join(lines)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selection: Optional[str] = None, min_time: float = 0.2, repeats: int = 5) -> dict:
+    """
+    run the registered benchmarks
+    :param selection: optional substring a benchmark name must contain
+    :param min_time: float minimum seconds per repeat, the number of iterations is calibrated to reach it
+    :param repeats: integer repeats per benchmark
+    :return: dict with run metadata and per benchmark seconds per iteration
+    """
+    results = dict()
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for name, (factory, parameters) in sorted(discover().items()):
+            if selection and selection not in name:
+                continue
+            results[name] = asyncio.run(_run_one(factory, parameters, min_time, repeats))
+            print(f'{name:<60} {_format_seconds(results[name]["median"]):>12}')
+    finally:
+        logger.setLevel(previous_level)
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+
+def save(report: dict, path: Optional[str] = None) -> str:
+    """
+    :param report: dict from run
+    :param path: optional output file, defaults to results/<timestamp>-<commit>.json
+    :return: str path written
+    """
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = report['timestamp'].replace(':', '')
+        path = os.path.join(RESULTS_DIR, f'{stamp}-{report["commit"] or "unknown"}.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_result() -> Optional[str]:
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    runs = sorted(name for name in os.listdir(RESULTS_DIR) if name.endswith('.json'))
+    return os.path.join(RESULTS_DIR, runs[-1]) if runs else None
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """
+    compare the median time per iteration of two runs
+    :param baseline: dict from run
+    :param current: dict from run
+    :param threshold: float relative slowdown flagged as a regression, e.g. 0.1 for 10%
+    :return: list of (name, baseline seconds, current seconds, relative change, status) rows
+    """
+    rows = list()
+    names = sorted(set(baseline['results']) | set(current['results']))
+    for name in names:
+        before = baseline['results'].get(name, {}).get('median')
+        after = current['results'].get(name, {}).get('median')
+        if before is None or after is None:
+            rows.append((name, before, after, None, 'new' if before is None else 'missing'))
+            continue
+        change = after / before - 1
+        if change > threshold:
+            status = 'REGRESSION'
+        elif change < -threshold:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append((name, before, after, change, status))
+    return rows
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def format_comparison(rows: list) -> str:
+    lines = [f'{"benchmark":<60} {"baseline":>12} {"current":>12} {"change":>9}  status']
+    for name, before, after, change, status in rows:
+        change = f'{change:+.1%}' if change is not None else '-'
+        lines.append(
+            f'{name:<60} {_format_seconds(before):>12} {_format_seconds(after):>12} {change:>9}  {status}'
+        )
+    return '\n'.join(lines)
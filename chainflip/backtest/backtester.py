@@ -0,0 +1,337 @@
+import asyncio
+import datetime
+import logging
+import math
+
+import numpy as np
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.logger as log
+
+from chainflip.backtest.exchange import SimulatedExchange, SimulatedApiCall, SimulatedPrewitnesser, ReplayDataFeed
+from chainflip.backtest.market_data import MarketHistory
+from chainflip.backtest.matching_engine import SimulatedPool
+from chainflip.market_maker.order_management import OMS
+from chainflip.market_maker.pool_handler import ChainflipPools
+from chainflip.strategy.just_in_time import StrategyJIT
+from chainflip.strategy.stream_prices import StrategyStream
+from chainflip.utils.clock import ManualClock
+from chainflip.utils.data_types import PrewitnessedSwap
+
+
+logger = log.setup_custom_logger('root')
+
+
+def apply_parameters(strategy, parameters: dict):
+    """
+    set strategy parameters by name, e.g. target_spread sets strategy._target_spread
+    :param strategy: strategy object
+    :param parameters: dict of parameter name to value
+    :raises ValueError: if the strategy has no such parameter
+    """
+    for name, value in parameters.items():
+        attribute = f'_{name}'
+        if not hasattr(strategy, attribute):
+            raise ValueError(f'{type(strategy).__name__} has no parameter {name}')
+        setattr(strategy, attribute, value)
+
+
+class StreamBacktestAdapter(object):
+    """
+    Drives a StrategyStream the way StrategyStream.run_strategy does: every active_order_time seconds
+    cancel the previous quotes, refresh balances and quote again.
+    """
+
+    def __init__(self, backtester, strategy: StrategyStream):
+        self._backtester = backtester
+        self._strategy = strategy
+        self._blocks_per_cycle = max(1, math.ceil(strategy._order_time / backtester.block_time))
+
+    @property
+    def strategy(self) -> StrategyStream:
+        return self._strategy
+
+    async def on_block(self, row: int):
+        if row % self._blocks_per_cycle:
+            return
+        await self._strategy.cancel_orders()
+        await self._backtester.drain()
+        self._strategy._limit_order_candidates.clear()
+        self._strategy._range_order_candidates.clear()
+        await self._strategy._oms.get_asset_balances()
+        await self._strategy.send_orders()
+
+
+class JITBacktestAdapter(object):
+    """
+    Drives a StrategyJIT the way StrategyJIT.run_strategy does: quote against swaps prewitnessed for the
+    next block and cancel the quotes once the block has been executed.
+    """
+
+    def __init__(self, backtester, strategy: StrategyJIT):
+        self._backtester = backtester
+        self._strategy = strategy
+
+    @property
+    def strategy(self) -> StrategyJIT:
+        return self._strategy
+
+    async def on_block(self, row: int):
+        if self._strategy._limit_order_candidates or self._strategy._range_order_candidates:
+            await self._strategy.cancel_orders()
+            await self._backtester.drain()
+            self._strategy._limit_order_candidates.clear()
+            self._strategy._range_order_candidates.clear()
+
+        await self._strategy.get_incoming_swaps_for_asset()
+        if self._strategy._jit_swaps_buy or self._strategy._jit_swaps_sell:
+            await self._strategy._oms.get_asset_balances()
+            await self._strategy.process_buy_swaps()
+            await self._strategy.process_sell_swaps()
+
+
+class BacktestResult(object):
+    """
+    Per block report of a backtest run.
+    Columns: block, pool_price, market_price, fills, base_inventory, quote_inventory, fees, pnl and
+    adverse_selection. pnl is marked to the market price and measured against holding the initial
+    inventory. adverse_selection is the markout cost of the block's fills after markout_blocks blocks,
+    positive when the market moved against the fill.
+    """
+
+    def __init__(self, columns: dict, fills: list):
+        self._columns = columns
+        self._fills = fills
+
+    def __len__(self):
+        return len(self._columns['block'])
+
+    @property
+    def columns(self) -> dict:
+        return self._columns
+
+    @property
+    def fills(self) -> list:
+        return self._fills
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self._columns)
+
+    def summary(self) -> dict:
+        """
+        headline numbers of the run
+        :return: dict
+        """
+        if len(self) == 0:
+            return {'blocks': 0, 'fills': 0}
+        pnl = self._columns['pnl']
+        return {
+            'blocks': len(self),
+            'fills': len(self._fills),
+            'pnl': float(pnl[-1]),
+            'max_drawdown': float(np.max(np.maximum.accumulate(pnl) - pnl)),
+            'fees': float(self._columns['fees'][-1]),
+            'adverse_selection': float(np.sum(self._columns['adverse_selection'])),
+            'base_inventory': float(self._columns['base_inventory'][-1]),
+            'quote_inventory': float(self._columns['quote_inventory'][-1])
+        }
+
+
+class Backtester(object):
+    """
+    Event driven backtester replaying a MarketHistory block by block against a simulated pool.
+    Strategies run unmodified: they are given an OMS backed by SimulatedApiCall, a ChainflipPools whose
+    prices are replayed, a replayed data feed and a prewitnesser announcing the next block's swaps.
+    Each block:
+    1. the block's swaps are executed and the pool moves to the block price
+    2. fills, inventory and pnl are recorded
+    3. the strategy observes the block and places or cancels orders for the next one
+    """
+
+    def __init__(
+            self,
+            history: MarketHistory,
+            lp_account: str = 'backtest',
+            initial_balances: dict = None,
+            pool_info: dict = None,
+            background_liquidity: float = 0.0,
+            markout_blocks: int = 10,
+            block_time: int = CONSTANTS.BLOCK_TIMINGS['Chainflip'],
+            log_level: int = logging.WARNING
+    ):
+        self._history = history
+        self._lp_account = lp_account
+        self._markout_blocks = markout_blocks
+        self._block_time = block_time
+        self._log_level = log_level
+        self._pool_key = f'{history.base_asset}-{history.quote_asset}'
+        self._background_tasks = set()
+
+        self._clock = ManualClock(float(history.timestamp[0]) if len(history) else 0.0)
+        self._exchange = SimulatedExchange()
+        self._pool = SimulatedPool(history.base_asset, history.quote_asset, pool_info, background_liquidity)
+        if len(history):
+            self._pool.set_price(float(history.pool_price[0]))
+        self._exchange.add_pool(self._pool)
+        for asset, amount in (initial_balances or dict()).items():
+            self._exchange.deposit(lp_account, asset, amount)
+
+        self._oms = OMS(
+            lp_account, lp_account, api_calls=SimulatedApiCall(self._exchange, lp_account), clock=self._clock
+        )
+        self._pools = ChainflipPools(user_id=lp_account, lp_id=lp_account, clock=self._clock)
+        self._pools.add_pool(base_asset=history.base_asset, quote_asset=history.quote_asset)
+        self._pools.pools[self._pool_key].fees = pool_info
+        self._data_feed = ReplayDataFeed(ticker=f'{history.base_asset}{history.quote_asset}')
+        self._prewitnesser = SimulatedPrewitnesser()
+
+    @property
+    def oms(self) -> OMS:
+        return self._oms
+
+    @property
+    def exchange(self) -> SimulatedExchange:
+        return self._exchange
+
+    @property
+    def block_time(self) -> int:
+        return self._block_time
+
+    def stream_strategy(self, active_order_time: int = 30, **parameters) -> StreamBacktestAdapter:
+        """
+        create a StrategyStream wired to the simulated exchange
+        :param active_order_time: integer seconds quotes stay active
+        :param parameters: strategy parameters, see apply_parameters
+        :return: StreamBacktestAdapter
+        """
+        strategy = StrategyStream(
+            lp_account=self._lp_account,
+            base_asset=self._history.base_asset,
+            data_feed={self._history.base_asset: self._data_feed},
+            oms=self._oms,
+            perseverance_pools=self._pools,
+            active_order_time=active_order_time,
+            clock=self._clock
+        )
+        apply_parameters(strategy, parameters)
+        return StreamBacktestAdapter(self, strategy)
+
+    def jit_strategy(self, **parameters) -> JITBacktestAdapter:
+        """
+        create a StrategyJIT wired to the simulated exchange
+        :param parameters: strategy parameters, see apply_parameters
+        :return: JITBacktestAdapter
+        """
+        strategy = StrategyJIT(
+            base_asset=self._history.base_asset,
+            pair_asset=self._history.quote_asset,
+            data_feed={self._history.base_asset: self._data_feed},
+            oms=self._oms,
+            perseverance_pools=self._pools,
+            prewitnesser=self._prewitnesser,
+            clock=self._clock
+        )
+        apply_parameters(strategy, parameters)
+        return JITBacktestAdapter(self, strategy)
+
+    async def drain(self):
+        """
+        run every task spawned by the strategy (OMS fires orders as tasks) to completion
+        """
+        spawned = asyncio.all_tasks() - self._background_tasks
+        while spawned:
+            await asyncio.gather(*spawned, return_exceptions=True)
+            spawned = asyncio.all_tasks() - self._background_tasks
+
+    def _announce_swaps(self, row: int):
+        self._prewitnesser.clear()
+        if row >= len(self._history):
+            return
+        end_time = datetime.datetime.fromtimestamp(float(self._history.timestamp[row]))
+        base, quote = self._history.base_asset, self._history.quote_asset
+        from_base, amounts = self._history.swaps_in_block(row)
+        for sells_base, amount in zip(from_base.tolist(), amounts.tolist()):
+            self._prewitnesser.announce(PrewitnessedSwap(
+                base_asset=base if sells_base else quote,
+                quote_asset=quote if sells_base else base,
+                amount=amount,
+                end_time=end_time
+            ))
+
+    def _adverse_selection(self, fill_rows: list, fill_sides: list, fill_base: list, fill_prices: list) -> np.ndarray:
+        market_price = np.asarray(self._history.market_price, dtype=np.float64)
+        adverse_selection = np.zeros(len(market_price))
+        if not fill_rows:
+            return adverse_selection
+        rows = np.asarray(fill_rows)
+        markout_rows = np.minimum(rows + self._markout_blocks, len(market_price) - 1)
+        cost = np.asarray(fill_sides) * (np.asarray(fill_prices) - market_price[markout_rows]) * np.asarray(fill_base)
+        np.add.at(adverse_selection, rows, cost)
+        return adverse_selection
+
+    async def run(self, adapter) -> BacktestResult:
+        """
+        replay the whole history through a strategy adapter
+        :param adapter: StreamBacktestAdapter or JITBacktestAdapter
+        :return: BacktestResult
+        """
+        history = self._history
+        blocks = len(history)
+        base, quote = history.base_asset, history.quote_asset
+        pool = self._pools.pools[self._pool_key]
+
+        columns = {
+            'block': np.asarray(history.block, dtype=np.int64),
+            'pool_price': np.asarray(history.pool_price, dtype=np.float64),
+            'market_price': np.asarray(history.market_price, dtype=np.float64),
+            'fills': np.zeros(blocks, dtype=np.int64),
+            'base_inventory': np.zeros(blocks),
+            'quote_inventory': np.zeros(blocks),
+            'fees': np.zeros(blocks),
+        }
+        fills = list()
+        fill_rows, fill_sides, fill_base, fill_prices = list(), list(), list(), list()
+        fees = 0.0
+        initial_base, initial_quote = self._exchange.inventory(self._lp_account, base, quote)
+
+        previous_level = logger.level
+        logger.setLevel(self._log_level)
+        self._background_tasks = asyncio.all_tasks()
+        try:
+            for row in range(blocks):
+                pool_price = float(history.pool_price[row])
+                for sells_base, amount in zip(*history.swaps_in_block(row)):
+                    self._pool.queue_swap(bool(sells_base), float(amount))
+
+                for fill in self._exchange.execute_block(int(history.block[row]), {self._pool_key: pool_price}):
+                    if fill.lp_account != self._lp_account:
+                        continue
+                    fills.append(fill)
+                    fees += fill.fee
+                    fill_rows.append(row)
+                    fill_sides.append(1 if fill.side == CONSTANTS.Side.BUY else -1)
+                    fill_base.append(fill.base_amount)
+                    fill_prices.append(fill.price)
+                    columns['fills'][row] += 1
+
+                base_inventory, quote_inventory = self._exchange.inventory(self._lp_account, base, quote)
+                columns['base_inventory'][row] = base_inventory
+                columns['quote_inventory'][row] = quote_inventory
+                columns['fees'][row] = fees
+
+                pool.price = pool_price
+                self._clock.set(float(history.timestamp[row]))
+                self._data_feed.update(float(history.timestamp[row]), float(history.market_price[row]))
+                self._announce_swaps(row + 1)
+                await adapter.on_block(row)
+                await self.drain()
+        finally:
+            logger.setLevel(previous_level)
+
+        columns['pnl'] = (
+            (columns['base_inventory'] - initial_base) * columns['market_price']
+            + (columns['quote_inventory'] - initial_quote)
+        )
+        columns['adverse_selection'] = self._adverse_selection(fill_rows, fill_sides, fill_base, fill_prices)
+        return BacktestResult(columns, fills)
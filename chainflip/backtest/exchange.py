@@ -0,0 +1,344 @@
+import datetime
+
+from collections import defaultdict
+from typing import Optional
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.format as formatter
+
+from chainflip.backtest.matching_engine import SimulatedPool, range_order_amounts, liquidity_for_amounts
+from chainflip.utils.constants import APICommands
+from chainflip.utils.data_types import BinanceKline, PrewitnessedSwap
+
+
+def asset_balances_result(balances: dict) -> dict:
+    """
+    format balances the way lp_asset_balances returns them: hex amounts in the smallest unit grouped by chain
+    :param balances: dict of asset to float amount
+    :return: dict
+    """
+    result = defaultdict(list)
+    for asset, amount in balances.items():
+        result[CONSTANTS.ASSET_CHAINS[asset]].append({
+            'asset': asset,
+            'balance': hex(formatter.amount_in_asset(asset, max(amount, 0.0)))
+        })
+    return dict(result)
+
+
+class SimulatedExchange(object):
+    """
+    Simulated Chainflip state machine: pools and free LP balances.
+    Placing an order debits the sold asset from the free balance, cancelling or replacing it releases
+    whatever is left, limit order fills are credited back as they happen.
+    """
+
+    def __init__(self):
+        self._pools = dict()
+        self._balances = defaultdict(lambda: defaultdict(float))
+
+    @property
+    def pools(self) -> dict:
+        return self._pools
+
+    def add_pool(self, pool: SimulatedPool):
+        """
+        add a simulated pool to the exchange
+        :param pool: SimulatedPool
+        """
+        self._pools[f'{pool.base_asset}-{pool.quote_asset}'] = pool
+
+    def pool(self, base_asset: str, quote_asset: str) -> SimulatedPool:
+        """
+        return the pool for an asset pair
+        :raises ValueError: if the pool does not exist
+        """
+        key = f'{formatter.asset_to_str(base_asset)}-{formatter.asset_to_str(quote_asset)}'
+        try:
+            return self._pools[key]
+        except KeyError:
+            raise ValueError(f'Pool {key} does not exist')
+
+    def deposit(self, lp_account: str, asset: str, amount: float):
+        """
+        credit an asset to an lp account
+        """
+        self._balances[lp_account][formatter.asset_to_str(asset)] += amount
+
+    def balances(self, lp_account: str) -> dict:
+        """
+        free balances for an lp account
+        """
+        return self._balances[lp_account]
+
+    def inventory(self, lp_account: str, base_asset: str, quote_asset: str) -> tuple:
+        """
+        total holdings of an lp account in a pool: free balances plus assets locked in open orders
+        :return: tuple of (base amount, quote amount)
+        """
+        pool = self.pool(base_asset, quote_asset)
+        base = self._balances[lp_account][pool.base_asset]
+        quote = self._balances[lp_account][pool.quote_asset]
+        for (lp, _), order in pool.limit_orders.items():
+            if lp != lp_account:
+                continue
+            if order.side == CONSTANTS.Side.BUY:
+                quote += order.sell_amount
+            else:
+                base += order.sell_amount
+        for (lp, order_id) in pool.range_orders:
+            if lp != lp_account:
+                continue
+            range_base, range_quote = pool.range_order_value(lp, order_id)
+            base += range_base
+            quote += range_quote
+        return base, quote
+
+    def _check_balance(self, lp_account: str, asset: str, released: float, required: float):
+        free = self._balances[lp_account][asset]
+        if free + released < required - 1e-12:
+            raise ValueError(f'Insufficient {asset} balance: {free + released} available, {required} required')
+
+    def set_limit_order(self,
+                        lp_account: str,
+                        base_asset: str,
+                        quote_asset: str,
+                        side: CONSTANTS.Side,
+                        order_id,
+                        price: float,
+                        amount: float,
+                        tick: Optional[int] = None):
+        """
+        set a limit order, amount is given in base asset for both sides as in OMS
+        :raises ValueError: on insufficient balance
+        """
+        pool = self.pool(base_asset, quote_asset)
+        if side == CONSTANTS.Side.BUY:
+            sold_asset, sell_amount = pool.quote_asset, amount * price
+        else:
+            sold_asset, sell_amount = pool.base_asset, amount
+
+        existing = pool.limit_orders.get((lp_account, order_id))
+        released = existing.sell_amount if existing is not None and existing.side == side else 0.0
+        self._check_balance(lp_account, sold_asset, released, sell_amount)
+
+        previous_side = existing.side if existing is not None else side
+        released = pool.set_limit_order(lp_account, order_id, side, price, sell_amount, tick)
+        released_asset = pool.quote_asset if previous_side == CONSTANTS.Side.BUY else pool.base_asset
+        self._balances[lp_account][released_asset] += released
+        self._balances[lp_account][sold_asset] -= sell_amount
+
+    def set_range_order(self,
+                        lp_account: str,
+                        base_asset: str,
+                        quote_asset: str,
+                        order_id,
+                        lower_price: float,
+                        upper_price: float,
+                        liquidity: float):
+        """
+        set a range order by liquidity
+        :raises ValueError: on an invalid range or insufficient balance
+        """
+        if lower_price >= upper_price:
+            raise ValueError(f'lower_price={lower_price} should be lower than upper_price={upper_price}')
+        pool = self.pool(base_asset, quote_asset)
+        released_base, released_quote = pool.range_order_value(lp_account, order_id)
+        required_base, required_quote = 0.0, 0.0
+        if liquidity > 0:
+            required_base, required_quote = range_order_amounts(liquidity, lower_price, upper_price, pool.price)
+        self._check_balance(lp_account, pool.base_asset, released_base, required_base)
+        self._check_balance(lp_account, pool.quote_asset, released_quote, required_quote)
+
+        pool.set_range_order(lp_account, order_id, lower_price, upper_price, liquidity)
+        self._balances[lp_account][pool.base_asset] += released_base - required_base
+        self._balances[lp_account][pool.quote_asset] += released_quote - required_quote
+
+    def execute_block(self, block_number: int, prices: Optional[dict] = None) -> list:
+        """
+        execute a block on every pool and credit limit order fills
+        :param block_number: integer block being executed
+        :param prices: optional dict of pool key to the pool price at the end of the block
+        :return: list of Fill
+        """
+        prices = prices or dict()
+        fills = list()
+        for key, pool in self._pools.items():
+            pool_fills = pool.execute_block(block_number, prices.get(key))
+            for fill in pool_fills:
+                if fill.order_type != 'limit_order':
+                    continue
+                balances = self._balances[fill.lp_account]
+                if fill.side == CONSTANTS.Side.BUY and fill.base_amount > 0:
+                    balances[pool.base_asset] += fill.base_amount + fill.fee / fill.price
+                elif fill.side == CONSTANTS.Side.BUY:
+                    continue
+                else:
+                    balances[pool.quote_asset] += fill.quote_amount + fill.fee
+            fills.extend(pool_fills)
+        return fills
+
+
+class SimulatedApiCall(object):
+    """
+    Drop-in replacement for ApiCall routing OMS commands to a SimulatedExchange.
+    Responses follow the Chainflip json rpc layout so OMS error handling works unchanged.
+    """
+
+    def __init__(self, exchange: SimulatedExchange, lp_account: str, user_id: str = 'backtest'):
+        self._exchange = exchange
+        self._lp_account = lp_account
+        self._id = user_id
+        self._response: Optional[dict] = None
+        self._calls = {
+            APICommands.Empty: self._pass,
+            APICommands.AssetBalances: self._get_asset_balances,
+            APICommands.SetRangeOrderByLiquidity: self._set_range_order_by_liquidity,
+            APICommands.SetRangeOrderByAmounts: self._set_range_order_by_asset_amounts,
+            APICommands.UpdateLimitOrder: self._update_limit_order,
+            APICommands.SetLimitOrder: self._set_limit_order
+        }
+
+    @property
+    def response(self) -> Optional[dict]:
+        return self._response
+
+    def _result(self, result):
+        self._response = {'id': self._id, 'jsonrpc': '2.0', 'result': result}
+
+    def _error(self, message: str):
+        self._response = {'id': self._id, 'jsonrpc': '2.0', 'error': {'code': -32000, 'message': message}}
+
+    def _pass(self):
+        self._result(None)
+
+    def _get_asset_balances(self):
+        self._result(asset_balances_result(self._exchange.balances(self._lp_account)))
+
+    def _set_limit_order(self,
+                         base_asset: str,
+                         quote_asset: str,
+                         side: CONSTANTS.Side,
+                         order_id,
+                         price: float,
+                         amount: float,
+                         *args):
+        self._exchange.set_limit_order(self._lp_account, base_asset, quote_asset, side, order_id, price, amount)
+        self._result({'id': order_id, 'side': side.name.lower()})
+
+    def _update_limit_order(self,
+                            base_asset: str,
+                            quote_asset: str,
+                            side: CONSTANTS.Side,
+                            order_id,
+                            price: float,
+                            size_change: CONSTANTS.IncreaseOrDecreaseOrder,
+                            amount: float,
+                            *args):
+        existing = self._exchange.pool(base_asset, quote_asset).limit_orders.get((self._lp_account, order_id))
+        if existing is None:
+            raise ValueError(f'Limit order {order_id} does not exist')
+        price = price or existing.price
+        current = existing.sell_amount / existing.price if existing.side == CONSTANTS.Side.BUY else existing.sell_amount
+        if size_change == CONSTANTS.IncreaseOrDecreaseOrder.INCREASE:
+            amount = current + amount
+        else:
+            amount = max(current - amount, 0.0)
+        self._set_limit_order(base_asset, quote_asset, side, order_id, price, amount)
+
+    def _set_range_order_by_liquidity(self,
+                                      base_asset: str,
+                                      quote_asset: str,
+                                      order_id,
+                                      amount: float,
+                                      lower_price: float,
+                                      upper_price: float):
+        self._exchange.set_range_order(
+            self._lp_account, base_asset, quote_asset, order_id, lower_price, upper_price, amount
+        )
+        self._result({'id': order_id})
+
+    def _set_range_order_by_asset_amounts(self,
+                                          base_asset: str,
+                                          quote_asset: str,
+                                          order_id,
+                                          max_base_amount: float,
+                                          max_pair_amount: float,
+                                          min_base_amount: float,
+                                          min_pair_amount: float,
+                                          lower_price: float,
+                                          upper_price: float):
+        price = self._exchange.pool(base_asset, quote_asset).price
+        liquidity = liquidity_for_amounts(max_base_amount, max_pair_amount, lower_price, upper_price, price)
+        base, quote = range_order_amounts(liquidity, lower_price, upper_price, price)
+        if base < min_base_amount or quote < min_pair_amount:
+            raise ValueError('Range order amounts below the requested minimum')
+        self._set_range_order_by_liquidity(base_asset, quote_asset, order_id, liquidity, lower_price, upper_price)
+
+    async def __call__(self, api_call: APICommands = APICommands.Empty, *args):
+        try:
+            self._calls[api_call](*args)
+        except KeyError:
+            self._error(f'{api_call.name} is not supported by the simulated exchange')
+        except ValueError as e:
+            self._error(str(e))
+        return self._response
+
+
+class SimulatedPrewitnesser(object):
+    """
+    Drop-in replacement for Prewitnesser serving swaps from market history.
+    """
+
+    def __init__(self):
+        self._swaps = defaultdict(list)
+
+    async def add_prewitness_stream(self, base_asset, pair_asset):
+        return
+
+    async def get_connection_status(self):
+        return
+
+    def announce(self, swap: PrewitnessedSwap):
+        """
+        make a swap visible to the strategy
+        :param swap: PrewitnessedSwap
+        """
+        self._swaps[f'{swap.base_asset}-{swap.quote_asset}'].append(swap)
+
+    def clear(self):
+        self._swaps.clear()
+
+    async def get_swaps(self, base_asset: str, pair_asset: str) -> list:
+        swaps = self._swaps.pop(f'{base_asset}-{pair_asset}', None)
+        return swaps if swaps is not None else list()
+
+
+class ReplayDataFeed(object):
+    """
+    Drop-in replacement for BinanceDataFeed replaying the market price of a history.
+    """
+
+    def __init__(self, ticker: str = 'ETHUSDC', interval: str = '6s'):
+        self._data = BinanceKline(
+            start_time=datetime.datetime.fromtimestamp(0),
+            end_time=datetime.datetime.fromtimestamp(0),
+            ticker=ticker,
+            interval=interval
+        )
+
+    def __str__(self):
+        return f'ReplayDataFeed: {self._data.ticker}'
+
+    @property
+    def data(self) -> BinanceKline:
+        return self._data
+
+    def update(self, timestamp: float, price: float):
+        """
+        set the latest candle to a single price point
+        :param timestamp: float unix timestamp
+        :param price: float market price
+        """
+        self._data.end_time = datetime.datetime.fromtimestamp(timestamp)
+        self._data.open = self._data.close = self._data.high = self._data.low = price
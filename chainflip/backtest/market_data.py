@@ -0,0 +1,160 @@
+import json
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+import chainflip.utils.format as formatter
+
+
+class MarketHistory(object):
+    """
+    Columnar block history for a single Chainflip pool.
+    Every block row holds the pool price and an external (e.g. Binance) market price. Swaps are stored in
+    separate columns, sorted by the block row they execute in, with per block offsets so a block's swaps
+    can be sliced in O(1).
+    """
+
+    _block_columns = ('block', 'timestamp', 'pool_price', 'market_price')
+    _swap_columns = ('swap_row', 'swap_from_base', 'swap_amount')
+
+    def __init__(
+            self,
+            base_asset: str,
+            quote_asset: str,
+            block: np.ndarray,
+            timestamp: np.ndarray,
+            pool_price: np.ndarray,
+            market_price: np.ndarray,
+            swap_row: np.ndarray = None,
+            swap_from_base: np.ndarray = None,
+            swap_amount: np.ndarray = None
+    ):
+        self._base_asset = formatter.asset_to_str(base_asset)
+        self._quote_asset = formatter.asset_to_str(quote_asset)
+        self.block = block
+        self.timestamp = timestamp
+        self.pool_price = pool_price
+        self.market_price = market_price
+        self.swap_row = swap_row if swap_row is not None else np.empty(0, dtype=np.int64)
+        self.swap_from_base = swap_from_base if swap_from_base is not None else np.empty(0, dtype=np.bool_)
+        self.swap_amount = swap_amount if swap_amount is not None else np.empty(0, dtype=np.float64)
+
+        if not (len(block) == len(timestamp) == len(pool_price) == len(market_price)):
+            raise ValueError('MarketHistory: block columns must have the same length')
+        if not (len(self.swap_row) == len(self.swap_from_base) == len(self.swap_amount)):
+            raise ValueError('MarketHistory: swap columns must have the same length')
+        if len(self.swap_row) > 1 and np.any(np.diff(self.swap_row) < 0):
+            raise ValueError('MarketHistory: swaps must be sorted by block row')
+
+        self._swap_offsets = np.searchsorted(self.swap_row, np.arange(len(block) + 1))
+
+    def __len__(self):
+        return len(self.block)
+
+    def __str__(self):
+        return f'MarketHistory {self._base_asset}-{self._quote_asset}: {len(self)} blocks, {len(self.swap_row)} swaps'
+
+    @property
+    def base_asset(self) -> str:
+        return self._base_asset
+
+    @property
+    def quote_asset(self) -> str:
+        return self._quote_asset
+
+    def swaps_in_block(self, row: int) -> tuple:
+        """
+        return the swaps executed in a block row
+        :param row: integer row index of the block
+        :return: tuple of (from_base, amount) arrays
+        """
+        start, end = self._swap_offsets[row], self._swap_offsets[row + 1]
+        return self.swap_from_base[start:end], self.swap_amount[start:end]
+
+    def slice(self, start: int, stop: int):
+        """
+        return a view of the history between two block rows
+        :param start: integer first row
+        :param stop: integer row after the last one
+        :return: MarketHistory
+        """
+        swap_start, swap_stop = self._swap_offsets[start], self._swap_offsets[stop]
+        return MarketHistory(
+            self._base_asset,
+            self._quote_asset,
+            self.block[start:stop],
+            self.timestamp[start:stop],
+            self.pool_price[start:stop],
+            self.market_price[start:stop],
+            self.swap_row[swap_start:swap_stop] - start,
+            self.swap_from_base[swap_start:swap_stop],
+            self.swap_amount[swap_start:swap_stop]
+        )
+
+    def save(self, directory: str):
+        """
+        save every column as a .npy file so it can later be memory mapped
+        :param directory: str path of the output directory
+        """
+        path = pathlib.Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        for column in self._block_columns + self._swap_columns:
+            np.save(path / f'{column}.npy', np.ascontiguousarray(getattr(self, column)))
+        with open(path / 'meta.json', 'w') as f:
+            json.dump({'base_asset': self._base_asset, 'quote_asset': self._quote_asset}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True):
+        """
+        load a history saved with MarketHistory.save
+        :param directory: str path of the saved history
+        :param mmap: memory map the columns read-only instead of reading them into memory
+        :return: MarketHistory
+        """
+        path = pathlib.Path(directory)
+        with open(path / 'meta.json') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        columns = {
+            column: np.load(path / f'{column}.npy', mmap_mode=mode)
+            for column in cls._block_columns + cls._swap_columns
+        }
+        return cls(meta['base_asset'], meta['quote_asset'], **columns)
+
+    @classmethod
+    def from_csv(cls, blocks_path: str, swaps_path: str = None, base_asset: str = 'ETH', quote_asset: str = 'USDC'):
+        """
+        build a history from csv files
+        :param blocks_path: csv with columns block, timestamp, pool_price, market_price
+        :param swaps_path: optional csv with columns block, from_asset, amount (amount in from_asset units)
+        :param base_asset: str for the base asset
+        :param quote_asset: str for the quote asset
+        :return: MarketHistory
+        """
+        blocks = pd.read_csv(blocks_path).sort_values('block')
+        block = blocks['block'].to_numpy(dtype=np.int64)
+
+        swap_row = swap_from_base = swap_amount = None
+        if swaps_path is not None:
+            swaps = pd.read_csv(swaps_path)
+            rows = np.searchsorted(block, swaps['block'].to_numpy(dtype=np.int64))
+            valid = (rows < len(block)) & (block[np.minimum(rows, len(block) - 1)] == swaps['block'].to_numpy())
+            order = np.argsort(rows[valid], kind='stable')
+            swap_row = rows[valid][order]
+            swap_from_base = (
+                swaps['from_asset'].str.upper().to_numpy()[valid][order] == formatter.asset_to_str(base_asset)
+            )
+            swap_amount = swaps['amount'].to_numpy(dtype=np.float64)[valid][order]
+
+        return cls(
+            base_asset,
+            quote_asset,
+            block,
+            blocks['timestamp'].to_numpy(dtype=np.float64),
+            blocks['pool_price'].to_numpy(dtype=np.float64),
+            blocks['market_price'].to_numpy(dtype=np.float64),
+            swap_row,
+            swap_from_base,
+            swap_amount
+        )
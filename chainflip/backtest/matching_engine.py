@@ -0,0 +1,389 @@
+import bisect
+
+from math import sqrt
+from typing import Optional
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.format as formatter
+
+from chainflip.utils.data_types import Fill
+
+
+def range_order_amounts(liquidity: float, lower_price: float, upper_price: float, price: float) -> tuple:
+    """
+    calculate the base and quote amounts held by a range order at a given price (concentrated liquidity)
+    :param liquidity: float liquidity of the range order
+    :param lower_price: float price for the lower range
+    :param upper_price: float price for the upper range
+    :param price: float current pool price
+    :return: tuple of (base amount, quote amount)
+    """
+    sqrt_lower = sqrt(lower_price)
+    sqrt_upper = sqrt(upper_price)
+    sqrt_price = min(max(sqrt(price), sqrt_lower), sqrt_upper)
+    return liquidity * (1 / sqrt_price - 1 / sqrt_upper), liquidity * (sqrt_price - sqrt_lower)
+
+
+def liquidity_for_amounts(base_amount: float,
+                          quote_amount: float,
+                          lower_price: float,
+                          upper_price: float,
+                          price: float) -> float:
+    """
+    calculate the largest range order liquidity that can be minted with the given amounts
+    :param base_amount: float maximum amount of base asset
+    :param quote_amount: float maximum amount of quote asset
+    :param lower_price: float price for the lower range
+    :param upper_price: float price for the upper range
+    :param price: float current pool price
+    :return: float liquidity
+    """
+    base_per_liquidity, quote_per_liquidity = range_order_amounts(1.0, lower_price, upper_price, price)
+    candidates = list()
+    if base_per_liquidity > 0:
+        candidates.append(base_amount / base_per_liquidity)
+    if quote_per_liquidity > 0:
+        candidates.append(quote_amount / quote_per_liquidity)
+    return min(candidates) if candidates else 0.0
+
+
+class _LimitOrderState(object):
+    __slots__ = ('lp_account', 'id', 'side', 'tick', 'price', 'sell_amount')
+
+    def __init__(self, lp_account: str, order_id, side: CONSTANTS.Side, tick: int, price: float, sell_amount: float):
+        self.lp_account = lp_account
+        self.id = order_id
+        self.side = side
+        self.tick = tick
+        self.price = price
+        self.sell_amount = sell_amount
+
+
+class _RangeOrderState(object):
+    __slots__ = ('lp_account', 'id', 'lower_price', 'upper_price', 'liquidity', 'fees_base', 'fees_quote')
+
+    def __init__(self, lp_account: str, order_id, lower_price: float, upper_price: float, liquidity: float):
+        self.lp_account = lp_account
+        self.id = order_id
+        self.lower_price = lower_price
+        self.upper_price = upper_price
+        self.liquidity = liquidity
+        self.fees_base = 0.0
+        self.fees_quote = 0.0
+
+
+class SimulatedPool(object):
+    """
+    Simulated Chainflip pool matching engine.
+    Limit orders rest at ticks, range orders hold concentrated liquidity. The pool price is driven externally
+    (e.g. by historical data) and swaps are executed at block boundaries:
+    1. queued swaps consume limit orders priced at or better than the pool price, pro-rata within a tick,
+       the remainder pays range order fees in proportion to liquidity in range
+    2. the pool price moves to the next block price, limit orders crossed by the move are filled in full
+       and range orders are rebalanced along the curve
+    """
+
+    def __init__(self,
+                 base_asset: str,
+                 quote_asset: str = 'USDC',
+                 pool_info: Optional[dict] = None,
+                 background_liquidity: float = 0.0):
+        self._base_asset = formatter.asset_to_str(base_asset)
+        self._quote_asset = formatter.asset_to_str(quote_asset)
+        self._pool_info = pool_info or dict()
+        self._limit_order_fee = self._pool_info.get('limit_order_fee_hundredth_pips', 0) / CONSTANTS.HUNDREDTH_PIPS
+        self._range_order_fee = self._pool_info.get('range_order_fee_hundredth_pips', 0) / CONSTANTS.HUNDREDTH_PIPS
+        self._background_liquidity = background_liquidity
+        self._price = None
+        self._block_number = 0
+        self._bids = dict()
+        self._bid_ticks = list()
+        self._asks = dict()
+        self._ask_ticks = list()
+        self._limit_orders = dict()
+        self._range_orders = dict()
+        self._swaps = list()
+        self._range_fills = dict()
+
+    def __str__(self):
+        return f'SimulatedPool {self._base_asset}-{self._quote_asset}: price = {self._price}'
+
+    @property
+    def base_asset(self) -> str:
+        return self._base_asset
+
+    @property
+    def quote_asset(self) -> str:
+        return self._quote_asset
+
+    @property
+    def price(self) -> float:
+        return self._price
+
+    @property
+    def block_number(self) -> int:
+        return self._block_number
+
+    @property
+    def pool_info(self) -> dict:
+        return self._pool_info
+
+    @property
+    def limit_orders(self) -> dict:
+        return self._limit_orders
+
+    @property
+    def range_orders(self) -> dict:
+        return self._range_orders
+
+    def set_price(self, price: float):
+        """
+        set the pool price without executing anything, used to seed the pool
+        :param price: float pool price
+        """
+        self._price = price
+
+    def queue_swap(self, from_base: bool, amount: float):
+        """
+        queue a swap for execution at the next block boundary
+        :param from_base: True if the swap sells base asset, False if it sells quote asset
+        :param amount: float amount of the sold asset
+        """
+        self._swaps.append((from_base, amount))
+
+    def _book(self, side: CONSTANTS.Side) -> tuple:
+        if side == CONSTANTS.Side.BUY:
+            return self._bids, self._bid_ticks
+        return self._asks, self._ask_ticks
+
+    def _remove_limit_order(self, key: tuple) -> Optional[_LimitOrderState]:
+        order = self._limit_orders.pop(key, None)
+        if order is None:
+            return None
+        book, ticks = self._book(order.side)
+        level = book[order.tick]
+        del level[key]
+        if not level:
+            del book[order.tick]
+            del ticks[bisect.bisect_left(ticks, order.tick)]
+        return order
+
+    def set_limit_order(self,
+                        lp_account: str,
+                        order_id,
+                        side: CONSTANTS.Side,
+                        price: float,
+                        sell_amount: float,
+                        tick: Optional[int] = None) -> float:
+        """
+        set a limit order, replacing any order with the same id. A sell_amount of 0 removes the order.
+        :param lp_account: str lp account owning the order
+        :param order_id: order id
+        :param side: buy (sells quote asset) or sell (sells base asset)
+        :param price: float limit price, quantised to a tick
+        :param sell_amount: float amount of the sold asset
+        :param tick: optional integer tick, takes precedence over price
+        :return: float unfilled sell amount of the replaced order
+        """
+        key = (lp_account, order_id)
+        previous = self._remove_limit_order(key)
+        released = previous.sell_amount if previous is not None else 0.0
+        if sell_amount > 0:
+            if tick is None:
+                tick = formatter.price_to_tick(price, self._base_asset)
+            order = _LimitOrderState(
+                lp_account, order_id, side, tick, formatter.tick_to_price(tick, self._base_asset), sell_amount
+            )
+            self._limit_orders[key] = order
+            book, ticks = self._book(side)
+            if tick not in book:
+                book[tick] = dict()
+                bisect.insort(ticks, tick)
+            book[tick][key] = order
+        return released
+
+    def range_order_value(self, lp_account: str, order_id) -> tuple:
+        """
+        current holdings of a range order including accrued fees
+        :param lp_account: str lp account owning the order
+        :param order_id: order id
+        :return: tuple of (base amount, quote amount)
+        """
+        order = self._range_orders.get((lp_account, order_id))
+        if order is None:
+            return 0.0, 0.0
+        base, quote = range_order_amounts(order.liquidity, order.lower_price, order.upper_price, self._price)
+        return base + order.fees_base, quote + order.fees_quote
+
+    def set_range_order(self,
+                        lp_account: str,
+                        order_id,
+                        lower_price: float,
+                        upper_price: float,
+                        liquidity: float) -> tuple:
+        """
+        set a range order, replacing any order with the same id. A liquidity of 0 removes the order.
+        :param lp_account: str lp account owning the order
+        :param order_id: order id
+        :param lower_price: float price for the lower range
+        :param upper_price: float price for the upper range
+        :param liquidity: float liquidity of the order
+        :return: tuple of (base amount, quote amount) released by the replaced order
+        """
+        key = (lp_account, order_id)
+        released = self.range_order_value(lp_account, order_id)
+        self._range_orders.pop(key, None)
+        self._range_fills.pop(key, None)
+        if liquidity > 0:
+            self._range_orders[key] = _RangeOrderState(lp_account, order_id, lower_price, upper_price, liquidity)
+        return released
+
+    def _fill(self, order: _LimitOrderState, base_amount: float, fee_rate: float, fills: list):
+        quote_amount = base_amount * order.price
+        if order.side == CONSTANTS.Side.BUY:
+            order.sell_amount -= quote_amount
+        else:
+            order.sell_amount -= base_amount
+        fills.append(Fill(
+            base_asset=self._base_asset,
+            quote_asset=self._quote_asset,
+            id=order.id,
+            side=order.side,
+            base_amount=base_amount,
+            quote_amount=quote_amount,
+            fee=quote_amount * fee_rate / (1 - fee_rate),
+            order_type='limit_order',
+            block_number=self._block_number,
+            lp_account=order.lp_account
+        ))
+
+    def _execute_swap(self, from_base: bool, amount: float, fills: list) -> float:
+        """
+        consume limit orders priced at or better than the pool price
+        :return: float unfilled amount of the swap
+        """
+        fee = self._limit_order_fee
+        if from_base:
+            book, side_iter = self._bids, reversed(self._bid_ticks[:])
+        else:
+            book, side_iter = self._asks, iter(self._ask_ticks[:])
+
+        for tick in side_iter:
+            if amount <= 0:
+                break
+            level = book[tick]
+            price = next(iter(level.values())).price
+            if (from_base and price < self._price) or (not from_base and price > self._price):
+                break
+
+            net = amount * (1 - fee)
+            if from_base:
+                capacity = sum(order.sell_amount for order in level.values()) / price
+                base_filled = min(net, capacity)
+                amount -= base_filled / (1 - fee)
+            else:
+                capacity = sum(order.sell_amount for order in level.values())
+                base_filled = min(net / price, capacity)
+                amount -= base_filled * price / (1 - fee)
+            ratio = base_filled / capacity
+
+            for key, order in list(level.items()):
+                order_base = (order.sell_amount / price if from_base else order.sell_amount) * ratio
+                self._fill(order, order_base, fee, fills)
+                if order.sell_amount <= 1e-12:
+                    self._remove_limit_order(key)
+        return max(amount, 0.0)
+
+    def _accrue_range_fees(self, from_base: bool, amount: float):
+        in_range = [
+            order for order in self._range_orders.values()
+            if order.lower_price <= self._price <= order.upper_price
+        ]
+        if not in_range or amount <= 0:
+            return
+        total_liquidity = sum(order.liquidity for order in in_range) + self._background_liquidity
+        fees = amount * self._range_order_fee
+        for order in in_range:
+            share = fees * order.liquidity / total_liquidity
+            if from_base:
+                order.fees_base += share
+                self._range_fills[(order.lp_account, order.id)][2] += share * self._price
+            else:
+                order.fees_quote += share
+                self._range_fills[(order.lp_account, order.id)][2] += share
+
+    def _cross(self, new_price: float, fills: list):
+        """
+        fill every limit order the pool price has moved through
+        """
+        fee = self._limit_order_fee
+        if new_price < self._price:
+            book = self._bids
+            crossed = [tick for tick in reversed(self._bid_ticks) if next(iter(book[tick].values())).price > new_price]
+        else:
+            book = self._asks
+            crossed = [tick for tick in self._ask_ticks if next(iter(book[tick].values())).price < new_price]
+
+        for tick in crossed:
+            for key, order in list(book[tick].items()):
+                base_amount = order.sell_amount / order.price if order.side == CONSTANTS.Side.BUY else order.sell_amount
+                self._fill(order, base_amount, fee, fills)
+                self._remove_limit_order(key)
+
+    def _rebalance_range_orders(self, new_price: float):
+        for key, order in self._range_orders.items():
+            base_before, quote_before = range_order_amounts(
+                order.liquidity, order.lower_price, order.upper_price, self._price
+            )
+            base_after, quote_after = range_order_amounts(
+                order.liquidity, order.lower_price, order.upper_price, new_price
+            )
+            traded_quote = abs(quote_after - quote_before)
+            if traded_quote == 0:
+                continue
+            fee = traded_quote * self._range_order_fee
+            order.fees_quote += fee
+            fill = self._range_fills[key]
+            fill[0] += base_after - base_before
+            fill[1] += quote_after - quote_before
+            fill[2] += fee
+
+    def execute_block(self, block_number: int, new_price: Optional[float] = None) -> list:
+        """
+        execute the queued swaps and move the pool price for a block
+        :param block_number: integer block being executed
+        :param new_price: optional float pool price at the end of the block
+        :return: list of Fill
+        """
+        self._block_number = block_number
+        fills = list()
+        self._range_fills = {key: [0.0, 0.0, 0.0] for key in self._range_orders}
+
+        if self._price is None:
+            self._price = new_price
+        for from_base, amount in self._swaps:
+            remaining = self._execute_swap(from_base, amount, fills)
+            self._accrue_range_fees(from_base, remaining)
+        self._swaps.clear()
+
+        if new_price is not None and new_price != self._price:
+            self._cross(new_price, fills)
+            self._rebalance_range_orders(new_price)
+            self._price = new_price
+
+        for key, (base_delta, quote_delta, fee) in self._range_fills.items():
+            if base_delta == 0 and fee == 0:
+                continue
+            fills.append(Fill(
+                base_asset=self._base_asset,
+                quote_asset=self._quote_asset,
+                id=key[1],
+                side=CONSTANTS.Side.BUY if base_delta > 0 else CONSTANTS.Side.SELL,
+                base_amount=abs(base_delta),
+                quote_amount=abs(quote_delta),
+                fee=fee,
+                order_type='range_order',
+                block_number=block_number,
+                lp_account=key[0]
+            ))
+        return fills
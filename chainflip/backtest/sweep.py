@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import json
+import os
+import pathlib
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+import numpy as np
+
+import chainflip.utils.logger as log
+
+from chainflip.backtest.backtester import Backtester
+from chainflip.backtest.market_data import MarketHistory
+
+
+logger = log.setup_custom_logger('root')
+
+_worker_history: Optional[MarketHistory] = None
+_worker_settings: Optional[dict] = None
+
+
+def parameter_grid(space: dict) -> list:
+    """
+    expand a grid of parameter values into every combination
+    :param space: dict of parameter name to a list of values
+    :return: list of parameter dicts
+    """
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space: dict, samples: int, seed: Optional[int] = None) -> list:
+    """
+    sample parameter sets at random
+    :param space: dict of parameter name to either a list of choices or a (low, high) tuple sampled uniformly,
+                  integers are sampled for integer bounds
+    :param samples: integer number of parameter sets
+    :param seed: optional integer random seed
+    :return: list of parameter dicts
+    """
+    rng = np.random.default_rng(seed)
+    parameter_sets = list()
+    for _ in range(samples):
+        parameters = dict()
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    parameters[name] = int(rng.integers(low, high + 1))
+                else:
+                    parameters[name] = float(rng.uniform(low, high))
+            else:
+                parameters[name] = values[int(rng.integers(len(values)))]
+        parameter_sets.append(parameters)
+    return parameter_sets
+
+
+def parameter_key(parameters: dict) -> str:
+    return json.dumps(parameters, sort_keys=True)
+
+
+def _init_worker(history_dir: str, settings: dict):
+    """
+    load the market history once per worker process. Columns are memory mapped read-only so every worker
+    shares the same page cache instead of holding its own copy.
+    """
+    global _worker_history, _worker_settings
+    _worker_history = MarketHistory.load(history_dir, mmap=True)
+    _worker_settings = settings
+
+
+def _run_backtest(strategy: str, parameters: dict) -> dict:
+    backtester = Backtester(_worker_history, **_worker_settings)
+    if strategy == 'stream':
+        adapter = backtester.stream_strategy(**parameters)
+    elif strategy == 'jit':
+        adapter = backtester.jit_strategy(**parameters)
+    else:
+        raise ValueError(f'Unknown strategy: {strategy}')
+    return asyncio.run(backtester.run(adapter)).summary()
+
+
+class ResultsTable(object):
+    """
+    Columnar table of sweep results, one row per parameter set.
+    Rows are appended to a json lines file as they arrive so an interrupted sweep can be resumed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = pathlib.Path(path) if path is not None else None
+        self._columns = dict()
+        self._keys = set()
+        self._rows = 0
+        if self._path is not None and self._path.exists():
+            self._load()
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, parameters: dict) -> bool:
+        return parameter_key(parameters) in self._keys
+
+    @property
+    def columns(self) -> dict:
+        return self._columns
+
+    def _load(self):
+        valid_bytes = 0
+        with open(self._path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # partially written last line of an interrupted sweep
+                    break
+                self._add_row(row)
+                valid_bytes += len(line)
+        with open(self._path, 'r+b') as f:
+            f.truncate(valid_bytes)
+
+    def _add_row(self, row: dict):
+        self._keys.add(parameter_key(row['parameters']))
+        values = dict(row['parameters'], **row['result'])
+        for name in values:
+            if name not in self._columns:
+                self._columns[name] = [None] * self._rows
+        for name, column in self._columns.items():
+            column.append(values.get(name))
+        self._rows += 1
+
+    def append(self, parameters: dict, result: dict):
+        """
+        add a result row and persist it
+        :param parameters: dict of parameters of the run
+        :param result: dict summary of the run
+        """
+        row = {'parameters': parameters, 'result': result}
+        if self._path is not None:
+            with open(self._path, 'a') as f:
+                f.write(json.dumps(row) + '\n')
+        self._add_row(row)
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self._columns)
+
+
+class ParameterSweep(object):
+    """
+    Runs one backtest per parameter set across a process pool.
+    The history is saved once (see MarketHistory.save) and memory mapped by every worker. Results are
+    streamed into a ResultsTable as runs complete, parameter sets already in the table are skipped.
+    """
+
+    def __init__(
+            self,
+            history_dir: str,
+            strategy: str = 'stream',
+            backtest_settings: Optional[dict] = None,
+            results_path: Optional[str] = None,
+            max_workers: Optional[int] = None
+    ):
+        self._history_dir = history_dir
+        self._strategy = strategy
+        self._settings = backtest_settings or dict()
+        self._results = ResultsTable(results_path)
+        self._max_workers = max_workers or os.cpu_count()
+
+    @property
+    def results(self) -> ResultsTable:
+        return self._results
+
+    def run(self, parameter_sets: list) -> ResultsTable:
+        """
+        run every parameter set not already in the results table
+        :param parameter_sets: list of parameter dicts, see parameter_grid and random_search
+        :return: ResultsTable
+        """
+        pending = [parameters for parameters in parameter_sets if parameters not in self._results]
+        logger.info(f'Parameter sweep: {len(pending)} runs pending, {len(self._results)} already complete')
+        if not pending:
+            return self._results
+
+        with ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                initializer=_init_worker,
+                initargs=(self._history_dir, self._settings)
+        ) as executor:
+            futures = {
+                executor.submit(_run_backtest, self._strategy, parameters): parameters for parameters in pending
+            }
+            for future in as_completed(futures):
+                parameters = futures[future]
+                try:
+                    self._results.append(parameters, future.result())
+                except Exception as e:
+                    logger.error(f'Parameter sweep run failed for {parameters}: {e}')
+        return self._results
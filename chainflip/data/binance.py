@@ -1,10 +1,13 @@
-import asyncio
 from datetime import datetime
 from binance import AsyncClient, BinanceSocketManager
 
 import chainflip.utils.logger as log
 
+from typing import Optional
+
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.data_types import BinanceKline
+from chainflip.utils.readiness import Readiness
 
 
 logger = log.setup_custom_logger('root')
@@ -14,13 +17,16 @@ class BinanceDataFeed:
     """
     Data stream object for Binance. This could be easily changes to another provider
     """
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
         self._name = None
         self._interval = None
         self._client = None
         self._manager = None
         self._socket = None
         self._data = None
+        self._last_update = None
+        self._readiness = Readiness('binance candles')
+        self._clock = clock if clock is not None else get_clock()
 
     def __str__(self):
         return f'BinanceDataFeed: {self._name}'
@@ -37,6 +43,20 @@ class BinanceDataFeed:
     def data(self) -> str:
         return self._data
 
+    @property
+    def last_update(self) -> Optional[float]:
+        """
+        clock time of the last candle received, None before the first one
+        """
+        return self._last_update
+
+    @property
+    def readiness(self) -> Readiness:
+        """
+        ready once the first candle is received
+        """
+        return self._readiness
+
     def create_new(self, interval: str = '1m', asset: str = 'ETHUSDC'):
         """
         create new data feed with interval on asset
@@ -46,6 +66,7 @@ class BinanceDataFeed:
         """
         self._name = asset
         self._interval = interval
+        self._readiness = Readiness(f'{asset} binance candles')
 
     async def __call__(self):
         """
@@ -71,11 +92,13 @@ class BinanceDataFeed:
                         low=float(res['k']['l']),
                         volume=float(res['k']['v']),
                     )
-                    logger.info(f'Received Binance candle: {self._data}')
+                    self._last_update = self._clock.time()
+                    self._readiness.set()
+                    logger.info('Received Binance candle: %s', self._data)
                 except Exception as e:
                     logger.error(f'Error in getting Binance data point: {e}')
 
-                await asyncio.sleep(15)
+                await self._clock.sleep(15)
 
 
         await client.close_connection()
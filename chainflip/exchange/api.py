@@ -1,12 +1,18 @@
 import aiohttp
+import time
 
 from typing import Optional
 
+import chainflip.utils.codec as codecs
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
 import chainflip.utils.constants as CONSTANTS
 
+from chainflip.exchange.endpoints import LP, EndpointRegistry, get_registry
+from chainflip.exchange.payloads import LimitOrderTemplate
 from chainflip.utils.constants import APICommands
+from chainflip.utils.data_types import LimitOrder
 
 logger = log.setup_custom_logger('root')
 
@@ -16,8 +22,14 @@ class ApiCall:
     Chainflip Perseverance API calls.
     """
 
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, url: Optional[str] = None, endpoints: Optional[EndpointRegistry] = None):
+        """
+        :param url: optional str LP API url, requests are routed by the endpoint registry when None
+        :param endpoints: optional EndpointRegistry, the default registry when None
+        """
         self._id = user_id
+        self._url = url
+        self._endpoints = endpoints
         self._response: Optional[dict] = None
         self._calls = {
             APICommands.Empty: self._pass,
@@ -29,8 +41,10 @@ class ApiCall:
             APICommands.SetRangeOrderByLiquidity: self._set_range_order_by_liquidity,
             APICommands.SetRangeOrderByAmounts: self._set_range_order_by_asset_amounts,
             APICommands.UpdateLimitOrder: self._update_limit_order,
-            APICommands.SetLimitOrder: self._set_limit_order
+            APICommands.SetLimitOrder: self._set_limit_order,
+            APICommands.CancelOrders: self._cancel_orders
         }
+        self._limit_order_templates = dict()
         self._async_client = aiohttp.ClientSession
 
     @property
@@ -43,10 +57,36 @@ class ApiCall:
             'Content-Type': 'application/json',
         }
     
-    async def await_response(self, header: dict, data: dict):
+    def limit_order_template(self,
+                             base_asset: str,
+                             quote_asset: str,
+                             side: CONSTANTS.Side,
+                             wait_for: CONSTANTS.WaitForOption = CONSTANTS.WaitForOption.NO_WAIT
+                             ) -> LimitOrderTemplate:
+        """
+        :return: the pre-encoded lp_set_limit_order body used for orders on this pair and side
+        """
+        key = (base_asset, quote_asset, side, wait_for)
+        template = self._limit_order_templates.get(key)
+        if template is None:
+            template = self._limit_order_templates[key] = LimitOrderTemplate(
+                self._id, base_asset, quote_asset, side, wait_for
+            )
+        return template
+
+    async def await_response(self, header: dict, data):
+        """
+        :param data: dict request or bytes of an already encoded request
+        :return: the decoded response of this request, calls sent concurrently each get their own
+        """
+        codec = codecs.get_codec()
+        body = data if isinstance(data, bytes) else codec.encode(data)
+        if self._url is None:
+            endpoints = self._endpoints if self._endpoints is not None else get_registry()
+            return codec.decode(await endpoints.post(LP, header, body))
         async with self._async_client(headers=header) as session:
-            async with session.post(url='http://localhost:10589', json=data) as response:
-                self._response = await response.json()
+            async with session.post(url=self._url, data=body) as response:
+                return codec.decode(await response.read())
 
     async def _pass(self):
         return
@@ -59,7 +99,7 @@ class ApiCall:
             'params': [],
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _liquidity_deposit(self, asset: str):
         formatted_asset = formatter.asset_to_str(asset)
@@ -73,7 +113,7 @@ class ApiCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _register_liquidity_refund_address(self, chain: CONSTANTS.Chains, address: str):
         data = {
@@ -86,7 +126,7 @@ class ApiCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_asset_balances(self):
         data = {
@@ -96,7 +136,7 @@ class ApiCall:
             'params': [],
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _withdraw_asset(self, amount: float, asset: str, address: str = ''):
         formatted_asset = formatter.asset_to_str(asset)
@@ -113,7 +153,7 @@ class ApiCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_open_swapping_channels(self):
         data = {
@@ -123,7 +163,7 @@ class ApiCall:
             'params': [],
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _set_range_order_by_liquidity(
             self,
@@ -156,7 +196,7 @@ class ApiCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _set_range_order_by_asset_amounts(
             self,
@@ -199,7 +239,7 @@ class ApiCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _update_limit_order(
             self,
@@ -259,7 +299,7 @@ class ApiCall:
                 }
             }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _set_limit_order(
             self,
@@ -272,48 +312,58 @@ class ApiCall:
             wait_for: CONSTANTS.WaitForOption = CONSTANTS.WaitForOption.NO_WAIT,
             dispatch_at: Optional[int] = None
     ):
-        if side == CONSTANTS.Side.SELL:
-            amount = formatter.amount_in_asset(base_asset, amount)
-            side = "sell"
-        else:
-            amount = formatter.amount_in_asset(quote_asset, amount * price)
-            side = "buy"
-        tick = formatter.price_to_tick(price, base_asset)
+        template = self.limit_order_template(base_asset, quote_asset, side, wait_for)
+        return await self.await_response(self._get_header(), template.render(order_id, price, amount, dispatch_at))
 
-        if dispatch_at:
-            data = {
-                'id': self._id,
-                'jsonrpc': '2.0',
-                'method': 'lp_set_limit_order',
-                'params': {
+    async def _cancel_orders(self, orders: list):
+        """
+        close every order with one JSON-RPC batch request. The response is the list of the responses to each order,
+        in the order of the orders
+        :param orders: list of LimitOrder and RangeOrder types
+        """
+        batch = list()
+        for index, order in enumerate(orders):
+            base_asset = formatter.asset_to_str(order.base_asset)
+            if isinstance(order, LimitOrder):
+                method = 'lp_set_limit_order'
+                params = {
                     'base_asset': base_asset,
-                    'quote_asset': quote_asset,
-                    'side': side,
-                    'id': order_id,
-                    'tick': tick,
-                    'sell_amount': amount,
-                    'wait_for': wait_for.value,
-                    'dispatch_at': dispatch_at
+                    'quote_asset': formatter.asset_to_str(order.quote_asset),
+                    'side': 'sell' if order.side == CONSTANTS.Side.SELL else 'buy',
+                    'id': order.id,
+                    'tick': formatter.price_to_tick(order.price, base_asset),
+                    'sell_amount': 0
                 }
-            }
-        else:
-            data = {
-                'id': self._id,
-                'jsonrpc': '2.0',
-                'method': 'lp_set_limit_order',
-                'params': {
+            else:
+                method = 'lp_set_range_order'
+                params = {
                     'base_asset': base_asset,
-                    'quote_asset': quote_asset,
-                    'side': side,
-                    'id': order_id,
-                    'tick': tick,
-                    'sell_amount': amount,
-                    'wait_for': wait_for.value,
+                    'quote_asset': formatter.asset_to_str(order.quote_asset),
+                    'id': order.id,
+                    'tick_range': [
+                        formatter.price_to_tick(order.lower_price, base_asset),
+                        formatter.price_to_tick(order.upper_price, base_asset)
+                    ],
+                    'size': {'Liquidity': {'liquidity': 0}}
                 }
-            }
+            batch.append({'id': index, 'jsonrpc': '2.0', 'method': method, 'params': params})
 
-        await self.await_response(self._get_header(), data)
+        responses = await self.await_response(self._get_header(), batch)
+        if isinstance(responses, list):
+            responses = sorted(responses, key=lambda response: response.get('id', 0))
+        return responses
 
     async def __call__(self, api_call: APICommands = APICommands.Empty, *args):
-        await self._calls[api_call](*args)
-        return self._response
+        start = time.perf_counter()
+        try:
+            response = await self._calls[api_call](*args)
+        except Exception:
+            metrics.API_ERRORS.labels(api_call.name).inc()
+            raise
+        finally:
+            metrics.API_LATENCY.labels(api_call.name).observe(time.perf_counter() - start)
+        # the last response is kept for inspection only, concurrent calls each return their own
+        self._response = response
+        if response and 'error' in response:
+            metrics.API_ERRORS.labels(api_call.name).inc()
+        return response
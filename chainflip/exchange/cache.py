@@ -0,0 +1,115 @@
+import asyncio
+
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+POOL_STATE_METHODS = (
+    'cf_pool_info',
+    'cf_pool_depth',
+    'cf_pool_liquidity',
+    'cf_pool_orders',
+    'cf_required_asset_ratio_for_range_order'
+)
+
+
+class BlockCache(object):
+    """
+    Cache of node reads versioned by block.
+    Pool state only changes from one block to the next, so a read is answered from the cache until new_block
+    reports a new block, e.g. as a block listener of ChainflipUpdates. Concurrent identical reads are single
+    flight: the first one is sent and the others wait for its response. Error responses are not cached. Without
+    block updates the entries expire after max_age seconds, about one block, so a stalled block stream never
+    serves stale pool state for long.
+    """
+
+    def __init__(self,
+                 methods: Optional[Iterable[str]] = None,
+                 max_age: Optional[float] = 6,
+                 clock: Optional[Clock] = None):
+        """
+        :param methods: optional iterable of str RPC methods cached, the pool state methods by default
+        :param max_age: optional float seconds entries are kept without a new block, never expired when None
+        """
+        self._methods = frozenset(methods if methods is not None else POOL_STATE_METHODS)
+        self._max_age = max_age
+        self._clock = clock if clock is not None else get_clock()
+        self._block_number = None
+        self._version = 0
+        self._version_started = self._clock.time()
+        self._entries = dict()
+        self._in_flight = dict()
+
+    @property
+    def block_number(self) -> Optional[int]:
+        return self._block_number
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def caches(self, method: str) -> bool:
+        return method in self._methods
+
+    def _invalidate(self, reason: str):
+        self._version += 1
+        self._version_started = self._clock.time()
+        self._entries.clear()
+        metrics.RPC_CACHE_INVALIDATIONS.labels(reason).inc()
+
+    def new_block(self, block_number: int):
+        """
+        drop the entries of the previous blocks
+        :param block_number: integer block number reported by the node
+        """
+        if self._block_number is not None and block_number <= self._block_number:
+            return
+        self._block_number = block_number
+        self._invalidate('new_block')
+
+    async def get(self, method: str, params: Hashable, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        :param method: str RPC method
+        :param params: hashable params of the read, e.g. the encoded json
+        :param fetch: coroutine function sending the read to the node
+        :return: dict response, from the cache or from the node
+        """
+        if self._max_age is not None and self._clock.time() - self._version_started >= self._max_age:
+            self._invalidate('max_age')
+        key = (method, params)
+        response = self._entries.get(key)
+        if response is not None:
+            metrics.RPC_CACHE_REQUESTS.labels(method, 'hit').inc()
+            return response
+
+        # reads of an older block never join a read sent for the current one
+        flight = (self._version, method, params)
+        future = self._in_flight.get(flight)
+        if future is not None:
+            metrics.RPC_CACHE_REQUESTS.labels(method, 'coalesced').inc()
+            return await asyncio.shield(future)
+
+        metrics.RPC_CACHE_REQUESTS.labels(method, 'miss').inc()
+        version = self._version
+        future = self._in_flight[flight] = asyncio.get_running_loop().create_future()
+        try:
+            response = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # retrieved here so a read nobody else waited for is not logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[flight]
+        if version == self._version and 'error' not in response:
+            self._entries[key] = response
+        future.set_result(response)
+        return response
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import time
+
+from typing import Optional
+
+import aiohttp
+
+import chainflip.utils.codec as codecs
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+RPC = 'rpc'
+LP = 'lp'
+
+# cheap request each kind of node answers, used as health check
+_PROBES = {
+    RPC: {'id': 1, 'jsonrpc': '2.0', 'method': 'system_health', 'params': []},
+    LP: {'id': 1, 'jsonrpc': '2.0', 'method': 'lp_asset_balances', 'params': []}
+}
+
+
+class Endpoint(object):
+    """
+    One node endpoint, http and websocket urls, with its health and a moving average of its latency.
+    """
+
+    __slots__ = ('kind', 'url', 'ws_url', 'latency', 'failures', 'healthy', 'checked', '__weakref__')
+
+    def __init__(self, kind: str, url: str, ws_url: Optional[str] = None):
+        """
+        :param kind: str rpc or lp
+        :param url: str http url
+        :param ws_url: optional str websocket url, the http url with a ws scheme by default
+        """
+        self.kind = kind
+        self.url = url
+        self.ws_url = ws_url if ws_url is not None else 'ws' + url[len('http'):] if url.startswith('http') else url
+        self.latency = None
+        self.failures = 0
+        self.healthy = True
+        self.checked = None
+
+    def __str__(self):
+        return f'Endpoint - {self.kind} {self.url}: healthy = {self.healthy}, latency = {self.latency}'
+
+
+class EndpointRegistry(object):
+    """
+    Node endpoints of the market maker, configured once instead of in every class.
+    Reads go to the healthy RPC node with the lowest latency. Writes stay pinned to the first healthy LP API in
+    the configured order, so orders are submitted through one node. A request failing to connect fails over to
+    the next endpoint. Latency is measured continuously from every request and from the periodic health
+    checks, which also bring failed endpoints back.
+    """
+
+    def __init__(self,
+                 rpc_urls: Optional[list] = None,
+                 lp_urls: Optional[list] = None,
+                 health_interval: float = 5,
+                 unhealthy_after: int = 3,
+                 smoothing: float = 0.2,
+                 timeout: float = 5,
+                 clock: Optional[Clock] = None):
+        """
+        :param rpc_urls: optional list of str RPC node urls, http://localhost:9944 by default
+        :param lp_urls: optional list of str LP API urls in order of preference, http://localhost:10589 by default
+        :param health_interval: float seconds between health checks
+        :param unhealthy_after: integer consecutive failures before an endpoint is taken out of rotation
+        :param smoothing: float weight of the newest latency in the moving average
+        :param timeout: float seconds a health check may take
+        """
+        self._health_interval = health_interval
+        self._unhealthy_after = unhealthy_after
+        self._smoothing = smoothing
+        self._timeout = timeout
+        self._clock = clock if clock is not None else get_clock()
+        self._endpoints = {RPC: list(), LP: list()}
+        for url in rpc_urls if rpc_urls is not None else ['http://localhost:9944']:
+            self.add(RPC, url)
+        for url in lp_urls if lp_urls is not None else ['http://localhost:10589']:
+            self.add(LP, url)
+
+    @property
+    def endpoints(self) -> dict:
+        return self._endpoints
+
+    def add(self, kind: str, url: str, ws_url: Optional[str] = None) -> Endpoint:
+        endpoint = Endpoint(kind, url, ws_url)
+        self._endpoints[kind].append(endpoint)
+        metrics.ENDPOINT_LATENCY.labels(kind, url).set_function(
+            lambda endpoint: endpoint.latency if endpoint.latency is not None else math.nan, owner=endpoint
+        )
+        metrics.ENDPOINT_HEALTHY.labels(kind, url).set_function(lambda endpoint: endpoint.healthy, owner=endpoint)
+        return endpoint
+
+    def candidates(self, kind: str) -> list:
+        """
+        :param kind: str rpc or lp
+        :return: list of Endpoint in the order requests try them: healthy ones first, by latency for reads and
+        in the configured order for writes
+        """
+        endpoints = self._endpoints[kind]
+        healthy = [endpoint for endpoint in endpoints if endpoint.healthy]
+        if kind == RPC:
+            healthy.sort(key=lambda endpoint: endpoint.latency if endpoint.latency is not None else math.inf)
+        return healthy + [endpoint for endpoint in endpoints if not endpoint.healthy]
+
+    def read(self) -> Endpoint:
+        """
+        :return: the healthy RPC endpoint with the lowest latency
+        """
+        return self.candidates(RPC)[0]
+
+    def write(self) -> Endpoint:
+        """
+        :return: the LP API endpoint writes are pinned to
+        """
+        return self.candidates(LP)[0]
+
+    def record(self, endpoint: Endpoint, latency: float):
+        """
+        :param endpoint: Endpoint that answered
+        :param latency: float seconds it took
+        """
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += self._smoothing * (latency - endpoint.latency)
+        endpoint.failures = 0
+        if not endpoint.healthy:
+            logger.info('%s is healthy again', endpoint)
+        endpoint.healthy = True
+
+    def record_failure(self, endpoint: Endpoint, error: Exception):
+        """
+        :param endpoint: Endpoint that failed to answer
+        :param error: Exception raised
+        """
+        endpoint.failures += 1
+        if endpoint.healthy and endpoint.failures >= self._unhealthy_after:
+            endpoint.healthy = False
+            logger.warning('%s taken out of rotation after %s failures: %s', endpoint, endpoint.failures, error)
+
+    async def post(self, kind: str, header: dict, body: bytes) -> bytes:
+        """
+        send a request to the first endpoint of candidates(kind), failing over to the next one when it cannot be
+        reached
+        :param kind: str rpc or lp
+        :param header: dict http headers
+        :param body: bytes request body
+        :return: bytes response body
+        """
+        error = None
+        for attempt, endpoint in enumerate(self.candidates(kind)):
+            if attempt:
+                metrics.ENDPOINT_FAILOVERS.labels(kind).inc()
+                logger.warning('Failing over %s request to %s', kind, endpoint.url)
+            try:
+                return await self.send(endpoint, header, body)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+        raise error
+
+    async def send(self, endpoint: Endpoint, header: dict, body: bytes) -> bytes:
+        """
+        send a request to one endpoint, recording its latency or its failure to connect
+        :param endpoint: Endpoint to send to
+        :param header: dict http headers
+        :param body: bytes request body
+        :return: bytes response body
+        """
+        start = time.perf_counter()
+        try:
+            async with aiohttp.ClientSession(headers=header) as session:
+                async with session.post(url=endpoint.url, data=body) as response:
+                    data = await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            self.record_failure(endpoint, e)
+            raise
+        self.record(endpoint, time.perf_counter() - start)
+        return data
+
+    async def check(self, endpoint: Endpoint) -> bool:
+        """
+        health check an endpoint: it must answer the probe request, and an RPC node must not be syncing
+        :return: bool healthy
+        """
+        codec = codecs.get_codec()
+        start = time.perf_counter()
+        endpoint.checked = self._clock.time()
+        try:
+            async with aiohttp.ClientSession(headers={'Content-Type': 'application/json'}) as session:
+                async with session.post(
+                    url=endpoint.url,
+                    data=codec.encode(_PROBES[endpoint.kind]),
+                    timeout=aiohttp.ClientTimeout(total=self._timeout)
+                ) as response:
+                    result = codec.decode(await response.read())
+            if 'error' in result:
+                raise RuntimeError(result['error'].get('message'))
+            if endpoint.kind == RPC and result['result'].get('isSyncing'):
+                raise RuntimeError('node is syncing')
+        except Exception as e:
+            self.record_failure(endpoint, e)
+            return False
+        self.record(endpoint, time.perf_counter() - start)
+        return True
+
+    async def check_all(self):
+        await asyncio.gather(
+            *(self.check(endpoint) for endpoints in self._endpoints.values() for endpoint in endpoints)
+        )
+
+    async def run(self):
+        """
+        health check every endpoint every health_interval seconds
+        """
+        while True:
+            await self.check_all()
+            await self._clock.sleep(self._health_interval)
+
+
+_registry = None
+
+
+def get_registry() -> EndpointRegistry:
+    """
+    :return: the endpoint registry used by every component not given urls explicitly
+    """
+    global _registry
+    if _registry is None:
+        _registry = EndpointRegistry()
+    return _registry
+
+
+def set_registry(registry: EndpointRegistry):
+    """
+    :param registry: EndpointRegistry replacing the default localhost endpoints
+    """
+    global _registry
+    _registry = registry
@@ -0,0 +1,83 @@
+import json
+
+from typing import Optional
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.format as formatter
+
+
+def _encode_id(order_id) -> bytes:
+    if type(order_id) is int:
+        return b'%d' % order_id
+    return json.dumps(order_id).encode()
+
+
+class LimitOrderTemplate(object):
+    """
+    Pre-encoded lp_set_limit_order request body for a pair and side.
+    Everything but the order id, tick and sell amount is encoded once, rendering an order only formats three
+    integers into the buffer. Ticks are cached per price, call prepare with the prices expected before the
+    swap lands to take the tick calculation off the order path as well.
+    """
+
+    def __init__(self,
+                 user_id,
+                 base_asset: str,
+                 quote_asset: str,
+                 side: CONSTANTS.Side,
+                 wait_for: CONSTANTS.WaitForOption = CONSTANTS.WaitForOption.NO_WAIT,
+                 max_ticks: int = 1024):
+        self._base_asset = base_asset
+        self._quote_asset = quote_asset
+        self._side = side
+        self._sell = side == CONSTANTS.Side.SELL
+        self._unit = CONSTANTS.UNIT_CONVERTER[base_asset if self._sell else quote_asset]
+        self._ticks = dict()
+        self._max_ticks = max_ticks
+        prefix = '{"id":%s,"jsonrpc":"2.0","method":"lp_set_limit_order","params":{' \
+                 '"base_asset":%s,"quote_asset":%s,"side":%s,"wait_for":%s,' % (
+                     json.dumps(user_id), json.dumps(base_asset), json.dumps(quote_asset),
+                     json.dumps('sell' if self._sell else 'buy'), json.dumps(wait_for.value)
+                 )
+        prefix = prefix.replace('%', '%%').encode()
+        self._format = prefix + b'"id":%b,"tick":%d,"sell_amount":%d}}'
+        self._format_dispatch = prefix + b'"id":%b,"tick":%d,"sell_amount":%d,"dispatch_at":%d}}'
+
+    @property
+    def side(self) -> CONSTANTS.Side:
+        return self._side
+
+    def tick(self, price: float) -> int:
+        """
+        :param price: float price of the base asset in the quote asset
+        :return: integer tick for the price
+        """
+        tick = self._ticks.get(price)
+        if tick is None:
+            if len(self._ticks) >= self._max_ticks:
+                self._ticks.clear()
+            tick = self._ticks[price] = formatter.price_to_tick(price, self._base_asset)
+        return tick
+
+    def prepare(self, *prices: float):
+        """
+        cache the ticks for the prices orders are about to be placed at
+        """
+        for price in prices:
+            self.tick(price)
+
+    def render(self, order_id, price: float, amount: float, dispatch_at: Optional[int] = None) -> bytes:
+        """
+        :param order_id: order id, integers take the fast path
+        :param price: float price of the base asset in the quote asset
+        :param amount: float amount of base asset, bought for buy orders, sold for sell orders
+        :param dispatch_at: optional integer block to dispatch the order at
+        :return: bytes request body
+        """
+        if self._sell:
+            sell_amount = int(self._unit * amount)
+        else:
+            sell_amount = int(self._unit * (amount * price))
+        if dispatch_at:
+            return self._format_dispatch % (_encode_id(order_id), self.tick(price), sell_amount, dispatch_at)
+        return self._format % (_encode_id(order_id), self.tick(price), sell_amount)
@@ -1,11 +1,20 @@
 import asyncio
-import json
+import time
 import websockets
 
+import chainflip.utils.codec as codecs
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+import chainflip.utils.tracing as tracing
 
+from typing import Optional
+
+from chainflip.exchange.endpoints import get_registry
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.constants import NetworkStatus
+from chainflip.utils.readiness import Readiness
+from chainflip.utils.tracing import Trace
 
 logger = log.setup_custom_logger('root')
 
@@ -15,15 +24,19 @@ class Pool(object):
     Chainflip Pool object
     """
 
-    def __init__(self, base_asset: str, quote_asset: str = 'USDC'):
+    def __init__(self, base_asset: str, quote_asset: str = 'USDC', clock: Optional[Clock] = None):
         self._base_asset = formatter.asset_to_str(base_asset)
         self._quote_asset = formatter.asset_to_str(quote_asset)
         self._current_price = None
+        self._last_update = None
+        self._trace = None
         self._pool_fees = None
         self._pool_liquidity = None
         self._pool_orders = None
         self._price_stream = None
         self._stream_connected = NetworkStatus.NOT_CONNECTED
+        self._readiness = Readiness(f'{self._base_asset}-{self._quote_asset} pool price')
+        self._clock = clock if clock is not None else get_clock()
 
     def __str__(self):
         if self._pool_fees is None:
@@ -42,6 +55,13 @@ class Pool(object):
     def price(self) -> float:
         return self._current_price
 
+    @property
+    def trace(self) -> Optional[Trace]:
+        """
+        trace of the price update the current price came from
+        """
+        return self._trace
+
     @property
     def fees(self) -> dict:
         return self._pool_fees
@@ -58,6 +78,30 @@ class Pool(object):
     def connection_status(self) -> NetworkStatus:
         return self._stream_connected
 
+    @property
+    def last_update(self) -> Optional[float]:
+        """
+        clock time of the last price received, None before the first one
+        """
+        return self._last_update
+
+    @property
+    def readiness(self) -> Readiness:
+        """
+        ready once the first price is received, not ready again once the stream stopped
+        """
+        self._reset_if_stopped()
+        return self._readiness
+
+    def _reset_if_stopped(self):
+        if self._price_stream is not None and self._price_stream.done():
+            self._price_stream = None
+            self._readiness = Readiness(f'{self._base_asset}-{self._quote_asset} pool price')
+
+    @price.setter
+    def price(self, price: float):
+        self._current_price = price
+
     @fees.setter
     def fees(self, fees: dict):
         self._pool_fees = fees
@@ -70,7 +114,7 @@ class Pool(object):
     def orders(self, orders: dict):
         self._pool_orders = orders
 
-    async def _listen_to_websocket(self, user_id: str, url: str = "ws://localhost:9944"):
+    async def _listen_to_websocket(self, user_id: str, url: str):
         data = {
             "id": user_id,
             "jsonrpc": "2.0",
@@ -78,24 +122,39 @@ class Pool(object):
             "params": [self._base_asset, self._quote_asset]
         }
 
+        codec = codecs.get_codec()
+
         async with websockets.connect(url) as websocket:
-            await websocket.send(json.dumps(data))
+            await websocket.send(codec.encode_text(data))
             self._stream_connected = NetworkStatus.CONNECTED
 
             # Discard the first element from the subscription
             await websocket.recv()
 
+            pair = f'{self._base_asset}-{self._quote_asset}'
+            messages = metrics.WS_MESSAGES.labels('cf_subscribe_pool_price', pair)
+            decode_seconds = metrics.WS_DECODE_SECONDS.labels('cf_subscribe_pool_price', pair)
+            tracer = tracing.get_tracer()
+
             # Listen for incoming messages
             try:
                 while True:
                     resp = await websocket.recv()
-                    resp = json.loads(resp)
+                    start = time.perf_counter()
+                    resp = codec.decode_pool_price(resp)
                     self._current_price = formatter.hex_price_to_decimal(
-                        resp['params']['result']['price'],
+                        resp.price,
                         self._base_asset,
                         self._quote_asset
                     )
-                    logger.info(f'{self._base_asset}-{self._quote_asset} pool price: {self.price}')
+                    decoded = time.perf_counter()
+                    self._last_update = self._clock.time()
+                    decode_seconds.observe(decoded - start)
+                    messages.inc()
+                    self._trace = tracer.start_trace('pool_price', start, pair=pair)
+                    tracer.record(self._trace, 'ingress', start, decoded)
+                    self._readiness.set()
+                    logger.info('%s-%s pool price: %s', self._base_asset, self._quote_asset, self.price)
 
             except websockets.ConnectionClosed as e:
                 logger.error(f'Pool price connection closed {self._base_asset}-{self._quote_asset} {e.code}: {e.reason}')
@@ -105,7 +164,17 @@ class Pool(object):
                 logger.error(f'Pool price stream error occurred {self._base_asset}-{self._quote_asset}: {e}')
                 self._connected = NetworkStatus.NOT_CONNECTED
 
-    async def start_websocket(self, user_id: str, url: str = "ws://localhost:9944"):
-        self._price_stream = asyncio.create_task(self._listen_to_websocket(user_id=user_id, url=url))
-        logger.info(f'Subscribed to pool price stream for pool: {self.base_asset}-{self.quote_asset}')
-        await asyncio.sleep(10)
+    async def start_websocket(self, user_id: str, url: Optional[str] = None, timeout: float = 10):
+        """
+        start the price stream and wait until the first price is received or for timeout seconds.
+        The stream is started once, later calls only wait for it unless it stopped
+        :param url: optional str websocket url, the fastest healthy RPC node when None
+        """
+        self._reset_if_stopped()
+        if self._price_stream is None:
+            url = url if url is not None else get_registry().read().ws_url
+            self._price_stream = asyncio.create_task(self._listen_to_websocket(user_id=user_id, url=url))
+            self._readiness.watch(self._price_stream)
+            logger.info(f'Subscribed to pool price stream for pool: {self.base_asset}-{self.quote_asset}')
+        if not await self._readiness.wait(timeout):
+            logger.warning(f'No pool price received for {self.base_asset}-{self.quote_asset} within {timeout}s')
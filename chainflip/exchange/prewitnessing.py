@@ -1,15 +1,23 @@
 import datetime
 import asyncio
 import websockets
-import json
+import time
 
 from collections import deque
+from typing import Callable, Optional
 
+import chainflip.utils.codec as codecs
 import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.logger as log
+import chainflip.utils.memory as memory
+import chainflip.utils.metrics as metrics
+import chainflip.utils.tracing as tracing
 
+from chainflip.exchange.endpoints import get_registry
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.constants import NetworkStatus
 from chainflip.utils.data_types import PrewitnessedSwap
+from chainflip.utils.readiness import Readiness
 
 logger = log.setup_custom_logger('root')
 
@@ -17,17 +25,31 @@ logger = log.setup_custom_logger('root')
 class PrewitnessedSwaps(object):
     """
     Chainflip prewitnessed swaps stream
+    Every swap witnessed is queued and passed to swap_handler, e.g. to record when it arrived. The queue is
+    bounded, swaps pushed out of it unread are counted in dropped.
     """
 
-    def __init__(self, base_asset: str, quote_asset: str = 'USDC'):
+    def __init__(self,
+                 base_asset: str,
+                 quote_asset: str = 'USDC',
+                 swap_handler: Optional[Callable[[PrewitnessedSwap], None]] = None,
+                 clock: Optional[Clock] = None):
         self._base_asset = base_asset
         self._quote_asset = quote_asset
         self._block_confirmation_secs = CONSTANTS.BLOCK_TIMINGS[self._base_asset]
         self._block_confirmation_num = CONSTANTS.CHAINFLIP_BLOCK_CONFIRMATIONS[self._base_asset]
         self._end_time = None
         self._swaps = deque(maxlen=200)
+        self._swap_handler = swap_handler
+        self._dropped = 0
         self._swaps_stream = None
         self._stream_connected = NetworkStatus.NOT_CONNECTED
+        self._readiness = Readiness(f'{base_asset}-{quote_asset} prewitness swaps')
+        self._clock = clock if clock is not None else get_clock()
+        metrics.PREWITNESS_QUEUE_DEPTH.labels(f'{base_asset}-{quote_asset}').set_function(
+            lambda stream: len(stream.swaps), owner=self
+        )
+        memory.track(f'prewitness.{base_asset}-{quote_asset}', 'swaps', lambda stream: len(stream.swaps), owner=self)
 
     @property
     def base_asset(self) -> str:
@@ -41,10 +63,24 @@ class PrewitnessedSwaps(object):
     def swaps(self) -> deque:
         return self._swaps
 
+    @property
+    def dropped(self) -> int:
+        """
+        swaps pushed out of the full queue before being returned
+        """
+        return self._dropped
+
     @property
     def status(self) -> NetworkStatus:
         return self._stream_connected
 
+    @property
+    def readiness(self) -> Readiness:
+        """
+        ready once the subscription is confirmed
+        """
+        return self._readiness
+
     @property
     def block_time(self) -> int:
         return self._block_confirmation_secs
@@ -53,7 +89,7 @@ class PrewitnessedSwaps(object):
     def block_number(self) -> int:
         return self._block_confirmation_num
 
-    async def _listen_to_websocket(self, url: str = "ws://localhost:9944"):
+    async def _listen_to_websocket(self, url: str):
         data = {
             "id": 1,
             "jsonrpc": "2.0",
@@ -61,25 +97,45 @@ class PrewitnessedSwaps(object):
             "params": [self._base_asset, self._quote_asset]
         }
 
+        codec = codecs.get_codec()
+
         async with websockets.connect(url) as websocket:
-            await websocket.send(json.dumps(data))
+            await websocket.send(codec.encode_text(data))
             self._stream_connected = NetworkStatus.CONNECTED
 
+            pair = f'{self._base_asset}-{self._quote_asset}'
+            messages = metrics.WS_MESSAGES.labels('cf_subscribe_prewitness_swaps', pair)
+            decode_seconds = metrics.WS_DECODE_SECONDS.labels('cf_subscribe_prewitness_swaps', pair)
+            tracer = tracing.get_tracer()
+
             # Listen for incoming messages
             try:
                 await websocket.recv()
+                self._readiness.set()
                 while True:
                     resp = await websocket.recv()
-                    resp = json.loads(resp)
-                    amount = resp['params']['result'][0] / CONSTANTS.UNIT_CONVERTER[self.base_asset]
-                    self._swaps.append(PrewitnessedSwap(
+                    start = time.perf_counter()
+                    resp = codec.decode_prewitness_swaps(resp)
+                    amount = resp[0] / CONSTANTS.UNIT_CONVERTER[self.base_asset]
+                    decoded = time.perf_counter()
+                    decode_seconds.observe(decoded - start)
+                    messages.inc()
+                    trace = tracer.start_trace('prewitness_swap', start, pair=pair)
+                    tracer.record(trace, 'ingress', start, decoded)
+                    swap = PrewitnessedSwap(
                         base_asset=self.base_asset,
                         quote_asset=self.quote_asset,
                         amount=amount,
-                        end_time=datetime.datetime.now() + datetime.timedelta(
-                            seconds=self.block_number * self.block_time)
-                    ))
-                    logger.info(f'Witnessed swap {amount} {self.base_asset} for {self.quote_asset} ')
+                        end_time=self._clock.now() + datetime.timedelta(
+                            seconds=self.block_number * self.block_time),
+                        trace=trace
+                    )
+                    if len(self._swaps) == self._swaps.maxlen:
+                        self._dropped += 1
+                    self._swaps.append(swap)
+                    if self._swap_handler is not None:
+                        self._swap_handler(swap)
+                    logger.info('Witnessed swap %s %s for %s', amount, self.base_asset, self.quote_asset)
 
             except websockets.ConnectionClosed as e:
                 logger.error(
@@ -92,18 +148,27 @@ class PrewitnessedSwaps(object):
                 self._connected = NetworkStatus.NOT_CONNECTED
 
     async def return_swaps(self) -> list:
-        block_time = datetime.datetime.now() + datetime.timedelta(seconds=6)
+        block_time = self._clock.now() + datetime.timedelta(seconds=6)
         swaps = []
         while self._swaps and self._swaps[0].end_time <= block_time:
             swaps.append(self._swaps.popleft())
         return swaps
 
     async def remove_expired_swaps(self):
-        now = datetime.datetime.now()
+        now = self._clock.now()
         while self._swaps and self._swaps[-1].end_time <= now:
             self._swaps.pop()
 
-    async def start_websocket(self, url: str = "ws://localhost:9944"):
+    async def start_websocket(self, url: Optional[str] = None, timeout: float = 5):
+        """
+        start the prewitness stream and wait until the subscription is confirmed or for timeout seconds
+        :param url: optional str websocket url, the fastest healthy RPC node when None
+        """
+        url = url if url is not None else get_registry().read().ws_url
         self._swaps_stream = asyncio.create_task(self._listen_to_websocket(url))
+        self._readiness.watch(self._swaps_stream)
         logger.info(f'Subscribed to Chainflip Prewitnessing stream for: {self.base_asset}-{self.quote_asset}')
-        await asyncio.sleep(5)
+        if not await self._readiness.wait(timeout):
+            logger.warning(
+                f'Prewitnessing subscription for {self.base_asset}-{self.quote_asset} not confirmed within {timeout}s'
+            )
@@ -1,23 +1,141 @@
 import aiohttp
+import asyncio
+import math
+import time
 
-from typing import Optional
+from collections import deque
+from typing import Iterable, Optional
 
+import chainflip.utils.codec as codecs
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
 
+from chainflip.exchange.cache import BlockCache
+from chainflip.exchange.endpoints import RPC, EndpointRegistry, get_registry
 from chainflip.utils.constants import RPCCommands
 
 
 logger = log.setup_custom_logger('root')
 
 
+class _HedgeStats(object):
+    __slots__ = ('latencies', 'hedged', 'hedges', 'delay', 'observed', '__weakref__')
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.hedged = deque(maxlen=window)
+        self.hedges = 0
+        self.delay = None
+        self.observed = 0
+
+
+class HedgePolicy(object):
+    """
+    Hedged reads for latency critical queries: a read still unanswered after the quantile of the recent latencies
+    of its method, p95 by default, is sent to a second node and the first answer wins. About one read in twenty
+    is sent twice, and the hedges stop when more than max_rate of the recent reads were hedged, e.g. while every
+    node is slow, so hedging never doubles the load on the nodes.
+    """
+
+    def __init__(self,
+                 methods: Optional[Iterable[str]] = None,
+                 quantile: float = 0.95,
+                 window: int = 200,
+                 min_samples: int = 20,
+                 initial_delay: float = 0.05,
+                 min_delay: float = 0.002,
+                 max_rate: float = 0.1):
+        """
+        :param methods: optional iterable of str RPC methods hedged, cf_pool_orders and cf_pool_liquidity by default
+        :param quantile: float quantile of the recent latencies after which a read is hedged
+        :param window: integer recent reads the quantile and the hedge rate are taken over
+        :param min_samples: integer reads observed before the quantile is used instead of initial_delay
+        :param initial_delay: float seconds before hedging while there are too few samples
+        :param min_delay: float seconds, lower bound of the delay
+        :param max_rate: float share of the recent reads hedged at most
+        """
+        self._methods = frozenset(methods if methods is not None else ('cf_pool_orders', 'cf_pool_liquidity'))
+        self._quantile = quantile
+        self._window = window
+        self._min_samples = min_samples
+        self._initial_delay = initial_delay
+        self._min_delay = min_delay
+        self._max_rate = max_rate
+        self._stats = dict()
+
+    def _method_stats(self, method: str) -> _HedgeStats:
+        stats = self._stats.get(method)
+        if stats is None:
+            stats = self._stats[method] = _HedgeStats(self._window)
+            metrics.RPC_HEDGE_RATE.labels(method).set_function(lambda policy: policy.hedge_rate(method), owner=self)
+            metrics.RPC_HEDGE_DELAY.labels(method).set_function(
+                lambda stats: stats.delay if stats.delay is not None else math.nan, owner=stats
+            )
+        return stats
+
+    def hedges(self, method: str) -> bool:
+        return method in self._methods
+
+    def hedge_rate(self, method: str) -> float:
+        stats = self._stats.get(method)
+        return stats.hedges / len(stats.hedged) if stats is not None and stats.hedged else 0.0
+
+    def delay(self, method: str) -> Optional[float]:
+        """
+        :return: float seconds to wait for the first node before hedging, None when the hedge budget is spent
+        """
+        stats = self._method_stats(method)
+        if stats.hedged and stats.hedges / len(stats.hedged) >= self._max_rate:
+            return None
+        if len(stats.latencies) < self._min_samples:
+            return self._initial_delay
+        if stats.delay is None:
+            latencies = sorted(stats.latencies)
+            stats.delay = max(latencies[int(self._quantile * (len(latencies) - 1))], self._min_delay)
+        return stats.delay
+
+    def observe(self, method: str, latency: float, hedged: bool):
+        """
+        :param method: str RPC method read
+        :param latency: float seconds the first node took, or had been waited for when the hedge answered first
+        :param hedged: bool whether the read was sent to a second node
+        """
+        stats = self._method_stats(method)
+        if len(stats.hedged) == stats.hedged.maxlen:
+            stats.hedges -= stats.hedged[0]
+        stats.hedged.append(hedged)
+        stats.hedges += hedged
+        stats.latencies.append(latency)
+        # the quantile is sorted again every tenth of the window, not on every read
+        stats.observed += 1
+        if stats.observed % max(self._window // 10, 1) == 0:
+            stats.delay = None
+
+
 class RpcCall:
     """
     Chainflip PerseveranceRPC calls.
     """
 
-    def __init__(self, user_id: str):
+    def __init__(self,
+                 user_id: str,
+                 url: Optional[str] = None,
+                 endpoints: Optional[EndpointRegistry] = None,
+                 hedge: Optional[HedgePolicy] = None,
+                 cache: Optional[BlockCache] = None):
+        """
+        :param url: optional str RPC node url, requests are routed by the endpoint registry when None
+        :param endpoints: optional EndpointRegistry, the default registry when None
+        :param hedge: optional HedgePolicy, hedges its methods across the registry nodes when given
+        :param cache: optional BlockCache, reads its methods at most once per block when given
+        """
         self._id = user_id
+        self._url = url
+        self._endpoints = endpoints
+        self._hedge = hedge
+        self._cache = cache
+        self._losers = set()
         self._response: Optional[dict] = None
         self._calls = {
             RPCCommands.Empty: self._pass,
@@ -37,10 +155,82 @@ class RpcCall:
             'Content-Type': 'application/json',
         }
     
-    async def await_response(self, header: dict, data: dict):
+    async def await_response(self, header: dict, data: dict) -> dict:
+        method = data['method']
+        if self._cache is not None and self._cache.caches(method):
+            return await self._cache.get(
+                method, codecs.get_codec().encode(data['params']), lambda: self._post(header, data)
+            )
+        return await self._post(header, data)
+
+    async def _post(self, header: dict, data: dict) -> dict:
+        codec = codecs.get_codec()
+        if self._url is None:
+            endpoints = self._endpoints if self._endpoints is not None else get_registry()
+            if self._hedge is not None and self._hedge.hedges(data['method']):
+                body = await self._hedged_post(endpoints, data['method'], header, codec.encode(data))
+            else:
+                body = await endpoints.post(RPC, header, codec.encode(data))
+            return codec.decode(body)
         async with self._async_client(headers=header) as session:
-            async with session.post(url='http://localhost:9944', json=data) as response:
-                self._response = await response.json()
+            async with session.post(url=self._url, data=codec.encode(data)) as response:
+                return codec.decode(await response.read())
+
+    async def _hedged_post(self, endpoints: EndpointRegistry, method: str, header: dict, body: bytes) -> bytes:
+        """
+        send a read to the fastest node and, when it has not answered within the hedge delay, to the next one as
+        well. The first answer is returned and the other request cancelled. A node failing to connect fails over
+        to the next one without waiting for the delay.
+        """
+        nodes = [endpoint for endpoint in endpoints.candidates(RPC) if endpoint.healthy]
+        delay = self._hedge.delay(method)
+        start = time.perf_counter()
+        if len(nodes) < 2 or delay is None:
+            body = await endpoints.post(RPC, header, body)
+            # unhedged reads count towards the hedge rate too, so hedging resumes once the rate drops
+            self._hedge.observe(method, time.perf_counter() - start, False)
+            return body
+
+        loop = asyncio.get_running_loop()
+        sent = list()
+        pending = set()
+
+        def send():
+            task = loop.create_task(endpoints.send(nodes[len(sent)], header, body))
+            sent.append(task)
+            pending.add(task)
+
+        send()
+        hedged = False
+        timeout = delay
+        error = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # the first node is slower than the hedge delay
+                    timeout = None
+                    if len(sent) < len(nodes):
+                        hedged = True
+                        send()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        self._hedge.observe(method, time.perf_counter() - start, hedged)
+                        if hedged:
+                            metrics.RPC_HEDGES.labels(method, 'primary' if task is sent[0] else 'hedge').inc()
+                        return task.result()
+                    error = task.exception()
+                if not pending and len(sent) < len(nodes):
+                    metrics.ENDPOINT_FAILOVERS.labels(RPC).inc()
+                    send()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+                self._losers.add(task)
+                task.add_done_callback(self._losers.discard)
 
     async def _pass(self):
         pass
@@ -55,7 +245,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_required_asset_ratio_for_range_order(
             self,
@@ -83,7 +273,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_pool_info(
             self,
@@ -103,7 +293,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_pool_depth(
             self,
@@ -131,7 +321,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_pool_liquidity(
             self,
@@ -151,7 +341,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_pool_orders(
             self,
@@ -171,7 +361,7 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def _get_pool_range_liquidity_value(
             self,
@@ -202,8 +392,18 @@ class RpcCall:
             }
         }
 
-        await self.await_response(self._get_header(), data)
+        return await self.await_response(self._get_header(), data)
 
     async def __call__(self, rpc_call: RPCCommands = RPCCommands.Empty, *args):
-        await self._calls[rpc_call](*args)
-        return self._response
+        start = time.perf_counter()
+        try:
+            response = await self._calls[rpc_call](*args)
+        except Exception:
+            metrics.RPC_ERRORS.labels(rpc_call.name).inc()
+            raise
+        finally:
+            metrics.RPC_LATENCY.labels(rpc_call.name).observe(time.perf_counter() - start)
+        self._response = response
+        if response and 'error' in response:
+            metrics.RPC_ERRORS.labels(rpc_call.name).inc()
+        return response
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+from chainflip.utils.constants import RequestPriority
+
+
+logger = log.setup_custom_logger('root')
+
+
+class TokenBucket(object):
+    """
+    Token bucket rate limiter: rate tokens per second, at most burst tokens saved up.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Optional[Clock] = None):
+        self._rate = rate
+        self._burst = burst if burst is not None else max(rate, 1.0)
+        self._clock = clock if clock is not None else get_clock()
+        self._tokens = self._burst
+        self._updated = self._clock.time()
+
+    def _refill(self):
+        now = self._clock.time()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def take(self) -> float:
+        """
+        take a token if one is available
+        :return: float 0 when a token was taken, otherwise seconds until the next one
+        """
+        self._refill()
+        # tolerate the rounding of the refill, a token short by 1e-16 would never be waited for
+        if self._tokens > 1 - 1e-9:
+            self._tokens = max(self._tokens - 1, 0.0)
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+
+class RequestScheduler(object):
+    """
+    Outbound request scheduler shared by everything calling the LP API.
+    Requests wait in one FIFO queue per priority and are sent strictly by priority, cancels before amends before
+    new orders before queries, so under a burst the requests reducing risk always go out first. At most
+    max_in_flight requests are sent and not answered at a time and, with a rate, a token bucket limits how
+    many are sent per second. Dispatching is driven by submissions and completions, there is no polling task.
+    """
+
+    def __init__(self,
+                 max_in_flight: int = 16,
+                 rate: Optional[float] = None,
+                 burst: Optional[float] = None,
+                 clock: Optional[Clock] = None):
+        """
+        :param max_in_flight: integer requests sent and not answered at most
+        :param rate: optional float requests per second, unlimited when None
+        :param burst: optional float requests sent at once after an idle period, defaults to rate
+        """
+        self._max_in_flight = max_in_flight
+        self._clock = clock if clock is not None else get_clock()
+        self._bucket = TokenBucket(rate, burst, clock=self._clock) if rate is not None else None
+        self._queues = {priority: deque() for priority in RequestPriority}
+        self._in_flight = 0
+        self._wake_up = None
+        self._sending = set()
+        self._waits = dict()
+        for priority in self._queues:
+            metrics.SCHEDULER_QUEUE_DEPTH.labels(priority.name.lower()).set_function(
+                lambda scheduler, priority=priority: scheduler.queue_depth(priority), owner=self
+            )
+            self._waits[priority] = metrics.SCHEDULER_WAIT.labels(priority.name.lower())
+        metrics.SCHEDULER_IN_FLIGHT.set_function(lambda scheduler: scheduler.in_flight, owner=self)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queue_depth(self, priority: RequestPriority) -> int:
+        return len(self._queues[priority])
+
+    async def submit(self, priority: RequestPriority, function: Callable[..., Awaitable], *args):
+        """
+        queue a request and wait for its result
+        :param priority: RequestPriority of the request
+        :param function: coroutine function sending the request, e.g. an ApiCall
+        :param args: arguments of the function
+        :return: the result of the function, its exception is raised
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append((future, function, args, time.perf_counter()))
+        self._dispatch()
+        return await future
+
+    def _next(self) -> Optional[tuple]:
+        for priority, queue in self._queues.items():
+            while queue:
+                request = queue.popleft()
+                if not request[0].done():
+                    return priority, request
+        return None
+
+    def _dispatch(self):
+        while self._in_flight < self._max_in_flight:
+            queued = self._next()
+            if queued is None:
+                return
+            priority, request = queued
+            if self._bucket is not None:
+                wait = self._bucket.take()
+                if wait > 0:
+                    self._queues[priority].appendleft(request)
+                    if self._wake_up is None:
+                        self._wake_up = asyncio.get_running_loop().create_task(self._dispatch_later(wait))
+                    return
+            future, function, args, queued_at = request
+            self._waits[priority].observe(time.perf_counter() - queued_at)
+            self._in_flight += 1
+            task = asyncio.get_running_loop().create_task(self._send(future, function, args))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _dispatch_later(self, wait: float):
+        await self._clock.sleep(wait)
+        self._wake_up = None
+        self._dispatch()
+
+    async def _send(self, future: asyncio.Future, function: Callable[..., Awaitable], args: tuple):
+        try:
+            result = await function(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            self._dispatch()
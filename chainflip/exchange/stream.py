@@ -1,10 +1,18 @@
 import asyncio
 import websockets
-import json
+import time
 
+import chainflip.utils.codec as codecs
 import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+import chainflip.utils.tracing as tracing
 
+from typing import Callable, Optional
+
+from chainflip.exchange.endpoints import get_registry
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.constants import NetworkStatus
+from chainflip.utils.readiness import Readiness
 
 
 logger = log.setup_custom_logger('root')
@@ -13,14 +21,26 @@ logger = log.setup_custom_logger('root')
 class ChainflipUpdates(object):
     """
     Chainflip updates stream
+    Own fills are passed to fill_handler, e.g. OMS.apply_fill to keep the balance ledger up to date, and
+    the own fills of every block to block_handler, e.g. PositionTracker.on_block. Block listeners are told the
+    number of every new block, e.g. BlockCache.new_block.
     """
 
-    def __init__(self, lp_account: str):
+    def __init__(self,
+                 lp_account: str,
+                 fill_handler: Optional[Callable[[dict], None]] = None,
+                 block_handler: Optional[Callable[[int, list], None]] = None,
+                 clock: Optional[Clock] = None):
         self._lp_id = lp_account
+        self._fill_handler = fill_handler
+        self._block_handler = block_handler
+        self._block_listeners = list()
         self._update_stream = None
         self._confirmed_block_number = 0
         self._latest_block_number = 0
         self._stream_connected = NetworkStatus.NOT_CONNECTED
+        self._readiness = Readiness('order fills')
+        self._clock = clock if clock is not None else get_clock()
 
     @property
     def confirmed_block_number(self) -> int:
@@ -30,12 +50,31 @@ class ChainflipUpdates(object):
     def latest_block_number(self) -> int:
         return self._latest_block_number
 
+    @property
+    def readiness(self) -> Readiness:
+        """
+        ready once the subscription is confirmed, not ready again once the stream stopped
+        """
+        self._reset_if_stopped()
+        return self._readiness
+
+    def _reset_if_stopped(self):
+        if self._update_stream is not None and self._update_stream.done():
+            self._update_stream = None
+            self._readiness = Readiness('order fills')
+
+    def add_block_listener(self, listener: Callable[[int], None]):
+        """
+        :param listener: function called with the number of every block of the stream
+        """
+        self._block_listeners.append(listener)
+
     @confirmed_block_number.setter
     def confirmed_block_number(self, block: int):
         self._confirmed_block_number = block
         self._latest_block_number = block + 2
 
-    async def _listen_to_websocket(self, url: str = 'ws://localhost:10589'):
+    async def _listen_to_websocket(self, url: str):
         data = {
             "id": 1,
             "jsonrpc": "2.0",
@@ -43,17 +82,26 @@ class ChainflipUpdates(object):
             "params": []
         }
 
+        codec = codecs.get_codec()
+
         async with websockets.connect(url) as websocket:
-            await websocket.send(json.dumps(data))
+            await websocket.send(codec.encode_text(data))
             self._stream_connected = NetworkStatus.CONNECTED
 
+            messages = metrics.WS_MESSAGES.labels('lp_subscribe_order_fills', 'all')
+            decode_seconds = metrics.WS_DECODE_SECONDS.labels('lp_subscribe_order_fills', 'all')
+
             # Listen for incoming messages
             try:
                 await websocket.recv()
+                self._readiness.set()
                 while True:
                     response = await websocket.recv()
-                    response = json.loads(response)
-                    await self._process_websocket_message(response['params']['result'])
+                    start = time.perf_counter()
+                    response = codec.decode_order_fills(response)
+                    decode_seconds.observe(time.perf_counter() - start)
+                    messages.inc()
+                    await self._process_websocket_message(response)
 
             except websockets.ConnectionClosed as e:
                 logger.error(
@@ -68,9 +116,12 @@ class ChainflipUpdates(object):
     async def _process_websocket_message(self, response: dict):
         """
         This is where processing of fills occurs
-        Add whatever logic you wish here, in this demo we just report a fill without doing anything about it
+        Own fills go to the fill and block handlers, add whatever other logic you wish here
         """
         self.confirmed_block_number = response['block_number']
+        for listener in self._block_listeners:
+            listener(response['block_number'])
+        tracer = tracing.get_tracer()
         order_fills = list()
         for order in response['fills']:
             if 'limit_order' in order:
@@ -78,17 +129,40 @@ class ChainflipUpdates(object):
                 if limit_order_fill['lp'] == self._lp_id:
                     # add logic here if needed
                     order_fills.append(order)
+                    tracer.record_fill(limit_order_fill['id'], block_number=response['block_number'])
+                    if self._fill_handler is not None:
+                        self._fill_handler(order)
 
             if 'range_order' in order:
                 limit_order_fill = order['range_order']
                 if limit_order_fill['lp'] == self._lp_id:
                     # add logic here if needed
                     order_fills.append(order)
+                    tracer.record_fill(limit_order_fill['id'], block_number=response['block_number'])
+                    if self._fill_handler is not None:
+                        self._fill_handler(order)
 
-        logger.info(f'Confirmed Chainflip Block: {self._confirmed_block_number}. Latest Block: {self._latest_block_number}')
-        logger.info(f'Number of fills in last block: {len(order_fills)}')
+        if self._block_handler is not None:
+            self._block_handler(response['block_number'], order_fills)
 
-    async def start_websocket(self, url: str = 'ws://localhost:10589'):
+        logger.info(
+            'Confirmed Chainflip Block: %s. Latest Block: %s', self._confirmed_block_number, self._latest_block_number
+        )
+        logger.info('Number of fills in last block: %s', len(order_fills))
+
+    async def start_websocket(self, url: Optional[str] = None, timeout: float = 1):
+        """
+        start the order fills stream and wait until the subscription is confirmed or for timeout seconds.
+        The stream is started once, later calls only wait for it unless it stopped
+        :param url: optional str websocket url, the LP API writes are pinned to when None
+        """
+        self._reset_if_stopped()
+        if self._update_stream is not None:
+            await self._readiness.wait(timeout)
+            return
+        url = url if url is not None else get_registry().write().ws_url
         self._update_stream = asyncio.create_task(self._listen_to_websocket(url))
+        self._readiness.watch(self._update_stream)
         logger.info('Connected to Chainflip updates stream')
-        await asyncio.sleep(1)
+        if not await self._readiness.wait(timeout):
+            logger.warning(f'Order fills subscription not confirmed within {timeout}s')
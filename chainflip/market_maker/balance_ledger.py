@@ -0,0 +1,216 @@
+from collections import defaultdict
+from typing import Optional
+
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+def order_key(order_type: str, order_id) -> tuple:
+    """
+    :param order_type: str 'limit_order' or 'range_order'
+    :param order_id: order id as sent or as reported in a fill, hex strings and integers compare equal
+    :return: tuple ledger key of the order
+    """
+    if isinstance(order_id, str):
+        try:
+            order_id = int(order_id, 0)
+        except ValueError:
+            pass
+    return order_type, order_id
+
+
+class Reservation(object):
+    """
+    Amount of an asset set aside for an order, pending until the exchange acknowledged the order.
+    """
+
+    __slots__ = ('asset', 'amount', 'acknowledged')
+
+    def __init__(self, asset: str, amount: float):
+        self.asset = asset
+        self.amount = amount
+        self.acknowledged = False
+
+
+class BalanceLedger(object):
+    """
+    Local ledger of the LP balances, free and reserved per asset.
+    Submitting an order reserves the amount of the asset it sells, so orders sized concurrently cannot commit
+    the same funds twice. Cancelling releases what is left of the reservation, fills move the sold amount
+    out of the reservation and credit the bought asset. The ledger is reconciled against lp_asset_balances
+    every reconcile_interval seconds, or on the next check once something it cannot account for (a fill or
+    cancel of an unknown order, a rejected order) marked it as drifted.
+    """
+
+    def __init__(self, reconcile_interval: float = 60, tolerance: float = 1e-6, clock: Optional[Clock] = None):
+        self._free = defaultdict(float)
+        self._reserved = defaultdict(float)
+        self._reservations = dict()
+        self._reconcile_interval = reconcile_interval
+        self._tolerance = tolerance
+        self._clock = clock if clock is not None else get_clock()
+        self._reconciled_at = None
+        self._drifted = False
+
+    @property
+    def free(self) -> dict:
+        return self._free
+
+    @property
+    def reserved(self) -> dict:
+        return self._reserved
+
+    @property
+    def reservations(self) -> dict:
+        return self._reservations
+
+    @property
+    def drifted(self) -> bool:
+        return self._drifted
+
+    def _register(self, asset: str):
+        if asset not in self._free:
+            self._free[asset] = 0.0
+            metrics.LEDGER_BALANCE.labels(asset, 'free').set_function(lambda ledger: ledger.free[asset], owner=self)
+            metrics.LEDGER_BALANCE.labels(asset, 'reserved').set_function(
+                lambda ledger: ledger.reserved[asset], owner=self
+            )
+
+    def available(self, asset: str) -> float:
+        """
+        :param asset: str asset
+        :return: float free balance that can be committed to new orders
+        """
+        return self._free.get(asset, 0.0)
+
+    def reserve(self, key: tuple, asset: str, amount: float) -> bool:
+        """
+        reserve funds for an order, replacing the reservation of the order it updates
+        :param key: tuple order key, e.g. ('limit_order', order_id)
+        :param asset: str asset sold by the order
+        :param amount: float amount sold by the order
+        :return: False, reserving nothing, when the free balance does not cover the amount. Nothing is refused
+        before the ledger was first reconciled, the balances are unknown until then
+        """
+        previous = self._reservations.get(key)
+        released = previous.amount if previous is not None and previous.asset == asset else 0.0
+        if self._reconciled_at is not None and amount > self._free.get(asset, 0.0) + released + self._tolerance:
+            return False
+        if previous is not None:
+            self.release(key)
+        self._register(asset)
+        self._reservations[key] = Reservation(asset, amount)
+        self._free[asset] -= amount
+        self._reserved[asset] += amount
+        return True
+
+    def adopt(self, key: tuple, asset: str, amount: float):
+        """
+        track the reservation of an order already open on the exchange, e.g. recovered after a restart. Its
+        funds are already missing from the free balance reported by the exchange
+        :param key: tuple order key
+        :param asset: str asset sold by the order
+        :param amount: float amount sold by the order
+        """
+        self.release(key)
+        self._register(asset)
+        reservation = self._reservations[key] = Reservation(asset, amount)
+        reservation.acknowledged = True
+        self._reserved[asset] += amount
+
+    def restore(self, key: tuple, reservation: Optional[Reservation]):
+        """
+        put back the reservation an order held before an amend the ledger refused or the exchange rejected, the
+        order is still open on the exchange with its previous amount
+        :param key: tuple order key
+        :param reservation: Reservation held before the amend, None when the order held none
+        """
+        self.release(key)
+        if reservation is None:
+            return
+        self._register(reservation.asset)
+        self._reservations[key] = reservation
+        self._free[reservation.asset] -= reservation.amount
+        self._reserved[reservation.asset] += reservation.amount
+
+    def acknowledge(self, key: tuple):
+        """
+        the exchange accepted the order, from now on its funds are missing from lp_asset_balances as well
+        :param key: tuple order key
+        """
+        reservation = self._reservations.get(key)
+        if reservation is not None:
+            reservation.acknowledged = True
+
+    def release(self, key: tuple) -> float:
+        """
+        return what is left of the reservation of a cancelled, rejected or closed order to the free balance
+        :param key: tuple order key
+        :return: float amount released
+        """
+        reservation = self._reservations.pop(key, None)
+        if reservation is None:
+            return 0.0
+        self._free[reservation.asset] += reservation.amount
+        self._reserved[reservation.asset] -= reservation.amount
+        return reservation.amount
+
+    def fill(self, key: tuple, sold_asset: str, sold: float, bought_asset: str, bought: float):
+        """
+        apply a fill: the sold amount leaves the reservation, the bought amount is credited as free
+        :param key: tuple order key
+        :param sold_asset: str asset sold by the order
+        :param sold: float amount sold
+        :param bought_asset: str asset bought by the order
+        :param bought: float amount bought, including fees earned
+        """
+        reservation = self._reservations.get(key)
+        if reservation is None or reservation.asset != sold_asset:
+            self.mark_drifted()
+        else:
+            used = min(sold, reservation.amount)
+            reservation.amount -= used
+            self._reserved[sold_asset] -= used
+            if sold > used + self._tolerance:
+                self.mark_drifted()
+        self._register(bought_asset)
+        self._free[bought_asset] += bought
+
+    def mark_drifted(self):
+        """
+        reconcile against the exchange on the next check
+        """
+        self._drifted = True
+
+    def due(self) -> bool:
+        """
+        :return: True when the ledger should be reconciled against lp_asset_balances
+        """
+        return self._drifted or self._reconciled_at is None or \
+            self._clock.time() - self._reconciled_at >= self._reconcile_interval
+
+    def reconcile(self, balances: dict) -> dict:
+        """
+        align the free balances with the free balances reported by the exchange. Orders not acknowledged yet
+        are reserved locally but not on the exchange, they are kept out of the comparison
+        :param balances: dict of asset to float free balance from lp_asset_balances
+        :return: dict of asset to float drift (exchange - ledger) for the assets out of tolerance
+        """
+        pending = defaultdict(float)
+        for reservation in self._reservations.values():
+            if not reservation.acknowledged:
+                pending[reservation.asset] += reservation.amount
+        drift = dict()
+        first = self._reconciled_at is None
+        for asset, balance in balances.items():
+            self._register(asset)
+            expected = self._free[asset] + pending[asset]
+            difference = balance - expected
+            if not first and abs(difference) > self._tolerance * max(1.0, abs(balance)):
+                drift[asset] = difference
+            self._free[asset] = balance - pending[asset]
+        self._reconciled_at = self._clock.time()
+        self._drifted = False
+        metrics.LEDGER_RECONCILIATIONS.labels('drift' if drift else 'in_sync').inc()
+        return drift
@@ -0,0 +1,141 @@
+import asyncio
+
+from typing import Callable, Optional
+
+import chainflip.utils.logger as log
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+
+class DeadMansSwitch(object):
+    """
+    Takes the LP account flat when quoting can no longer be trusted: on shutdown, when a watched price feed has
+    not updated for longer than its timeout, or when the strategy misses its heartbeat.
+    Tripping cancels every order tracked by the OMS right away with one batched cancel-all, while the order
+    books are refreshed to sweep the orders on the exchange the OMS does not know about. The switch stays
+    tripped, strategies check tripped before quoting, until every feed and the heartbeat are fresh again.
+    With a scope the switch only takes its own orders flat, e.g. one switch per pool so a stale feed or a
+    failed strategy stops one pool and the others keep quoting.
+    """
+
+    def __init__(self,
+                 oms,
+                 order_books: Optional[list] = None,
+                 heartbeat_timeout: float = 60,
+                 check_interval: float = 1,
+                 cancel_timeout: float = 10,
+                 scope: Optional[Callable[[object], bool]] = None,
+                 clock: Optional[Clock] = None):
+        """
+        :param oms: OMS type
+        :param order_books: optional list of OrderBook of the pools traded, swept for untracked orders
+        :param heartbeat_timeout: float seconds without a heartbeat before tripping
+        :param check_interval: float seconds between checks of the feeds and heartbeat
+        :param cancel_timeout: float seconds a cancel-all keeps resending cancels
+        :param scope: optional callable selecting the tracked orders cancelled when tripping, all by default
+        """
+        self._oms = oms
+        self._order_books = order_books if order_books is not None else list()
+        self._heartbeat_timeout = heartbeat_timeout
+        self._check_interval = check_interval
+        self._cancel_timeout = cancel_timeout
+        self._scope = scope
+        self._clock = clock if clock is not None else get_clock()
+        self._feeds = dict()
+        self._armed_at = self._clock.time()
+        self._last_heartbeat = None
+        self._tripped = None
+        self._trip_lock = asyncio.Lock()
+
+    @property
+    def tripped(self) -> Optional[str]:
+        """
+        trigger the switch tripped for, None while armed
+        """
+        return self._tripped
+
+    def watch(self, name: str, last_update: Callable[[], Optional[float]], timeout: float):
+        """
+        :param name: str feed name, e.g. 'ETH-USDC pool price'
+        :param last_update: callable returning the clock time of the last update of the feed, None before the first
+        :param timeout: float seconds without an update before tripping
+        """
+        self._feeds[name] = (last_update, timeout)
+
+    def add_order_book(self, order_book):
+        """
+        :param order_book: OrderBook of a pool traded, swept for untracked orders when tripping
+        """
+        self._order_books.append(order_book)
+
+    def heartbeat(self):
+        self._last_heartbeat = self._clock.time()
+
+    def check(self) -> Optional[tuple]:
+        """
+        :return: tuple of (trigger, reason) to trip for, None when every feed and the heartbeat are fresh
+        """
+        now = self._clock.time()
+        for name, (last_update, timeout) in self._feeds.items():
+            updated = last_update()
+            if now - (updated if updated is not None else self._armed_at) > timeout:
+                return 'stale_feed', f'no {name} update for {timeout}s'
+        last_heartbeat = self._last_heartbeat if self._last_heartbeat is not None else self._armed_at
+        if now - last_heartbeat > self._heartbeat_timeout:
+            return 'heartbeat', f'no heartbeat for {self._heartbeat_timeout}s'
+        return None
+
+    async def _sweep(self) -> list:
+        orders = list()
+        for order_book in self._order_books:
+            try:
+                await order_book.update()
+                orders += order_book.open_lp_orders
+            except Exception as e:
+                logger.error('Dead man\'s switch: failed to refresh an order book: %s', e)
+        if not orders:
+            return list()
+        report = await self._oms.cancel_all(
+            orders, trigger='sweep', timeout=self._cancel_timeout, include_tracked=False
+        )
+        return report['outstanding']
+
+    async def trip(self, trigger: str, reason: Optional[str] = None) -> dict:
+        """
+        cancel every live order of the LP account
+        :param trigger: str shutdown, stale_feed, heartbeat or strategy_failure
+        :param reason: optional str details logged
+        :return: dict cancel-all report of the tracked orders, with the orders the sweep left open added to
+        outstanding
+        """
+        async with self._trip_lock:
+            logger.warning('Dead man\'s switch tripped (%s): %s', trigger, reason)
+            self._tripped = trigger
+            report, left_open = await asyncio.gather(
+                self._oms.cancel_all(trigger=trigger, timeout=self._cancel_timeout, scope=self._scope),
+                self._sweep()
+            )
+            report['outstanding'] += left_open
+            return report
+
+    def rearm(self):
+        logger.info('Dead man\'s switch re-armed')
+        self._tripped = None
+        self._armed_at = self._clock.time()
+
+    async def run(self):
+        """
+        check the feeds and heartbeat every check_interval seconds, trip when one is stale and re-arm once all
+        are fresh again
+        """
+        self._armed_at = self._clock.time()
+        while True:
+            await self._clock.sleep(self._check_interval)
+            stale = self.check()
+            if stale is not None and self._tripped is None:
+                await self.trip(*stale)
+            elif stale is None and self._tripped is not None and self._tripped != 'shutdown':
+                self.rearm()
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import os
+
+from typing import Optional
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.logger as log
+
+from chainflip.market_maker.balance_ledger import order_key
+from chainflip.market_maker.order_ids import ID_PARTITION_SHIFT
+from chainflip.utils.clock import Clock, get_clock
+from chainflip.utils.data_types import LimitOrder, RangeOrder
+
+
+logger = log.setup_custom_logger('root')
+
+
+def order_to_dict(order) -> dict:
+    """
+    :param order: LimitOrder or RangeOrder type
+    :return: dict JSON representation of the order
+    """
+    if isinstance(order, LimitOrder):
+        return {
+            'order_type': 'limit_order',
+            'id': order.id,
+            'base_asset': order.base_asset,
+            'quote_asset': order.quote_asset,
+            'side': order.side.name,
+            'price': order.price,
+            'amount': order.amount
+        }
+    return {
+        'order_type': 'range_order',
+        'id': order.id,
+        'base_asset': order.base_asset,
+        'quote_asset': order.quote_asset,
+        'type': order.type.name,
+        'lower_price': order.lower_price,
+        'upper_price': order.upper_price,
+        'amount': order.amount,
+        'min_amounts': order.min_amounts,
+        'max_amounts': order.max_amounts
+    }
+
+
+def order_from_dict(order: dict):
+    """
+    :param order: dict written by order_to_dict
+    :return: LimitOrder or RangeOrder type
+    """
+    if order['order_type'] == 'limit_order':
+        return LimitOrder(
+            order['amount'],
+            order['price'],
+            base_asset=order['base_asset'],
+            quote_asset=order['quote_asset'],
+            id=order['id'],
+            side=CONSTANTS.Side[order['side']]
+        )
+    return RangeOrder(
+        order['lower_price'],
+        order['upper_price'],
+        base_asset=order['base_asset'],
+        quote_asset=order['quote_asset'],
+        id=order['id'],
+        type=CONSTANTS.RangeOrderType[order['type']],
+        amount=order['amount'],
+        min_amounts=tuple(order['min_amounts']) if order['min_amounts'] is not None else None,
+        max_amounts=tuple(order['max_amounts']) if order['max_amounts'] is not None else None
+    )
+
+
+class JournalState(object):
+    """
+    Orders known from the journal: open (acknowledged by the exchange) and pending (submitted, outcome not
+    journaled, they may or may not be on the exchange), the highest numeric order id ever submitted, overall
+    and per order id partition, and the order id partitions registered by name.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.last_order_id = 0
+        self.last_order_ids = dict()
+        self.partitions = dict()
+        self.open = dict()
+        self.pending = dict()
+
+    @staticmethod
+    def _key(event: dict) -> tuple:
+        return order_key(event['order_type'], event['id'])
+
+    def apply(self, event: dict):
+        """
+        :param event: dict journal entry
+        """
+        self.seq = event['seq']
+        kind = event['event']
+        if kind == 'fill':
+            key = self._key(event)
+            if event.get('remaining') is not None and int(str(event['remaining']), 0) == 0:
+                self.open.pop(key, None)
+            return
+        if kind == 'partition':
+            self.partitions[event['name']] = event['partition']
+            return
+        key = self._key(event['order'])
+        if kind == 'intent':
+            self.pending[key] = event['order']
+            if isinstance(key[1], int):
+                self.last_order_id = max(self.last_order_id, key[1])
+                partition = key[1] >> ID_PARTITION_SHIFT
+                self.last_order_ids[partition] = max(self.last_order_ids.get(partition, 0), key[1])
+        elif kind in ('ack', 'amend'):
+            self.pending.pop(key, None)
+            self.open[key] = event['order']
+        elif kind == 'reject':
+            self.pending.pop(key, None)
+        elif kind == 'cancel':
+            self.pending.pop(key, None)
+            self.open.pop(key, None)
+
+    def orders(self, pending: bool = True) -> list:
+        """
+        :param pending: include orders whose submission outcome is unknown
+        :return: list of LimitOrder and RangeOrder
+        """
+        orders = [order_from_dict(order) for order in self.open.values()]
+        if pending:
+            orders += [order_from_dict(order) for key, order in self.pending.items() if key not in self.open]
+        return orders
+
+    def to_dict(self) -> dict:
+        return {
+            'seq': self.seq,
+            'last_order_id': self.last_order_id,
+            'last_order_ids': self.last_order_ids,
+            'partitions': self.partitions,
+            'open': list(self.open.values()),
+            'pending': list(self.pending.values())
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot: dict) -> 'JournalState':
+        state = cls()
+        state.seq = snapshot['seq']
+        state.last_order_id = snapshot['last_order_id']
+        state.last_order_ids = {int(partition): last for partition, last in snapshot['last_order_ids'].items()}
+        state.partitions = snapshot['partitions']
+        state.open = {cls._key(order): order for order in snapshot['open']}
+        state.pending = {cls._key(order): order for order in snapshot['pending']}
+        return state
+
+
+class OrderJournal(object):
+    """
+    Append-only journal of order intents, acks, amends, cancels, rejections and fills and of the order id
+    partitions, for crash recovery.
+    Entries are JSON lines numbered by seq. They are buffered and written and fsynced in one batch at most
+    flush_interval seconds after the first entry of the batch, from a worker thread so the event loop never
+    waits on the disk. Every snapshot_every entries the state is compacted into snapshot.json (written
+    atomically) and the journal is truncated. Opening a journal loads the snapshot and replays the entries
+    written after it, leaving the open and pending orders and the last order id in state.
+    """
+
+    JOURNAL = 'journal.jsonl'
+    SNAPSHOT = 'snapshot.json'
+
+    def __init__(self,
+                 directory: str,
+                 flush_interval: float = 0.05,
+                 snapshot_every: int = 10000,
+                 clock: Optional[Clock] = None):
+        self._directory = directory
+        self._journal_path = os.path.join(directory, self.JOURNAL)
+        self._snapshot_path = os.path.join(directory, self.SNAPSHOT)
+        self._flush_interval = flush_interval
+        self._snapshot_every = snapshot_every
+        self._clock = clock if clock is not None else get_clock()
+        self._buffer = list()
+        self._since_snapshot = 0
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        self._state = self._recover()
+
+    @property
+    def state(self) -> JournalState:
+        return self._state
+
+    def _recover(self) -> JournalState:
+        state = JournalState()
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path) as f:
+                state = JournalState.from_dict(json.load(f))
+        replayed = 0
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path, 'rb+') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('entry not terminated')
+                        event = json.loads(line)
+                    except ValueError:
+                        logger.warning('Dropping a torn entry at the end of the order journal')
+                        f.truncate(offset)
+                        break
+                    offset += len(line)
+                    if event['seq'] > state.seq:
+                        state.apply(event)
+                        replayed += 1
+        self._since_snapshot = replayed
+        logger.info(
+            'Recovered order journal: %s open and %s pending orders, last order id %s, %s entries replayed',
+            len(state.open), len(state.pending), state.last_order_id, replayed
+        )
+        return state
+
+    def record(self, event: str, **fields):
+        """
+        :param event: str intent, ack, amend, cancel, reject, fill or partition
+        :param fields: order (dict from order_to_dict), the fill fields for fills, name and partition for
+        partitions
+        """
+        entry = {'seq': self._state.seq + 1, 'time': self._clock.time(), 'event': event}
+        entry.update(fields)
+        self._state.apply(entry)
+        self._buffer.append(json.dumps(entry))
+        self._since_snapshot += 1
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                self.flush_sync()
+
+    def intent(self, order):
+        self.record('intent', order=order_to_dict(order))
+
+    def ack(self, order):
+        self.record('ack', order=order_to_dict(order))
+
+    def amend(self, order):
+        self.record('amend', order=order_to_dict(order))
+
+    def reject(self, order):
+        self.record('reject', order=order_to_dict(order))
+
+    def cancel(self, order):
+        self.record('cancel', order=order_to_dict(order))
+
+    def fill(self, order_type: str, fill: dict):
+        """
+        :param order_type: str limit_order or range_order
+        :param fill: dict fill from the order fills stream
+        """
+        self.record('fill', order_type=order_type, **fill)
+
+    def _take(self) -> tuple:
+        lines, self._buffer = self._buffer, list()
+        snapshot = None
+        if self._since_snapshot >= self._snapshot_every:
+            snapshot = json.dumps(self._state.to_dict())
+            self._since_snapshot = 0
+        return lines, snapshot
+
+    def _write(self, lines: list, snapshot: Optional[str]):
+        if self._file is None:
+            self._file = open(self._journal_path, 'a')
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        if snapshot is not None:
+            temporary = self._snapshot_path + '.tmp'
+            with open(temporary, 'w') as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self._snapshot_path)
+            self._file.truncate(0)
+            self._file.seek(0)
+
+    async def _flush_later(self):
+        while self._buffer:
+            await self._clock.sleep(self._flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """
+        write and fsync the buffered entries
+        """
+        async with self._flush_lock:
+            lines, snapshot = self._take()
+            if lines or snapshot is not None:
+                await asyncio.to_thread(self._write, lines, snapshot)
+
+    def flush_sync(self):
+        """
+        write and fsync the buffered entries from the calling thread, only when no flush is running
+        """
+        self._write(*self._take())
+
+    async def compact(self):
+        """
+        write a snapshot of the state and truncate the journal now
+        """
+        self._since_snapshot = self._snapshot_every
+        await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -2,51 +2,129 @@
 import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
+import chainflip.utils.memory as memory
+import chainflip.utils.metrics as metrics
 
-from chainflip.exchange.rpc import RpcCall
+from typing import Optional
+
+from chainflip.exchange.cache import BlockCache
+from chainflip.exchange.rpc import HedgePolicy, RpcCall
 from chainflip.utils.data_types import LimitOrder, RangeOrder
+from chainflip.utils.object_pool import ObjectPool
 
 
 logger = log.setup_custom_logger('root')
 
 
+class OrderBookSnapshot(object):
+    """
+    Orders of one pool order book refresh.
+    """
+
+    __slots__ = ('bids', 'asks', 'range_orders', 'lp_open_orders', 'top_bid', 'top_ask')
+
+    def __init__(self):
+        self.bids = list()
+        self.asks = list()
+        self.range_orders = list()
+        self.lp_open_orders = list()
+        self.top_bid = None
+        self.top_ask = None
+
+    def clear(self):
+        self.bids = list()
+        self.asks = list()
+        self.range_orders = list()
+        self.lp_open_orders = list()
+        self.top_bid = None
+        self.top_ask = None
+
+
 class OrderBook(object):
     """
     Simple order book.
+    The order book is double buffered: a refresh is written into the snapshot from two refreshes ago, so the
+    orders of the previous snapshot stay valid for one more refresh and nothing accumulates across refreshes.
+    Limit order entries of the overwritten snapshot are recycled through an object pool, except the orders of
+    our own lp account which are passed on to the OMS.
     """
-    def __init__(self, base_asset: str = "BTC", lp_id: str = None):
+    def __init__(self,
+                 base_asset: str = "BTC",
+                 lp_id: str = None,
+                 hedge: Optional[HedgePolicy] = None,
+                 cache: Optional[BlockCache] = None):
+        """
+        :param hedge: optional HedgePolicy, hedges the order book reads across the RPC nodes when given
+        :param cache: optional BlockCache, shares the order book reads of a block with other components
+        """
         self._base_asset = base_asset
         self._lp_id = lp_id
-        self._bids = list()
-        self._asks = list()
-        self._range_orders = list()
-        self._lp_open_orders = list()
-        self._top_ask = None
-        self._top_bid = None
-        self._rpc_calls = RpcCall(lp_id)
+        self._snapshot = OrderBookSnapshot()
+        self._previous = OrderBookSnapshot()
+        self._entries = ObjectPool(LimitOrder)
+        self._rpc_calls = RpcCall(lp_id, hedge=hedge, cache=cache)
         self._response = None
+        component = f'order_book.{base_asset}'
+        memory.track(component, 'bids', lambda book: len(book._snapshot.bids) + len(book._previous.bids), self)
+        memory.track(component, 'asks', lambda book: len(book._snapshot.asks) + len(book._previous.asks), self)
+        memory.track(
+            component,
+            'range_orders',
+            lambda book: len(book._snapshot.range_orders) + len(book._previous.range_orders),
+            self
+        )
+        memory.track(component, 'lp_open_orders', lambda book: len(book._snapshot.lp_open_orders), self)
+        memory.track(component, 'entry_pool', lambda book: book._entries.size, self)
 
     @property
     def top_bid(self) -> LimitOrder:
-        return self._top_bid
+        return self._snapshot.top_bid
 
     @property
     def top_ask(self) -> LimitOrder:
-        return self._top_ask
+        return self._snapshot.top_ask
+
+    @property
+    def bids(self) -> list:
+        return self._snapshot.bids
+
+    @property
+    def asks(self) -> list:
+        return self._snapshot.asks
+
+    @property
+    def range_orders(self) -> list:
+        return self._snapshot.range_orders
 
     @property
     def open_lp_orders(self):
-        return self._lp_open_orders
+        return self._snapshot.lp_open_orders
 
     @top_bid.setter
     def top_bid(self, bid: float):
-        self._top_bid = bid
+        self._snapshot.top_bid = bid
 
     @top_ask.setter
     def top_ask(self, ask: float):
-        self._top_ask = ask
+        self._snapshot.top_ask = ask
+
+    def _next_snapshot(self) -> OrderBookSnapshot:
+        """
+        recycle the snapshot from two refreshes ago, handing its limit orders back to the pool
+        """
+        snapshot = self._previous
+        # the tops point at entries about to be reused, never leave them readable once released
+        snapshot.top_bid = None
+        snapshot.top_ask = None
+        for entries in (snapshot.bids, snapshot.asks):
+            self._entries.release_all([entry for entry in entries if entry.lp_account != self._lp_id])
+        snapshot.clear()
+        return snapshot
 
     def _process_order_book(self, data: dict):
+        snapshot = self._next_snapshot()
+        lp_open_orders = snapshot.lp_open_orders
+        acquire = self._entries.acquire
         bids = list()
         asks = list()
 
@@ -56,18 +134,19 @@ class OrderBook(object):
             if amount == 0:
                 continue
             else:
-                tmp = LimitOrder(
-                    amount=amount,
-                    price=formatter.tick_to_price(bid['tick'], self._base_asset),
-                    base_asset=self._base_asset,
-                    quote_asset='USDC',
-                    id=bid['id'],
-                    side=CONSTANTS.Side.BUY,
-                    lp_account=bid['lp']
+                tmp = acquire(
+                    amount,
+                    price,
+                    self._base_asset,
+                    'USDC',
+                    bid['id'],
+                    CONSTANTS.Side.BUY,
+                    None,
+                    bid['lp']
                 )
                 bids.append(tmp)
                 if tmp.lp_account == self._lp_id:
-                    self._lp_open_orders.append(tmp)
+                    lp_open_orders.append(tmp)
 
         for ask in data['limit_orders']['asks']:
             price = formatter.tick_to_price(ask['tick'], self._base_asset)
@@ -75,18 +154,19 @@ class OrderBook(object):
             if amount == 0:
                 continue
             else:
-                tmp = LimitOrder(
-                    amount=amount,
-                    price=price,
-                    base_asset=self._base_asset,
-                    quote_asset='USDC',
-                    id=ask['id'],
-                    side=CONSTANTS.Side.SELL,
-                    lp_account=ask['lp']
+                tmp = acquire(
+                    amount,
+                    price,
+                    self._base_asset,
+                    'USDC',
+                    ask['id'],
+                    CONSTANTS.Side.SELL,
+                    None,
+                    ask['lp']
                 )
                 asks.append(tmp)
                 if tmp.lp_account == self._lp_id:
-                    self._lp_open_orders.append(tmp)
+                    lp_open_orders.append(tmp)
 
         for range_order in data['range_orders']:
             tmp = RangeOrder(
@@ -99,23 +179,31 @@ class OrderBook(object):
                 amount=range_order["liquidity"],
                 lp_account=range_order['lp']
             )
-            self._range_orders.append(tmp)
+            snapshot.range_orders.append(tmp)
             if tmp.lp_account == self._lp_id:
-                self._lp_open_orders.append(tmp)
+                lp_open_orders.append(tmp)
 
-        self._bids = sorted(bids, key=lambda x: x.price, reverse=True)
-        self._asks = sorted(asks, key=lambda x: x.price)
+        snapshot.bids = sorted(bids, key=lambda x: x.price, reverse=True)
+        snapshot.asks = sorted(asks, key=lambda x: x.price)
+
+        pair = f'{self._base_asset}-USDC'
+        metrics.ORDER_BOOK_SIZE.labels(pair, 'bids').set(len(snapshot.bids))
+        metrics.ORDER_BOOK_SIZE.labels(pair, 'asks').set(len(snapshot.asks))
+        metrics.ORDER_BOOK_SIZE.labels(pair, 'range_orders').set(len(snapshot.range_orders))
 
         try:
-            self.top_bid = self._bids[0]
+            snapshot.top_bid = snapshot.bids[0]
         except IndexError:
             logger.info("No limit order bids in current order book")
 
         try:
-            self._top_ask = self._asks[0]
+            snapshot.top_ask = snapshot.asks[0]
         except IndexError:
             logger.info("No limit order asks in current order book")
 
+        self._previous = self._snapshot
+        self._snapshot = snapshot
+
     async def _rpc_update_orderbook(self):
         try:
             self._response = await self._rpc_calls(
@@ -0,0 +1,133 @@
+from typing import Callable, Optional
+
+import chainflip.utils.logger as log
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+# order ids are unsigned 64 bit integers: the top bits select the partition of a strategy, the low bits count
+ID_PARTITION_SHIFT = 48
+ID_SEQUENCE_MASK = (1 << ID_PARTITION_SHIFT) - 1
+MAX_PARTITIONS = 1 << (64 - ID_PARTITION_SHIFT)
+
+
+def normalise_order_id(order_id) -> Optional[int]:
+    """
+    :param order_id: order id as sent or as reported by the exchange, integer or hex string
+    :return: integer order id, None if it is not numeric
+    """
+    if isinstance(order_id, int):
+        return order_id
+    try:
+        return int(str(order_id), 0)
+    except ValueError:
+        return None
+
+
+class IdPartition(object):
+    """
+    Order id space of one strategy instance, with the callbacks the OMS routes the strategy's acks and fills to.
+    """
+
+    def __init__(self,
+                 name: str,
+                 index: int,
+                 next_sequence: int,
+                 on_ack: Optional[Callable] = None,
+                 on_fill: Optional[Callable[[dict], None]] = None,
+                 on_block: Optional[Callable[[int], None]] = None):
+        self.name = name
+        self.index = index
+        self.on_ack = on_ack
+        self.on_fill = on_fill
+        self.on_block = on_block
+        self._base = index << ID_PARTITION_SHIFT
+        self._next = next_sequence
+
+    def __str__(self):
+        return f'IdPartition - {self.name}: index = {self.index}, next = {self._next}'
+
+    def next_id(self) -> int:
+        """
+        :return: integer order id never handed out before in this partition
+        """
+        sequence = self._next
+        if sequence > ID_SEQUENCE_MASK:
+            raise OverflowError(f'Order id partition {self.name} is exhausted')
+        self._next += 1
+        return self._base | sequence
+
+    def owns(self, order_id) -> bool:
+        order_id = normalise_order_id(order_id)
+        return order_id is not None and order_id >> ID_PARTITION_SHIFT == self.index
+
+
+class OrderIdAllocator(object):
+    """
+    Central order id allocator for the strategies sharing an LP account.
+    Every strategy instance registers under a stable name and gets a partition of the id space, so strategies
+    cannot overwrite each other's orders, and the partition of an id is its top bits, so the owner of an ack
+    or fill is found in O(1). Partition 0 is left to ids not handed out by the allocator.
+    With a journal, partitions and the highest id allocated in each are journaled and a restart continues
+    after them. Without one, a partition's sequence starts at the current time in milliseconds, which is past
+    the ids of a previous run unless it allocated more than one id per millisecond on average.
+    """
+
+    def __init__(self, journal=None, clock: Optional[Clock] = None):
+        """
+        :param journal: optional OrderJournal the partitions are journaled to and recovered from
+        """
+        self._journal = journal
+        self._clock = clock if clock is not None else get_clock()
+        self._partitions = dict()
+        self._by_name = dict()
+
+    @property
+    def partitions(self) -> dict:
+        return self._by_name
+
+    def register(self,
+                 name: str,
+                 on_ack: Optional[Callable] = None,
+                 on_fill: Optional[Callable[[dict], None]] = None,
+                 on_block: Optional[Callable[[int], None]] = None) -> IdPartition:
+        """
+        :param name: str stable name of the strategy instance, e.g. 'stream-ETH'
+        :param on_ack: optional callable receiving the strategy's orders once acknowledged
+        :param on_fill: optional callable receiving the strategy's fills from the order fills stream
+        :param on_block: optional callable receiving the number of every block of the order fills stream
+        :return: IdPartition to allocate ids from
+        """
+        if name in self._by_name:
+            raise ValueError(f'Order id partition {name} is already registered')
+        journaled = self._journal.state.partitions if self._journal is not None else dict()
+        index = journaled.get(name)
+        if index is None:
+            used = set(self._partitions) | set(journaled.values())
+            index = next((index for index in range(1, MAX_PARTITIONS) if index not in used), None)
+            if index is None:
+                raise ValueError('No order id partition left')
+            if self._journal is not None:
+                self._journal.record('partition', name=name, partition=index)
+        next_sequence = int(self._clock.time() * 1000) & ID_SEQUENCE_MASK
+        if self._journal is not None:
+            last = self._journal.state.last_order_ids.get(index)
+            if last is not None:
+                next_sequence = max(next_sequence, (last & ID_SEQUENCE_MASK) + 1)
+        partition = IdPartition(name, index, next_sequence, on_ack=on_ack, on_fill=on_fill, on_block=on_block)
+        self._partitions[index] = partition
+        self._by_name[name] = partition
+        logger.info('Registered %s', partition)
+        return partition
+
+    def owner(self, order_id) -> Optional[IdPartition]:
+        """
+        :param order_id: order id, integer or hex string
+        :return: IdPartition the id was allocated from, None for ids not handed out by the allocator
+        """
+        order_id = normalise_order_id(order_id)
+        if order_id is None:
+            return None
+        return self._partitions.get(order_id >> ID_PARTITION_SHIFT)
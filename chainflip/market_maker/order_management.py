@@ -1,17 +1,26 @@
 import asyncio
+import dataclasses
 import time
 
-from datetime import datetime
-from typing import Union, Optional
+from typing import Callable, Union, Optional
 
 import chainflip.utils.logger as log
+import chainflip.utils.memory as memory
+import chainflip.utils.metrics as metrics
+import chainflip.utils.tracing as tracing
 import chainflip.utils.constants as CONSTANTS
 
-from chainflip.utils.constants import APICommands, RPCCommands
+from chainflip.utils.clock import Clock, get_clock
+from chainflip.utils.constants import APICommands, RPCCommands, RequestPriority
+from chainflip.market_maker.journal import OrderJournal, order_to_dict
+from chainflip.market_maker.order_ids import OrderIdAllocator
 from chainflip.market_maker.order_tracker import OrderTracker
 from chainflip.exchange.api import ApiCall
+from chainflip.exchange.stream import ChainflipUpdates
 from chainflip.exchange.rpc import RpcCall
+from chainflip.exchange.scheduler import RequestScheduler
 from chainflip.utils.data_types import LimitOrder, RangeOrder
+from chainflip.utils.readiness import Readiness
 
 
 logger = log.setup_custom_logger('root')
@@ -28,14 +37,38 @@ class OMS:
             lp_id: str,
             erc20_withdrawal_address: Optional[str] = None,
             btc_withdrawal_address: Optional[str] = None,
-            dot_withdrawal_address: Optional[str] = None
+            dot_withdrawal_address: Optional[str] = None,
+            api_calls: Optional[ApiCall] = None,
+            balance_reconcile_interval: float = 60,
+            journal: Optional[OrderJournal] = None,
+            order_ids: Optional[OrderIdAllocator] = None,
+            scheduler: Optional[RequestScheduler] = None,
+            clock: Optional[Clock] = None
     ):
         self._id = market_maker_id
         self._lp_account = lp_id
-        self._api_calls = ApiCall(user_id=self._id)
+        self._api_calls = api_calls if api_calls is not None else ApiCall(user_id=self._id)
         self._rpc_calls = RpcCall(user_id=self._id)
-        self._order_tracker = OrderTracker()
+        self._clock = clock if clock is not None else get_clock()
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler(clock=self._clock)
+        self._order_tracker = OrderTracker(reconcile_interval=balance_reconcile_interval, clock=self._clock)
+        self._balances_readiness = Readiness('asset balances')
+        self._journal = journal
+        self._order_ids = order_ids if order_ids is not None else OrderIdAllocator(journal, clock=self._clock)
+        self._updates_stream = ChainflipUpdates(
+            lp_id, fill_handler=self.apply_fill, block_handler=self._route_block, clock=self._clock
+        )
         self._response = None
+        self._worst_time_to_flat = None
+        self._in_flight = {
+            'limit_order': metrics.OMS_IN_FLIGHT.labels('limit_order'),
+            'range_order': metrics.OMS_IN_FLIGHT.labels('range_order')
+        }
+        # read through weak references, the registry never keeps an OMS alive
+        metrics.OMS_OPEN_ORDERS.labels('limit_order').set_function(lambda oms: len(oms.open_limit_orders), owner=self)
+        metrics.OMS_OPEN_ORDERS.labels('range_order').set_function(lambda oms: len(oms.open_range_orders), owner=self)
+        memory.track('order_tracker', 'limit_orders', lambda oms: len(oms.open_limit_orders), owner=self)
+        memory.track('order_tracker', 'range_orders', lambda oms: len(oms.open_range_orders), owner=self)
         self._withdrawal_addresses = {
             'ETH': erc20_withdrawal_address,
             'BTC': btc_withdrawal_address,
@@ -45,6 +78,10 @@ class OMS:
         }
         logger.info(f'Initialised Market Maker with id: {self._id}')
 
+    @property
+    def lp_account(self) -> str:
+        return self._lp_account
+
     @property
     def open_limit_orders(self) -> dict:
         return self._order_tracker.limit_orders
@@ -55,12 +92,56 @@ class OMS:
 
     @property
     def book_balance(self) -> dict:
+        """
+        free balance per asset from the local ledger, net of the funds reserved by open and in flight orders
+        """
         return self._order_tracker.balance
 
-    async def _api_set_limit_order(self, limit_order: LimitOrder):
+    @property
+    def journal(self) -> Optional[OrderJournal]:
+        return self._journal
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        return self._scheduler
+
+    @property
+    def order_ids(self) -> OrderIdAllocator:
+        """
+        strategies register here for their order ids and to receive their acks and fills
+        """
+        return self._order_ids
+
+    @property
+    def updates_stream(self) -> ChainflipUpdates:
+        """
+        order fills stream of the lp account, shared by the strategies trading through this OMS
+        """
+        return self._updates_stream
+
+    @property
+    def worst_time_to_flat(self) -> Optional[float]:
+        """
+        longest time in seconds a cancel-all took to get every order acknowledged closed, None before the first one
+        """
+        return self._worst_time_to_flat
+
+    @property
+    def readiness(self) -> Readiness:
+        """
+        ready once the first asset balances are loaded
+        """
+        return self._balances_readiness
+
+    async def _api_set_limit_order(self, limit_order: LimitOrder, priority: RequestPriority):
+        self._in_flight['limit_order'].inc()
+        trace = self._trace_submission()
+        submitted = time.perf_counter()
         try:
             if limit_order.side == CONSTANTS.Side.BUY:
-                self._response = await self._api_calls(
+                self._response = await self._scheduler.submit(
+                    priority,
+                    self._api_calls,
                     APICommands.SetLimitOrder,
                     limit_order.base_asset,
                     limit_order.quote_asset,
@@ -69,9 +150,11 @@ class OMS:
                     limit_order.price,
                     limit_order.amount
                 )
-                limit_order.timestamp = time.time()
+                limit_order.timestamp = self._clock.time()
             elif limit_order.side == CONSTANTS.Side.SELL:
-                self._response = await self._api_calls(
+                self._response = await self._scheduler.submit(
+                    priority,
+                    self._api_calls,
                     APICommands.SetLimitOrder,
                     limit_order.base_asset,
                     limit_order.quote_asset,
@@ -80,14 +163,23 @@ class OMS:
                     limit_order.price,
                     limit_order.amount
                 )
-                limit_order.timestamp = time.time()
+                limit_order.timestamp = self._clock.time()
+            self._trace_acknowledgement(trace, submitted, limit_order.id, limit_order.amount)
         except Exception as e:
             logger.error(f'_api_set_limit_order: {e}')
-
-    async def _api_set_range_order(self, range_order: RangeOrder):
+            self._response = {'error': {'message': str(e)}}
+        finally:
+            self._in_flight['limit_order'].dec()
+
+    async def _api_set_range_order(self, range_order: RangeOrder, priority: RequestPriority):
+        self._in_flight['range_order'].inc()
+        trace = self._trace_submission()
+        submitted = time.perf_counter()
         try:
             if range_order.type == CONSTANTS.RangeOrderType.LIQUIDITY:
-                self._response = await self._api_calls(
+                self._response = await self._scheduler.submit(
+                    priority,
+                    self._api_calls,
                     APICommands.SetRangeOrderByLiquidity,
                     range_order.base_asset,
                     range_order.quote_asset,
@@ -96,9 +188,11 @@ class OMS:
                     range_order.lower_price,
                     range_order.upper_price
                 )
-                range_order.timestamp = time.time()
+                range_order.timestamp = self._clock.time()
             else:
-                self._response = await self._api_calls(
+                self._response = await self._scheduler.submit(
+                    priority,
+                    self._api_calls,
                     APICommands.SetRangeOrderByAmounts,
                     range_order.base_asset,
                     range_order.quote_asset,
@@ -110,9 +204,36 @@ class OMS:
                     range_order.lower_price,
                     range_order.upper_price
                 )
-                range_order.timestamp = time.time()
+                range_order.timestamp = self._clock.time()
+            self._trace_acknowledgement(trace, submitted, range_order.id, range_order.amount)
         except Exception as e:
             logger.error(f'_api_set_range_order: {e}')
+            self._response = {'error': {'message': str(e)}}
+        finally:
+            self._in_flight['range_order'].dec()
+
+    @staticmethod
+    def _trace_submission() -> Optional[tracing.Trace]:
+        """
+        record the decision stage of the trace the order was placed under, if any
+        """
+        trace = tracing.current_trace()
+        if trace is not None:
+            tracing.get_tracer().record(trace, 'decision', trace.start)
+        return trace
+
+    def _trace_acknowledgement(self, trace: Optional[tracing.Trace], submitted: float, order_id, amount: float):
+        """
+        record the submit to ack and tick to ack stages and remember the order so its fill can be traced
+        """
+        if trace is None or not self._response or 'error' in self._response:
+            return
+        tracer = tracing.get_tracer()
+        acknowledged = time.perf_counter()
+        tracer.record(trace, 'submit_to_ack', submitted, acknowledged, order_id=str(order_id))
+        tracer.record(trace, 'tick_to_ack', trace.start, acknowledged, order_id=str(order_id))
+        if amount:
+            tracer.bind_order(order_id, trace, acknowledged)
 
     def _check_for_error_response(self, function_name: str) -> bool:
         """
@@ -131,12 +252,124 @@ class OMS:
         get current LP balances on the Chainflip Perseverance, updates balances and logs response
         :return:
         """
-        self._response = await self._api_calls(APICommands.AssetBalances)
+        self._response = await self._scheduler.submit(RequestPriority.QUERY, self._api_calls, APICommands.AssetBalances)
         #  self._response = await self._rpc_calls(RPCCommands.AccountInfo, self._lp_account)
         if self._check_for_error_response(function_name='get_asset_balances'):
             return
-        self._order_tracker.update_balance(self._response)
-        logger.info(f'Current asset balances: {self.book_balance}')
+        drift = self._order_tracker.update_balance(self._response)
+        if drift:
+            logger.warning('Ledger drifted from the exchange balances, corrected by: %s', drift)
+        self._balances_readiness.set()
+        logger.info('Current asset balances: %s', self.book_balance)
+
+    async def reconcile_balances(self, force: bool = False) -> bool:
+        """
+        reconcile the local ledger against lp_asset_balances when it is due (every balance_reconcile_interval
+        seconds) or drifted, instead of polling the balances every cycle
+        :param force: reconcile now
+        :return: True if the balances were requested
+        """
+        if not force and not self._order_tracker.ledger.due():
+            return False
+        await self.get_asset_balances()
+        return True
+
+    def apply_fill(self, fill: dict):
+        """
+        apply an own fill from the order fills stream to the ledger
+        :param fill: dict with a limit_order or range_order fill
+        """
+        if 'limit_order' in fill:
+            try:
+                self._order_tracker.apply_fill(fill['limit_order'])
+            except Exception as e:
+                logger.error(f'apply_fill: {e}')
+                self._order_tracker.ledger.mark_drifted()
+        for order_type in ('limit_order', 'range_order'):
+            if order_type in fill:
+                if self._journal is not None:
+                    self._journal.fill(order_type, fill[order_type])
+                owner = self._order_ids.owner(fill[order_type]['id'])
+                if owner is not None and owner.on_fill is not None:
+                    owner.on_fill(fill)
+
+    def _route_block(self, block_number: int, fills: list):
+        """
+        tell every strategy a block of the order fills stream was processed
+        """
+        for partition in self._order_ids.partitions.values():
+            if partition.on_block is not None:
+                partition.on_block(block_number)
+
+    def _reserve(self, order, function_name: str) -> bool:
+        """
+        reserve the funds of an order and journal the intent before it is submitted
+        """
+        if not self._order_tracker.reserve(order):
+            logger.warning('%s: insufficient free balance for order %s, not sending it', function_name, order.id)
+            return False
+        if self._journal is not None:
+            self._journal.intent(order)
+        return True
+
+    def _rejected(self, order, previous: Optional[list] = None):
+        """
+        release the funds of a new order the exchange rejected, or put back the reservations an amended order
+        held before, and check the balances on the next reconciliation
+        :param previous: optional list of the reservations of an amended order, from OrderTracker.reservations
+        """
+        if previous is None:
+            self._order_tracker.release(order)
+        else:
+            self._order_tracker.restore(previous)
+        self._order_tracker.ledger.mark_drifted()
+        if self._journal is not None:
+            self._journal.reject(order)
+
+    def _journal_entry(self, event: str, order):
+        """
+        journal the outcome of an order request: ack, amend or cancel. Acks and amends are passed on to the
+        strategy owning the order
+        """
+        if self._journal is not None:
+            self._journal.record(event, order=order_to_dict(order))
+        if event != 'cancel':
+            owner = self._order_ids.owner(order.id)
+            if owner is not None and owner.on_ack is not None:
+                owner.on_ack(order)
+
+    async def recover_orders(self, orders: list, scope: Optional[Callable[[object], bool]] = None) -> list:
+        """
+        reconcile the orders recovered from the journal with the orders open on the exchange: journaled orders
+        still open are tracked again, journaled orders closed while stopped are forgotten and only the open
+        orders missing from the journal are cancelled. Without a journal every open order is cancelled
+        :param orders: list of LimitOrder and RangeOrder open for our lp account
+        :param scope: optional callable selecting the journaled orders the given orders cover, e.g. one pool's,
+        all by default. Strategies sharing the OMS each recover their own pool
+        :return: list of recovered orders still open on the exchange
+        """
+        if self._journal is None:
+            await self.check_order_book_and_cancel(orders, scope=scope)
+            return list()
+        on_exchange = {self._order_tracker.key(order): order for order in orders}
+        recovered = list()
+        for order in self._journal.state.orders():
+            if scope is not None and not scope(order):
+                continue
+            if self._order_tracker.key(order) in on_exchange:
+                self._order_tracker.adopt(order)
+                recovered.append(order)
+            else:
+                logger.info('Journaled order %s was closed while stopped', order.id)
+                self._journal.cancel(order)
+        known = {self._order_tracker.key(order) for order in recovered}
+        unknown = [order for key, order in on_exchange.items() if key not in known]
+        for order in unknown:
+            logger.info('Open order %s is not in the order journal. Deleting.', order.id)
+        await self.cancel_limit_orders([order for order in unknown if isinstance(order, LimitOrder)])
+        await self.cancel_range_orders([order for order in unknown if isinstance(order, RangeOrder)])
+        logger.info('Recovered %s open orders from the order journal', len(recovered))
+        return recovered
 
     async def withdraw_asset(self, asset: str, amount: Union[float, int] = 10000000):
         """
@@ -154,16 +387,20 @@ class OMS:
         create (mint) a limit order on Chainflip Perseverance.
         :param limit_order: LimitOrder type
         """
-        logger.info(f'Chainflip v.{CONSTANTS.version}: creating limit order - {limit_order}')
-        await self._api_set_limit_order(limit_order)
+        logger.info('Chainflip v.%s: creating limit order - %s', CONSTANTS.version, limit_order)
+        if not self._reserve(limit_order, function_name='create_limit_order'):
+            return
+        await self._api_set_limit_order(limit_order, RequestPriority.NEW)
 
         if self._check_for_error_response(function_name='create_limit_order'):
+            self._rejected(limit_order)
             return
         if self._response:
-            limit_order.timestamp = datetime.now()
+            limit_order.timestamp = self._clock.now()
             try:
                 self._order_tracker.add_limit_order(limit_order)
-                logger.info(f'Created new limit order: id={limit_order.id}')
+                self._journal_entry('ack', limit_order)
+                logger.info('Created new limit order: id=%s', limit_order.id)
             except Exception as e:
                 logger.error(f'create_limit_order: {e}')
 
@@ -176,9 +413,10 @@ class OMS:
             limit_order = self._order_tracker.get_limit_order_by_key(limit_order.id)
         except KeyError:
             logger.error(f"delete_limit_order: Attempting to delete limit order id={limit_order.id} not in order book")
+            self._order_tracker.ledger.mark_drifted()
 
         limit_order.amount = 0
-        await self._api_set_limit_order(limit_order)
+        await self._api_set_limit_order(limit_order, RequestPriority.CANCEL)
 
         if self._check_for_error_response(function_name='delete_limit_order'):
             return
@@ -188,8 +426,10 @@ class OMS:
             except Exception as e:
                 logger.error(f'delete_limit_order {e}')
                 return
+            finally:
+                self._journal_entry('cancel', limit_order)
 
-            logger.info(f'Limit order deleted: {limit_order.id}')
+            logger.info('Limit order deleted: %s', limit_order.id)
 
     async def update_limit_order(self,
                                  limit_order: LimitOrder,
@@ -202,19 +442,28 @@ class OMS:
         :param price: float optional new price
         :param amount: float optional new amount
         """
-        logger.info(f'Chainflip v.{CONSTANTS.version}: updating limit order - {limit_order.id}')
-        if price:
-            limit_order.price = price
-        if amount:
-            limit_order.amount = amount
-        await self._api_set_limit_order(limit_order)
+        logger.info('Chainflip v.%s: updating limit order - %s', CONSTANTS.version, limit_order.id)
+        # the order keeps its values and reservation until the exchange accepted the amend
+        previous = self._order_tracker.reservations(limit_order)
+        amended = dataclasses.replace(
+            limit_order, price=price or limit_order.price, amount=amount or limit_order.amount
+        )
+        if not self._reserve(amended, function_name='update_limit_order'):
+            self._order_tracker.restore(previous)
+            return
+        await self._api_set_limit_order(amended, RequestPriority.AMEND)
 
         if self._check_for_error_response(function_name='update_limit_order'):
+            self._rejected(amended, previous)
             return
         if self._response:
+            limit_order.price = amended.price
+            limit_order.amount = amended.amount
+            limit_order.timestamp = amended.timestamp
             try:
                 self._order_tracker.add_limit_order(limit_order)
-                logger.info(f'Updated limit order: id={limit_order.id}')
+                self._journal_entry('amend', limit_order)
+                logger.info('Updated limit order: id=%s', limit_order.id)
             except Exception as e:
                 logger.error(f'update_limit_order: {e}')
 
@@ -223,15 +472,19 @@ class OMS:
         create (mint) a new range order on Chainflip Perseverance.
         :param range_order: RangeOrder type
         """
-        logger.info(f'Chainflip v.{CONSTANTS.version}: creating range order - {range_order}')
-        await self._api_set_range_order(range_order)
+        logger.info('Chainflip v.%s: creating range order - %s', CONSTANTS.version, range_order)
+        if not self._reserve(range_order, function_name='create_new_range_order'):
+            return
+        await self._api_set_range_order(range_order, RequestPriority.NEW)
 
         if self._check_for_error_response(function_name='create_new_range_order'):
+            self._rejected(range_order)
             return
         if self._response:
             try:
                 self._order_tracker.add_range_order(range_order)
-                logger.info(f'Create new range order: id={range_order.id}')
+                self._journal_entry('ack', range_order)
+                logger.info('Create new range order: id=%s', range_order.id)
             except Exception as e:
                 logger.error(f'create_range_order: {e}')
 
@@ -240,19 +493,21 @@ class OMS:
         delete (burn) a range order on Chainflip Perseverance
         :param range_order: RangeOrder type
         """
-        logger.info(f'Chainflip v.{CONSTANTS.version}: deleting range order - {range_order.id}')
+        logger.info('Chainflip v.%s: deleting range order - %s', CONSTANTS.version, range_order.id)
         range_order.amount = 0
         range_order.type = CONSTANTS.RangeOrderType.LIQUIDITY
-        await self._api_set_range_order(range_order)
+        await self._api_set_range_order(range_order, RequestPriority.CANCEL)
 
         if self._check_for_error_response(function_name='create_new_range_order'):
             return
         if self._response:
             try:
                 self._order_tracker.remove_range_order_by_key(range_order.id)
-                logger.info(f'Deleted range order: id={range_order.id}')
+                logger.info('Deleted range order: id=%s', range_order.id)
             except Exception as e:
                 logger.error(f'delete_range_order: {e}')
+            finally:
+                self._journal_entry('cancel', range_order)
 
     async def update_range_order(self,
                                  range_order: RangeOrder,
@@ -266,21 +521,31 @@ class OMS:
         :param lower_price: Optional float lower price
         :param upper_price: Optional float upper price
         """
-        logger.info(f'Chainflip v.{CONSTANTS.version}: update range order - {range_order.id}')
-        if amount:
-            range_order.amount = amount
+        logger.info('Chainflip v.%s: update range order - %s', CONSTANTS.version, range_order.id)
+        # the order keeps its values and reservations until the exchange accepted the amend
+        previous = self._order_tracker.reservations(range_order)
+        amended = dataclasses.replace(range_order, amount=amount or range_order.amount)
         if lower_price and upper_price:
-            range_order.lower_price = lower_price
-            range_order.upper_price = upper_price
+            amended.lower_price = lower_price
+            amended.upper_price = upper_price
 
-        await self._api_set_range_order(range_order)
+        if not self._reserve(amended, function_name='update_range_order'):
+            self._order_tracker.restore(previous)
+            return
+        await self._api_set_range_order(amended, RequestPriority.AMEND)
 
         if self._check_for_error_response(function_name='update_range_order'):
+            self._rejected(amended, previous)
             return
         if self._response:
+            range_order.amount = amended.amount
+            range_order.lower_price = amended.lower_price
+            range_order.upper_price = amended.upper_price
+            range_order.timestamp = amended.timestamp
             try:
                 self._order_tracker.add_range_order(range_order)
-                logger.info(f'Updated range order: id={range_order.id}')
+                self._journal_entry('amend', range_order)
+                logger.info('Updated range order: id=%s', range_order.id)
             except Exception as e:
                 logger.error(f'update_range_order: {e}')
 
@@ -324,12 +589,104 @@ class OMS:
         for order in range_orders:
             asyncio.create_task(self.delete_range_order(order))
 
-    async def check_order_book_and_cancel(self, orders: list):
+    async def cancel_all(self,
+                         orders: Optional[list] = None,
+                         trigger: str = 'manual',
+                         timeout: float = 10,
+                         retry_interval: float = 0.25,
+                         include_tracked: bool = True,
+                         scope: Optional[Callable[[object], bool]] = None) -> dict:
+        """
+        cancel every order tracked by the OMS, across all pools, with one batched request, and resend the cancels
+        not acknowledged until all are or timeout seconds have passed
+        :param orders: optional list of LimitOrder and RangeOrder open on the exchange, e.g. from
+        OrderBook.open_lp_orders, cancelled along with the tracked orders
+        :param trigger: str reason for the cancel-all, label of the metrics
+        :param timeout: float seconds to keep resending cancels
+        :param retry_interval: float seconds between batches
+        :param include_tracked: False to only cancel the given orders that are not tracked by the OMS
+        :param scope: optional callable selecting the tracked orders cancelled, e.g. one pool's, all by default
+        :return: dict with the cancelled orders, the orders still outstanding and the time to flat in seconds
+        """
+        start = time.perf_counter()
+        deadline = self._clock.time() + timeout
+        tracked = dict()
+        for orders_by_id in (self._order_tracker.limit_orders, self._order_tracker.range_orders):
+            for order in orders_by_id.values():
+                tracked[OrderTracker.key(order)] = order
+        outstanding = dict()
+        if include_tracked:
+            outstanding = {key: order for key, order in tracked.items() if scope is None or scope(order)}
+        for order in orders or ():
+            key = OrderTracker.key(order)
+            if key not in tracked:
+                outstanding[key] = order
+        logger.warning('Cancel-all (%s): cancelling %s orders', trigger, len(outstanding))
+
+        cancelled = list()
+        attempts = 0
+        while outstanding:
+            attempts += 1
+            batch = list(outstanding.items())
+            try:
+                responses = await self._scheduler.submit(
+                    RequestPriority.CANCEL, self._api_calls, APICommands.CancelOrders, [order for _, order in batch]
+                )
+            except Exception as e:
+                logger.error('Cancel-all (%s): batch %s failed: %s', trigger, attempts, e)
+                responses = None
+            if isinstance(responses, list):
+                for (key, order), response in zip(batch, responses):
+                    if 'error' in response:
+                        logger.error(
+                            'Cancel-all (%s): order %s not cancelled: %s', trigger, order.id, response['error']
+                        )
+                        continue
+                    del outstanding[key]
+                    self._closed(order)
+                    cancelled.append(order)
+            if not outstanding or self._clock.time() + retry_interval > deadline:
+                break
+            await self._clock.sleep(retry_interval)
+
+        time_to_flat = time.perf_counter() - start
+        if outstanding:
+            logger.error(
+                'Cancel-all (%s): %s orders still open after %s batches and %.3fs', trigger, len(outstanding),
+                attempts, time_to_flat
+            )
+            metrics.OMS_CANCEL_ALL.labels(trigger, 'timeout').inc()
+        else:
+            logger.warning('Cancel-all (%s): flat after %s batches in %.3fs', trigger, attempts, time_to_flat)
+            metrics.OMS_CANCEL_ALL.labels(trigger, 'flat').inc()
+            metrics.OMS_TIME_TO_FLAT.labels(trigger).observe(time_to_flat)
+            self._worst_time_to_flat = max(self._worst_time_to_flat or 0.0, time_to_flat)
+        return {'cancelled': cancelled, 'outstanding': list(outstanding.values()), 'time_to_flat': time_to_flat}
+
+    def _closed(self, order):
+        """
+        stop tracking an order acknowledged closed by a cancel-all
+        """
+        try:
+            if isinstance(order, LimitOrder):
+                self._order_tracker.remove_limit_order_by_key(order.id)
+            else:
+                self._order_tracker.remove_range_order_by_key(order.id)
+        except KeyError:
+            pass
+        self._journal_entry('cancel', order)
+
+    async def check_order_book_and_cancel(self, orders: list, scope: Optional[Callable[[object], bool]] = None):
         """
         check the order book from the exchange, if any orders exist then cancel
         change this logic if you require a different behaviour
         :param orders: list of LimitOrder active orders
+        :param scope: optional callable selecting the tracked orders the order book covers, e.g. one pool's, all
+        by default. Tracked orders outside the scope are left alone
         """
+        for dropped in self._order_tracker.reconcile(orders, scope=scope):
+            logger.warning('Order %s is no longer open on the exchange, no longer tracking it', dropped.id)
+
         open_limit_orders = list()
         open_range_orders = list()
         for order in orders:
@@ -1,16 +1,36 @@
+import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.format as formatter
 
+from typing import Callable, Optional
+
+from chainflip.market_maker.balance_ledger import BalanceLedger, order_key
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.data_types import LimitOrder, RangeOrder
 
 
 class OrderTracker(object):
     """
     Simple order book tracker.
+    Tracked orders are bounded: adding an order beyond max_orders evicts the least recently added or updated
+    one, and orders not added or updated for ttl seconds are dropped, so orders whose removal was never
+    confirmed do not accumulate. reconcile drops the orders the exchange no longer reports as open.
+    Balances are kept in a BalanceLedger: orders reserve the funds they sell before they are submitted and
+    release them once cancelled or no longer tracked, fills are applied as they stream in.
     """
-    def __init__(self):
+    def __init__(self,
+                 max_orders: int = 10000,
+                 ttl: Optional[float] = 86400,
+                 reconcile_interval: float = 60,
+                 clock: Optional[Clock] = None):
         self._limit_orders = dict()
         self._range_orders = dict()
-        self._balances = dict()
+        self._limit_orders_added = dict()
+        self._range_orders_added = dict()
+        self._max_orders = max_orders
+        self._ttl = ttl
+        self._clock = clock if clock is not None else get_clock()
+        self._ledger = BalanceLedger(reconcile_interval=reconcile_interval, clock=self._clock)
+        self.evicted = 0
 
     @property
     def limit_orders(self) -> dict:
@@ -22,7 +42,119 @@ class OrderTracker(object):
 
     @property
     def balance(self) -> dict:
-        return self._balances
+        """
+        free balance per asset, net of the funds reserved by open and in flight orders
+        """
+        return self._ledger.free
+
+    @property
+    def ledger(self) -> BalanceLedger:
+        return self._ledger
+
+    @staticmethod
+    def key(order) -> tuple:
+        """
+        :param order: LimitOrder or RangeOrder type
+        :return: tuple key identifying the order whether its id is a hex string or an integer
+        """
+        return order_key('limit_order' if isinstance(order, LimitOrder) else 'range_order', order.id)
+
+    def _reservation_keys(self, order) -> list:
+        if isinstance(order, LimitOrder):
+            return [self.key(order)]
+        return [self.key(order) + (order.base_asset,), self.key(order) + (order.quote_asset,)]
+
+    @staticmethod
+    def _sold_amounts(order) -> list:
+        """
+        :return: list of (asset, amount) the order commits
+        """
+        if isinstance(order, LimitOrder):
+            if order.side == CONSTANTS.Side.BUY:
+                return [(order.quote_asset, order.amount * order.price)]
+            return [(order.base_asset, order.amount)]
+        if order.type == CONSTANTS.RangeOrderType.ASSET:
+            return [(order.base_asset, order.max_amounts[0]), (order.quote_asset, order.max_amounts[1])]
+        # liquidity range orders are estimated as placed around the middle of their range
+        sqrt_lower, sqrt_upper = order.lower_price ** 0.5, order.upper_price ** 0.5
+        sqrt_price = ((order.lower_price + order.upper_price) / 2) ** 0.5
+        return [(order.base_asset, order.amount * (1 / sqrt_price - 1 / sqrt_upper)),
+                (order.quote_asset, order.amount * (sqrt_price - sqrt_lower))]
+
+    def reserve(self, order) -> bool:
+        """
+        Reserve the funds an order commits before it is submitted, replacing the reservation of the order it
+        updates
+        :param order: LimitOrder or RangeOrder type
+        :return: False, reserving nothing, when the free balance does not cover the order
+        """
+        keys = self._reservation_keys(order)
+        reserved = list()
+        for key, (asset, amount) in zip(keys, self._sold_amounts(order)):
+            if not self._ledger.reserve(key, asset, amount):
+                for key in reserved:
+                    self._ledger.release(key)
+                return False
+            reserved.append(key)
+        return True
+
+    def reservations(self, order) -> list:
+        """
+        :param order: LimitOrder or RangeOrder type
+        :return: list of (key, Reservation or None) the order holds, to restore them if an amend fails
+        """
+        return [(key, self._ledger.reservations.get(key)) for key in self._reservation_keys(order)]
+
+    def restore(self, reservations: list):
+        """
+        Put back the reservations of an open order whose amend was refused or rejected
+        :param reservations: list from reservations, taken before the amend
+        """
+        for key, reservation in reservations:
+            self._ledger.restore(key, reservation)
+
+    def adopt(self, order):
+        """
+        Track an order recovered after a restart and still open on the exchange, its funds are already missing
+        from the exchange balances
+        :param order: LimitOrder or RangeOrder type
+        """
+        for key, (asset, amount) in zip(self._reservation_keys(order), self._sold_amounts(order)):
+            self._ledger.adopt(key, asset, amount)
+        if isinstance(order, LimitOrder):
+            self.add_limit_order(order)
+        else:
+            self.add_range_order(order)
+
+    def release(self, order):
+        """
+        Release the funds reserved by a rejected, cancelled or closed order
+        :param order: LimitOrder or RangeOrder type
+        """
+        for key in self._reservation_keys(order):
+            self._ledger.release(key)
+
+    def _add(self, orders: dict, added: dict, order):
+        orders.pop(order.id, None)
+        added.pop(order.id, None)
+        now = self._clock.time()
+        orders[order.id] = order
+        added[order.id] = now
+        for key in self._reservation_keys(order):
+            self._ledger.acknowledge(key)
+        for evicted in self._evict(orders, added, now):
+            self.release(evicted)
+
+    def _evict(self, orders: dict, added: dict, now: float) -> list:
+        evicted = list()
+        while orders:
+            order_id = next(iter(added))
+            if len(orders) <= self._max_orders and (self._ttl is None or now - added[order_id] <= self._ttl):
+                break
+            evicted.append(orders.pop(order_id))
+            del added[order_id]
+        self.evicted += len(evicted)
+        return evicted
 
     def add_limit_order(self, order: LimitOrder):
         """
@@ -30,7 +162,7 @@ class OrderTracker(object):
         :param order: LimitOrder type
         :return:
         """
-        self._limit_orders[order.id] = order
+        self._add(self._limit_orders, self._limit_orders_added, order)
 
     def add_range_order(self, order: RangeOrder):
         """
@@ -38,17 +170,79 @@ class OrderTracker(object):
         :param order: RangeOrder type
         :return:
         """
-        self._range_orders[order.id] = order
+        self._add(self._range_orders, self._range_orders_added, order)
 
-    def update_balance(self, balances: dict):
+    def expire(self) -> list:
+        """
+        Drop orders not added or updated within the ttl
+        :return: list of dropped orders
         """
-        Updates set balances from limit and range order
+        now = self._clock.time()
+        expired = self._evict(self._limit_orders, self._limit_orders_added, now) + \
+            self._evict(self._range_orders, self._range_orders_added, now)
+        for order in expired:
+            self.release(order)
+        return expired
+
+    def reconcile(self, open_orders: list, grace: float = 12, scope: Optional[Callable[[object], bool]] = None) -> list:
+        """
+        Drop tracked orders missing from the orders the exchange reports as open for our lp account
+        :param open_orders: list of LimitOrder and RangeOrder open on the exchange
+        :param grace: seconds an order is kept after being added or updated before it is expected on the exchange
+        :param scope: optional callable selecting the tracked orders open_orders covers, e.g. one pool's, all by
+        default. Tracked orders outside the scope are never dropped
+        :return: list of dropped orders
+        """
+        open_keys = {self.key(order) for order in open_orders}
+        now = self._clock.time()
+        dropped = list()
+        for orders, added, order_type in (
+                (self._limit_orders, self._limit_orders_added, 'limit_order'),
+                (self._range_orders, self._range_orders_added, 'range_order')
+        ):
+            for order_id in [order_id for order_id, time in added.items()
+                             if order_key(order_type, order_id) not in open_keys and now - time >= grace
+                             and (scope is None or scope(orders[order_id]))]:
+                dropped.append(orders.pop(order_id))
+                del added[order_id]
+        for order in dropped:
+            self.release(order)
+        return dropped + self.expire()
+
+    def update_balance(self, balances: dict) -> dict:
+        """
+        Reconcile the ledger against the free balances reported by lp_asset_balances
         :param balances: dict of open balances from the Chainflip internal balances
-        :return:
+        :return: dict of asset to drift between the exchange and the ledger, for the assets out of tolerance
         """
+        free = dict()
         for chain in balances['result'].values():
             for asset in chain:
-                self._balances[asset['asset']] = formatter.hex_amount_to_decimal(asset['balance'], asset['asset'])
+                free[asset['asset']] = formatter.hex_amount_to_decimal(asset['balance'], asset['asset'])
+        return self._ledger.reconcile(free)
+
+    def apply_fill(self, fill: dict):
+        """
+        Apply a limit order fill from the order fills stream to the ledger. Range order fills stay in the
+        position until it is closed and are picked up by the next reconciliation
+        :param fill: dict limit_order fill, amounts are hex strings in the smallest unit of the asset
+        """
+        base_asset = formatter.asset_to_str(fill['base_asset'])
+        quote_asset = formatter.asset_to_str(fill['quote_asset'])
+        if fill['side'] == 'buy':
+            sold_asset, bought_asset = quote_asset, base_asset
+        else:
+            sold_asset, bought_asset = base_asset, quote_asset
+        bought = formatter.hex_amount_to_decimal(fill['bought'], bought_asset)
+        if 'fees' in fill:
+            bought += formatter.hex_amount_to_decimal(fill['fees'], bought_asset)
+        self._ledger.fill(
+            order_key('limit_order', fill['id']),
+            sold_asset,
+            formatter.hex_amount_to_decimal(fill['sold'], sold_asset),
+            bought_asset,
+            bought
+        )
 
     def subtract_balance(self, asset: str, balance: float):
         """
@@ -57,7 +251,7 @@ class OrderTracker(object):
         :param balance: amount to be subtracted
         :return:
         """
-        self._balances[asset] -= balance
+        self._ledger.free[asset] -= balance
 
     def get_limit_order_by_key(self, order_id: int) -> LimitOrder:
         """
@@ -80,11 +274,15 @@ class OrderTracker(object):
         Removes limit order from the limit_order dict by order id
         :param order_id: string object
         """
-        del self._limit_orders[order_id]
+        order = self._limit_orders.pop(order_id)
+        del self._limit_orders_added[order_id]
+        self.release(order)
 
     def remove_range_order_by_key(self, order_id: int):
         """
         Removes range order from the range_order dict by order id
         :param order_id: string object
         """
-        del self._range_orders[order_id]
+        order = self._range_orders.pop(order_id)
+        del self._range_orders_added[order_id]
+        self.release(order)
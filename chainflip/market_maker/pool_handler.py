@@ -4,8 +4,12 @@ import chainflip.utils.logger as log
 import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.format as formatter
 
-from chainflip.exchange.rpc import RpcCall
+from chainflip.exchange.cache import BlockCache
+from chainflip.exchange.rpc import HedgePolicy, RpcCall
 from chainflip.exchange.pools import Pool
+from typing import Optional
+
+from chainflip.utils.clock import Clock, get_clock
 from chainflip.utils.constants import RPCCommands
 
 
@@ -17,17 +21,37 @@ class ChainflipPools:
     Class object monitoring Chainflip pools.
     """
 
-    def __init__(self, user_id: str,  lp_id: str = None):
+    def __init__(self,
+                 user_id: str,
+                 lp_id: str = None,
+                 hedge: Optional[HedgePolicy] = None,
+                 cache: Optional[BlockCache] = None,
+                 clock: Optional[Clock] = None):
+        """
+        :param hedge: optional HedgePolicy, hedges the pool reads across the RPC nodes when given
+        :param cache: optional BlockCache, reads the pool state at most once per block when given
+        """
         self._id = user_id
         self._lp_id = lp_id
-        self._rpc_calls = RpcCall(self._id)
+        self._hedge = hedge
+        self._cache = cache
+        self._rpc_calls = RpcCall(self._id, hedge=hedge, cache=cache)
         self._pools = dict()
         self._response = None
+        self._clock = clock if clock is not None else get_clock()
 
     @property
     def pools(self) -> dict:
         return self._pools
 
+    @property
+    def hedge(self) -> Optional[HedgePolicy]:
+        return self._hedge
+
+    @property
+    def cache(self) -> Optional[BlockCache]:
+        return self._cache
+
     def _log_response(self, command: str):
         """
         logs the response from Chainflip
@@ -112,16 +136,17 @@ class ChainflipPools:
         """
         base_asset = formatter.asset_to_str(base_asset)
         quote_asset = formatter.asset_to_str(quote_asset)
-        pool = Pool(base_asset, quote_asset)
+        pool = Pool(base_asset, quote_asset, clock=self._clock)
         self._pools[f'{base_asset}-{quote_asset}'] = pool
         logger.info(f"Added pool {pool}")
 
-    async def update_pool_fees(self):
+    async def update_pool_fees(self, keys: Optional[list] = None):
         """
         gathers all pools and updates their fees
+        :param keys: optional list of str pool keys, e.g. 'ETH-USDC', all pools by default
         :return
         """
-        for key in self._pools.keys():
+        for key in keys if keys is not None else list(self._pools.keys()):
             pool = self._pools[key]
             await self._rpc_pool_fees(pool)
             pool.fees = self._response['result']
@@ -138,13 +163,14 @@ class ChainflipPools:
 
         await asyncio.gather(*updates)
 
-    async def start_pool_stream(self):
+    async def start_pool_stream(self, keys: Optional[list] = None):
         """
         start all pools stream
+        :param keys: optional list of str pool keys, e.g. 'ETH-USDC', all pools by default
         :return
         """
         streams = list()
-        for key in self._pools.keys():
+        for key in keys if keys is not None else list(self._pools.keys()):
             pool = self._pools[key]
             logger.info(f'Starting stream for pool price for pool: {pool}')
             streams.append(pool.start_websocket(user_id=self._id))
@@ -0,0 +1,244 @@
+import json
+
+from typing import Optional
+
+import pandas as pd
+
+import chainflip.utils.format as formatter
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+POSITION = metrics.Gauge(
+    'chainflip_position', 'Inventory, realized PnL and fee income per base asset', ('asset', 'field')
+)
+
+
+class Position(object):
+    """
+    Position in a base asset against the quote asset: signed quantity at an average cost, realized PnL of the
+    quantity closed against it and fee income, both in the quote asset.
+    """
+
+    __slots__ = ('asset', 'quantity', 'average_cost', 'realized_pnl', 'fees', 'volume', 'fills')
+
+    def __init__(self, asset: str):
+        self.asset = asset
+        self.quantity = 0.0
+        self.average_cost = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.volume = 0.0
+        self.fills = 0
+
+    def trade(self, quantity: float, price: float):
+        """
+        :param quantity: float signed base quantity, positive when bought
+        :param price: float price paid or received in the quote asset
+        """
+        self.fills += 1
+        self.volume += abs(quantity) * price
+        if self.quantity == 0 or (self.quantity > 0) == (quantity > 0):
+            total = self.quantity + quantity
+            self.average_cost = (self.quantity * self.average_cost + quantity * price) / total
+            self.quantity = total
+            return
+        closed = min(abs(quantity), abs(self.quantity))
+        direction = 1.0 if self.quantity > 0 else -1.0
+        self.realized_pnl += closed * (price - self.average_cost) * direction
+        self.quantity += quantity
+        if abs(quantity) > closed:
+            self.average_cost = price
+        elif self.quantity == 0:
+            self.average_cost = 0.0
+
+    def unrealized_pnl(self, price: Optional[float]) -> Optional[float]:
+        """
+        :param price: optional float mark price
+        :return: float PnL of the open quantity marked to price, None without a mark
+        """
+        if price is None:
+            return None
+        return self.quantity * (price - self.average_cost)
+
+    def to_dict(self, pool_price: Optional[float] = None, market_price: Optional[float] = None) -> dict:
+        return {
+            'asset': self.asset,
+            'quantity': self.quantity,
+            'average_cost': self.average_cost,
+            'realized_pnl': self.realized_pnl,
+            'fees': self.fees,
+            'volume': self.volume,
+            'fills': self.fills,
+            'pool_price': pool_price,
+            'market_price': market_price,
+            'unrealized_pnl_pool': self.unrealized_pnl(pool_price),
+            'unrealized_pnl_market': self.unrealized_pnl(market_price)
+        }
+
+
+class PositionTracker(object):
+    """
+    Position and PnL engine fed by the own fills of the order fills stream.
+    Every limit order fill updates the position of its base asset in constant time. Fees earned are fee income
+    and the fee amount joins the inventory at the fill price. Range order fills only add their fees: the
+    amounts they trade stay in the range order until it is closed. Unrealized PnL is marked to the Chainflip
+    pool price and the Binance price. With a path, every block ends with one JSON line per position appended
+    (see load_time_series).
+    """
+
+    def __init__(self,
+                 quote_asset: str = 'USDC',
+                 pools=None,
+                 data_feed: Optional[dict] = None,
+                 path: Optional[str] = None,
+                 clock: Optional[Clock] = None):
+        """
+        :param pools: optional ChainflipPools, marks to the pool price
+        :param data_feed: optional dict of base asset to BinanceDataFeed, marks to the last candle close
+        :param path: optional str JSON lines file the per block time series is appended to
+        """
+        self._quote_asset = quote_asset
+        self._pools = pools
+        self._data = data_feed if data_feed is not None else dict()
+        self._path = path
+        self._file = None
+        self._clock = clock if clock is not None else get_clock()
+        self._positions = dict()
+        self._cash = 0.0
+        self._block_number = None
+
+    @property
+    def positions(self) -> dict:
+        return self._positions
+
+    @property
+    def cash(self) -> float:
+        """
+        quote asset received minus quote asset paid by the fills
+        """
+        return self._cash
+
+    def _position(self, asset: str) -> Position:
+        position = self._positions.get(asset)
+        if position is None:
+            position = self._positions[asset] = Position(asset)
+            POSITION.labels(asset, 'quantity').set_function(lambda tracker: tracker.positions[asset].quantity, self)
+            POSITION.labels(asset, 'realized_pnl').set_function(
+                lambda tracker: tracker.positions[asset].realized_pnl, self
+            )
+            POSITION.labels(asset, 'fees').set_function(lambda tracker: tracker.positions[asset].fees, self)
+        return position
+
+    def apply_fill(self, fill: dict):
+        """
+        :param fill: dict fill from the order fills stream, with a limit_order or range_order
+        """
+        if 'limit_order' in fill:
+            order = fill['limit_order']
+            base_asset = formatter.asset_to_str(order['base_asset'])
+            sold_asset, bought_asset = (self._quote_asset, base_asset) if order['side'] == 'buy' \
+                else (base_asset, self._quote_asset)
+            sold = formatter.hex_amount_to_decimal(order['sold'], sold_asset)
+            bought = formatter.hex_amount_to_decimal(order['bought'], bought_asset)
+            fees = formatter.hex_amount_to_decimal(order['fees'], bought_asset) if 'fees' in order else 0.0
+            position = self._position(base_asset)
+            if order['side'] == 'buy':
+                if bought <= 0:
+                    return
+                price = sold / bought
+                position.trade(bought + fees, price)
+                position.fees += fees * price
+                self._cash -= sold
+            else:
+                if sold <= 0:
+                    return
+                price = bought / sold
+                position.trade(-sold, price)
+                position.fees += fees
+                self._cash += bought + fees
+        elif 'range_order' in fill:
+            order = fill['range_order']
+            if 'fees' in order:
+                fees = formatter.hex_amount_to_decimal(order['fees'], self._quote_asset)
+                self._position(formatter.asset_to_str(order['base_asset'])).fees += fees
+                self._cash += fees
+
+    def marks(self, asset: str) -> tuple:
+        """
+        :param asset: str base asset
+        :return: tuple of (pool price, market price), None where not available yet
+        """
+        pool_price = market_price = None
+        if self._pools is not None:
+            pool = self._pools.pools.get(f'{asset}-{self._quote_asset}')
+            pool_price = pool.price if pool is not None else None
+        feed = self._data.get(asset)
+        if feed is not None and feed.data is not None:
+            market_price = feed.data.close
+        return pool_price, market_price
+
+    def snapshot(self) -> dict:
+        """
+        :return: dict with every position marked to the pool and market prices and the totals, in the quote asset
+        """
+        positions = dict()
+        totals = {'realized_pnl': 0.0, 'fees': 0.0, 'unrealized_pnl_pool': 0.0, 'unrealized_pnl_market': 0.0}
+        for asset, position in self._positions.items():
+            positions[asset] = row = position.to_dict(*self.marks(asset))
+            for field in totals:
+                totals[field] += row[field] or 0.0
+        return {
+            'block_number': self._block_number,
+            'timestamp': self._clock.time(),
+            'cash': self._cash,
+            'positions': positions,
+            'totals': totals
+        }
+
+    def on_block(self, block_number: int, fills: list):
+        """
+        apply the own fills of a block and append the block to the time series
+        :param block_number: integer block the fills were executed in
+        :param fills: list of own fills in the block
+        """
+        for fill in fills:
+            self.apply_fill(fill)
+        self.end_block(block_number)
+
+    def end_block(self, block_number: int):
+        """
+        append a block to the time series, for fills applied one by one with apply_fill
+        :param block_number: integer block number
+        """
+        self._block_number = block_number
+        if self._path is not None and self._positions:
+            self._write(block_number)
+
+    def _write(self, block_number: int):
+        if self._file is None:
+            self._file = open(self._path, 'a')
+        timestamp = self._clock.time()
+        for asset, position in self._positions.items():
+            row = position.to_dict(*self.marks(asset))
+            row['block_number'] = block_number
+            row['timestamp'] = timestamp
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load_time_series(path: str) -> pd.DataFrame:
+    """
+    :param path: str file written by PositionTracker
+    :return: pandas DataFrame, one row per position and block
+    """
+    return pd.read_json(path, lines=True)
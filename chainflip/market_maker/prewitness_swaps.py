@@ -2,20 +2,33 @@
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
 
+from typing import Optional
+
 from chainflip.exchange.prewitnessing import PrewitnessedSwaps
+from chainflip.utils.clock import Clock, get_clock
 
 
 logger = log.setup_custom_logger('root')
 
 
 class Prewitnesser:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, clock: Optional[Clock] = None):
         self._id = user_id
         self._prewitnesser = dict()
+        self._clock = clock if clock is not None else get_clock()
+
+    def create_prewitness_stream(self, base_asset, pair_asset) -> PrewitnessedSwaps:
+        """
+        register a prewitness stream without starting it
+        """
+        base_asset = formatter.asset_to_str(base_asset)
+        pair_asset = formatter.asset_to_str(pair_asset)
+        stream = PrewitnessedSwaps(base_asset, pair_asset, clock=self._clock)
+        self._prewitnesser[f'{base_asset}-{pair_asset}'] = stream
+        return stream
 
     async def add_prewitness_stream(self, base_asset, pair_asset):
-        stream = PrewitnessedSwaps(formatter.asset_to_str(base_asset), formatter.asset_to_str(pair_asset))
-        self._prewitnesser[f'{base_asset}-{pair_asset}'] = stream
+        stream = self.create_prewitness_stream(base_asset, pair_asset)
         await stream.start_websocket()
 
     async def get_connection_status(self):
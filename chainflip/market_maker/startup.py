@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import chainflip.utils.logger as log
+
+from typing import Awaitable, Optional
+
+from chainflip.utils.readiness import Readiness
+
+
+logger = log.setup_custom_logger('root')
+
+
+class StartupError(Exception):
+    """
+    Raised when a dependency fails or is not ready within the startup timeout.
+    """
+
+    def __init__(self, message: str, not_ready: list):
+        super().__init__(message)
+        self.not_ready = not_ready
+
+
+class StartupOrchestrator(object):
+    """
+    Brings the market maker up concurrently instead of through fixed warm up sleeps.
+    Start actions (subscribing to streams, loading pool fees ...) are run concurrently, then the orchestrator
+    waits for every required readiness (first price received, subscription confirmed, first balance loaded)
+    and returns the moment the last one is ready, or raises StartupError after timeout seconds.
+    """
+
+    def __init__(self, timeout: float = 60):
+        self._timeout = timeout
+        self._actions = list()
+        self._required = list()
+        self._ready_after = dict()
+
+    @property
+    def ready_after(self) -> dict:
+        """
+        seconds from the start of run until each dependency was ready
+        """
+        return self._ready_after
+
+    def start(self, action: Awaitable):
+        """
+        :param action: awaitable run concurrently with the other start actions
+        """
+        self._actions.append(action)
+
+    def require(self, readiness: Optional[Readiness]):
+        """
+        :param readiness: Readiness quoting depends on, ignored when None
+        """
+        if readiness is not None:
+            self._required.append(readiness)
+
+    async def _wait(self, readiness: Readiness, start: float):
+        await readiness.future()
+        self._ready_after[readiness.name] = time.perf_counter() - start
+        logger.info('%s ready after %.3fs', readiness.name, self._ready_after[readiness.name])
+
+    async def run(self):
+        """
+        run the start actions and wait for the required dependencies
+        """
+        start = time.perf_counter()
+        waiting = [asyncio.ensure_future(self._wait(readiness, start)) for readiness in self._required]
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(asyncio.gather(*self._actions), *waiting), self._timeout
+            )
+        except asyncio.TimeoutError:
+            not_ready = [readiness.name for readiness in self._required if not readiness.ready]
+            raise StartupError(f'Not ready after {self._timeout}s: {", ".join(not_ready)}', not_ready) from None
+        except Exception as e:
+            not_ready = [readiness.name for readiness in self._required if not readiness.ready]
+            raise StartupError(f'Startup failed: {e}', not_ready) from e
+        finally:
+            for task in waiting:
+                task.cancel()
+        logger.info('All dependencies ready after %.3fs', time.perf_counter() - start)
+        self._actions.clear()
+        return self._ready_after
@@ -0,0 +1,108 @@
+import asyncio
+
+from typing import Awaitable, Callable, Optional
+
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+
+class StrategySupervisor(object):
+    """
+    Runs several strategies, and the feeds they depend on, cooperatively on one event loop and isolates their
+    failures. A strategy raising or stopping is logged, cleaned up with its on_failure callback and restarted
+    after a backoff doubling up to max_restart_delay, while the others keep running. After max_restarts
+    failures in a row it stays stopped. A run lasting healthy_after seconds resets the failures.
+    """
+
+    def __init__(self,
+                 restart_delay: float = 5,
+                 max_restart_delay: float = 300,
+                 max_restarts: Optional[int] = 10,
+                 healthy_after: float = 600,
+                 clock: Optional[Clock] = None):
+        """
+        :param restart_delay: float seconds before the first restart
+        :param max_restart_delay: float seconds between restarts at most
+        :param max_restarts: optional integer failures in a row before giving up, restarts forever when None
+        :param healthy_after: float seconds a run must last for its failures to be forgotten
+        """
+        self._restart_delay = restart_delay
+        self._max_restart_delay = max_restart_delay
+        self._max_restarts = max_restarts
+        self._healthy_after = healthy_after
+        self._clock = clock if clock is not None else get_clock()
+        self._runs = dict()
+        self._running = set()
+        self._failures = dict()
+
+    @property
+    def running(self) -> set:
+        """
+        names of the runs currently running
+        """
+        return self._running
+
+    @property
+    def failures(self) -> dict:
+        """
+        failures in a row by name
+        """
+        return self._failures
+
+    def add(self,
+            name: str,
+            run: Callable[[], Awaitable],
+            on_failure: Optional[Callable[[Exception], Awaitable]] = None):
+        """
+        :param name: str unique name, e.g. 'stream-ETH'
+        :param run: coroutine function running until cancelled, e.g. StrategyStream.run_strategy
+        :param on_failure: optional coroutine function given the error, e.g. cancelling the strategy's orders
+        """
+        if name in self._runs:
+            raise ValueError(f'{name} is already supervised')
+        self._runs[name] = (run, on_failure)
+        self._failures[name] = 0
+        metrics.STRATEGY_RUNNING.labels(name).set_function(lambda supervisor: name in supervisor.running, owner=self)
+
+    async def _supervise(self, name: str):
+        run, on_failure = self._runs[name]
+        while True:
+            started = self._clock.time()
+            self._running.add(name)
+            try:
+                await run()
+                error = RuntimeError(f'{name} stopped')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            finally:
+                self._running.discard(name)
+
+            if self._clock.time() - started >= self._healthy_after:
+                self._failures[name] = 0
+            self._failures[name] += 1
+            logger.error('%s failed (%s in a row): %s', name, self._failures[name], error, exc_info=error)
+            if on_failure is not None:
+                try:
+                    await on_failure(error)
+                except Exception as e:
+                    logger.error('%s: failure clean up failed: %s', name, e)
+            if self._max_restarts is not None and self._failures[name] > self._max_restarts:
+                logger.error('%s failed %s times in a row, not restarting it', name, self._failures[name])
+                return
+            delay = min(self._restart_delay * 2 ** (self._failures[name] - 1), self._max_restart_delay)
+            logger.warning('Restarting %s in %.1fs', name, delay)
+            await self._clock.sleep(delay)
+            metrics.STRATEGY_RESTARTS.labels(name).inc()
+
+    async def run(self):
+        """
+        run everything added until cancelled, one failing never cancels the others
+        """
+        await asyncio.gather(*(self._supervise(name) for name in self._runs))
@@ -1,53 +1,144 @@
 import asyncio
 import signal
 
+from typing import Optional
+
+import chainflip.exchange.endpoints as endpoints
+import chainflip.utils.memory as memory
+import chainflip.utils.metrics as metrics
+import chainflip.utils.tracing as tracing
+
 from chainflip.data.binance import BinanceDataFeed
+from chainflip.exchange.cache import BlockCache
+from chainflip.exchange.rpc import HedgePolicy
+from chainflip.market_maker.dead_mans_switch import DeadMansSwitch
+from chainflip.market_maker.journal import OrderJournal
 from chainflip.market_maker.order_management import OMS
 from chainflip.market_maker.pool_handler import ChainflipPools
+from chainflip.market_maker.supervisor import StrategySupervisor
 from chainflip.strategy.stream_prices import StrategyStream
 
 
-async def run_stream_strategy(maker_id: str):
+# pools quoted by the multi-pair runner, each against USDC
+STREAM_ASSETS = ('ETH', 'BTC', 'DOT', 'FLIP')
+
+
+async def run_stream_strategies(maker_id: str,
+                                base_assets: tuple = STREAM_ASSETS,
+                                metrics_port: Optional[int] = 9100,
+                                journal_dir: Optional[str] = None,
+                                endpoint_registry: Optional[endpoints.EndpointRegistry] = None,
+                                hedge_reads: bool = False):
+    """
+    quote every pool of base_assets against USDC from one process. The strategies share the node connections,
+    the pool price and order fills streams, the OMS and its balance ledger, and run cooperatively on the event
+    loop. Every pool has its own dead man's switch and is supervised on its own: a pool whose strategy or
+    candles fail is taken flat and restarted while the others keep quoting.
+    """
     market_maker_id = maker_id
+    if endpoint_registry is not None:
+        endpoints.set_registry(endpoint_registry)
+    registry = endpoints.get_registry()
+    await registry.check_all()
     lp_id = 'cFPdef3hF5zEwbWUG6ZaCJ3X7mTvEeAog7HxZ8QyFcCgDVGDM'
 
-    eth_candles = BinanceDataFeed()
-    eth_candles.create_new(asset='ETHUSDC')
-    candles = {
-        'ETH': eth_candles,
-    }
+    # with several RPC nodes, pool and order book reads slower than their p95 are sent to a second node
+    hedge = HedgePolicy() if hedge_reads else None
+    # pool state is read at most once per block, the order fills stream reports the blocks
+    cache = BlockCache()
+    pools = ChainflipPools(user_id=market_maker_id, lp_id=lp_id, hedge=hedge, cache=cache)
 
-    pools = ChainflipPools(user_id=market_maker_id, lp_id=lp_id)
-    pools.add_pool(base_asset='ETH', quote_asset='USDC')
+    candles = dict()
+    for base_asset in base_assets:
+        pools.add_pool(base_asset=base_asset, quote_asset='USDC')
+        feed = BinanceDataFeed()
+        feed.create_new(asset=f'{base_asset}USDC')
+        candles[base_asset] = feed
+
+    journal = OrderJournal(journal_dir) if journal_dir is not None else None
 
     oms = OMS(
         market_maker_id,
         lp_id,
         erc20_withdrawal_address='0xe086a97042498dac883c58bcafef57f5a13bab7e',
-        btc_withdrawal_address='bcrt1p9em7lf26vf9df34s39gnwlrjqu547hx4wmlxt5h4nqwg9jqn0gcqaakg70'
+        btc_withdrawal_address='bcrt1p9em7lf26vf9df34s39gnwlrjqu547hx4wmlxt5h4nqwg9jqn0gcqaakg70',
+        journal=journal
     )
+    oms.updates_stream.add_block_listener(cache.new_block)
 
-    strategy = StrategyStream(
-        lp_account=lp_id,
-        base_asset='ETH',
-        data_feed=candles,
-        oms=oms,
-        perseverance_pools=pools,
-        active_order_time=18
-    )
+    supervisor = StrategySupervisor()
+    switches = list()
+    for base_asset in base_assets:
+        pair = f'{base_asset}-USDC'
+        # cancel the pool's orders when its price or candles stop, its strategy stalls or fails, or on shutdown
+        dead_mans_switch = DeadMansSwitch(
+            oms, heartbeat_timeout=90, scope=lambda order, base_asset=base_asset: order.base_asset == base_asset
+        )
+        dead_mans_switch.watch(f'{pair} pool price', lambda pool=pools.pools[pair]: pool.last_update, timeout=120)
+        dead_mans_switch.watch(
+            f'{base_asset}USDC candles', lambda feed=candles[base_asset]: feed.last_update, timeout=120
+        )
+        switches.append(dead_mans_switch)
+
+        strategy = StrategyStream(
+            lp_account=lp_id,
+            base_asset=base_asset,
+            data_feed=candles,
+            oms=oms,
+            perseverance_pools=pools,
+            active_order_time=18,
+            dead_mans_switch=dead_mans_switch
+        )
+        dead_mans_switch.add_order_book(strategy.order_book)
+
+        async def flat(error: Exception, dead_mans_switch: DeadMansSwitch = dead_mans_switch):
+            await dead_mans_switch.trip('strategy_failure', str(error))
+
+        supervisor.add(f'{base_asset}USDC candles', candles[base_asset])
+        supervisor.add(f'stream-{base_asset}', strategy.run_strategy, on_failure=flat)
+
+    metrics_server = None
+    if metrics_port is not None:
+        metrics_server = metrics.MetricsServer(port=metrics_port, reports={'/memory': memory.report})
+        await metrics_server.start()
 
     try:
         await asyncio.gather(
-            eth_candles(),
-            strategy.run_strategy()
+            supervisor.run(),
+            *(dead_mans_switch.run() for dead_mans_switch in switches),
+            registry.run(),
+            metrics.monitor_event_loop_lag()
         )
     except asyncio.CancelledError:
         print("Tasks cancelled. Starting cleanup.")
-        # Put your cleanup code here
-        await strategy.update_order_book()
-        await strategy._oms.check_order_book_and_cancel(strategy._order_book.open_lp_orders)
-        await asyncio.sleep(6)
-        print("Cleanup completed.")
+        reports = await asyncio.gather(*(dead_mans_switch.trip('shutdown') for dead_mans_switch in switches))
+        cancelled = sum(len(report['cancelled']) for report in reports)
+        outstanding = sum(len(report['outstanding']) for report in reports)
+        time_to_flat = max(report['time_to_flat'] for report in reports)
+        print(f"Cleanup completed: {cancelled} orders cancelled in {time_to_flat:.3f}s, {outstanding} left open.")
     finally:
         # Any additional cleanup if needed
-        print("Finalizing shutdown.")
\ No newline at end of file
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if journal is not None:
+            await journal.close()
+        print(f"Tick to trade latency by stage: {tracing.get_tracer().percentiles()}")
+        print("Finalizing shutdown.")
+
+
+async def run_stream_strategy(maker_id: str,
+                              metrics_port: Optional[int] = 9100,
+                              journal_dir: Optional[str] = None,
+                              endpoint_registry: Optional[endpoints.EndpointRegistry] = None,
+                              hedge_reads: bool = False):
+    """
+    quote the ETH-USDC pool only
+    """
+    await run_stream_strategies(
+        maker_id,
+        base_assets=('ETH',),
+        metrics_port=metrics_port,
+        journal_dir=journal_dir,
+        endpoint_registry=endpoint_registry,
+        hedge_reads=hedge_reads
+    )
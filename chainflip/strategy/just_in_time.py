@@ -1,13 +1,18 @@
-import asyncio
+from typing import Optional
 
 import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.format as formatter
 import chainflip.utils.logger as log
+import chainflip.utils.tracing as tracing
 
 from chainflip.utils.data_types import LimitOrder, RangeOrder
+from chainflip.market_maker.dead_mans_switch import DeadMansSwitch
 from chainflip.market_maker.order_management import OMS
 from chainflip.market_maker.pool_handler import ChainflipPools
+from chainflip.market_maker.positions import PositionTracker
 from chainflip.market_maker.prewitness_swaps import Prewitnesser
+from chainflip.market_maker.startup import StartupOrchestrator
+from chainflip.utils.clock import Clock, get_clock
 
 logger = log.setup_custom_logger('root')
 
@@ -27,7 +32,12 @@ class StrategyJIT:
             data_feed: dict,
             oms: OMS,
             perseverance_pools: ChainflipPools,
-            prewitnesser: Prewitnesser
+            prewitnesser: Prewitnesser,
+            startup_timeout: float = 60,
+            positions_path: Optional[str] = None,
+            strategy_id: Optional[str] = None,
+            dead_mans_switch: Optional[DeadMansSwitch] = None,
+            clock: Optional[Clock] = None
     ):
         self._base_asset = formatter.asset_to_str(base_asset)
         self._pair_asset = formatter.asset_to_str(pair_asset)
@@ -35,7 +45,18 @@ class StrategyJIT:
         self._oms = oms
         self._pools = perseverance_pools
         self._prewitnesser = prewitnesser
-        self._order_id = 0
+        self._startup_timeout = startup_timeout
+        self._clock = clock if clock is not None else get_clock()
+        self._positions = PositionTracker(
+            self._pair_asset, pools=perseverance_pools, data_feed=data_feed, path=positions_path, clock=self._clock
+        )
+        self._order_ids = oms.order_ids.register(
+            strategy_id if strategy_id is not None else f'jit-{self._base_asset}-{self._pair_asset}',
+            on_fill=self._positions.apply_fill,
+            on_block=self._positions.end_block
+        )
+        self._chainflip_updates_stream = oms.updates_stream
+        self._dead_mans_switch = dead_mans_switch
         self._target_fill = 0.1  # 10 % of the swap amount
         self._target_spread = 0.01
         self._jit_swaps_buy = list()
@@ -54,16 +75,15 @@ class StrategyJIT:
         :param side: buy or sell
         :return: LimitOrder type
         """
-        self._order_id += 1
         limit_order = LimitOrder(
             amount,
             price,
             base_asset=self._base_asset,
             quote_asset=self._pair_asset,
-            id=self._order_id,
+            id=self._order_ids.next_id(),
             side=side
         )
-        logger.info(f'Created buy limit order candidate: {limit_order}')
+        logger.info('Created limit order candidate: %s', limit_order)
         return limit_order
 
     def _create_range_order_candidate(self,
@@ -77,17 +97,16 @@ class StrategyJIT:
         :param upper_price: float price for the upper range
         :return: RangeOrder type
         """
-        self._order_id += 1
         range_order = RangeOrder(
             lower_price,
             upper_price,
             base_asset=self._base_asset,
             quote_asset=self._pair_asset,
-            id=self._order_id,
+            id=self._order_ids.next_id(),
             amount=amount,
             type=CONSTANTS.RangeOrderType.LIQUIDITY
         )
-        logger.info(f'Created buy limit order candidate: {range_order}')
+        logger.info('Created range order candidate: %s', range_order)
         return range_order
 
     async def _create_buy_orders(self, amount: int, asset_price: float):
@@ -124,12 +143,16 @@ class StrategyJIT:
         else:
             logger.info(f'Not enough liquidity ({available_amount}) for fill target ({fill_amount})')
 
+    @property
+    def positions(self) -> PositionTracker:
+        return self._positions
+
     def open_orders(self):
         """
         log open orders
         """
-        logger.info(f'Open limit orders: {self._oms.open_limit_orders}')
-        logger.info(f'Open range orders: {self._oms.open_range_orders}')
+        logger.info('Open limit orders: %s', self._oms.open_limit_orders)
+        logger.info('Open range orders: %s', self._oms.open_range_orders)
 
     async def cancel_orders(self):
         """
@@ -205,37 +228,79 @@ class StrategyJIT:
         attempt to submit limit orders for pre witnessed buy swaps
         """
         for buy in self._jit_swaps_buy:
-            await self.send_sell_order(buy.amount)
+            with tracing.activate(buy.trace):
+                await self.send_sell_order(buy.amount)
 
     async def process_sell_swaps(self):
         """
         attempt to submit limit orders for pre witnessed sell swaps
         """
         for sell in self._jit_swaps_sell:
-            await self.send_buy_order(sell.amount)
+            with tracing.activate(sell.trace):
+                await self.send_buy_order(sell.amount)
 
     async def pull_updates(self):
-        await self._oms.get_asset_balances()
+        await self._oms.reconcile_balances()
         await self.update_pools()
         await self.get_incoming_swaps_for_asset()
 
-    @staticmethod
-    async def sleep(time: int = None):
+    async def startup(self):
+        """
+        start the prewitness, order fills and pool price streams and load pool fees and balances concurrently,
+        return once the subscriptions are confirmed and the first prices, candles and balances are in
+        """
+        startup = StartupOrchestrator(timeout=self._startup_timeout)
+        for base_asset, pair_asset in ((self._base_asset, self._pair_asset), (self._pair_asset, self._base_asset)):
+            stream = self._prewitnesser.create_prewitness_stream(base_asset, pair_asset)
+            startup.start(stream.start_websocket())
+            startup.require(stream.readiness)
+        startup.start(self.update_pool_fees())
+        startup.start(self.start_pools_websocket())
+        startup.start(self._chainflip_updates_stream.start_websocket())
+        startup.start(self._oms.get_asset_balances())
+        for pool in self._pools.pools.values():
+            startup.require(pool.readiness)
+        for feed in self._data.values():
+            startup.require(getattr(feed, 'readiness', None))
+        startup.require(self._chainflip_updates_stream.readiness)
+        startup.require(self._oms.readiness)
+        await startup.run()
+        if self._oms.journal is not None:
+            # orders of other strategies sharing the OMS are theirs to recover
+            left_open = [
+                order for order in self._oms.journal.state.orders()
+                if self._oms.order_ids.owner(order.id) in (None, self._order_ids)
+            ]
+            if left_open:
+                logger.info('Cancelling %s orders left open by the previous run', len(left_open))
+                await self._oms.cancel_limit_orders([order for order in left_open if isinstance(order, LimitOrder)])
+                await self._oms.cancel_range_orders([order for order in left_open if isinstance(order, RangeOrder)])
+
+    def quoting(self) -> bool:
+        """
+        send the heartbeat of the dead man's switch
+        :return: False while the switch is tripped and no orders should be placed
+        """
+        if self._dead_mans_switch is None:
+            return True
+        self._dead_mans_switch.heartbeat()
+        return self._dead_mans_switch.tripped is None
+
+    async def sleep(self, time: int = None):
         if time is None:
-            await asyncio.sleep(1)
+            await self._clock.sleep(1)
         else:
-            await asyncio.sleep(time)
+            await self._clock.sleep(time)
 
     async def run_strategy(self):
         logger.info(f'Initialised strategy: Just in Time liquidity')
-        logger.info(f'Strategy will sleep for 30 seconds to allow data to be pulled')
-        await self._prewitnesser.add_prewitness_stream(base_asset='Eth', pair_asset='Usdc')
-        await self._prewitnesser.add_prewitness_stream(base_asset='Usdc', pair_asset='Eth')
-        await self.update_pool_fees()
-        await self.start_pools_websocket()
-        await self.sleep(5)
+        logger.info(f'Strategy will start once streams, prices and balances are ready')
+        await self.startup()
         while True:
             await self.pull_updates()
+            if not self.quoting():
+                self._jit_swaps_buy.clear()
+                self._jit_swaps_sell.clear()
             if len(self._jit_swaps_buy) == 0 and len(self._jit_swaps_sell) == 0:
                 await self.sleep(6)
             else:
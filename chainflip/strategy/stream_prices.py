@@ -1,13 +1,19 @@
-import asyncio
+import time
+
+from typing import Optional
 
 import chainflip.utils.constants as CONSTANTS
 import chainflip.utils.logger as log
+import chainflip.utils.tracing as tracing
 
-from chainflip.exchange.stream import ChainflipUpdates
 from chainflip.utils.data_types import LimitOrder, RangeOrder
+from chainflip.market_maker.dead_mans_switch import DeadMansSwitch
 from chainflip.market_maker.order_management import OMS
 from chainflip.market_maker.order_book import OrderBook
 from chainflip.market_maker.pool_handler import ChainflipPools
+from chainflip.market_maker.positions import PositionTracker
+from chainflip.market_maker.startup import StartupOrchestrator
+from chainflip.utils.clock import Clock, get_clock
 
 
 logger = log.setup_custom_logger('root')
@@ -26,7 +32,12 @@ class StrategyStream:
             data_feed: dict,
             oms: OMS,
             perseverance_pools: ChainflipPools,
-            active_order_time: int = 30
+            active_order_time: int = 30,
+            startup_timeout: float = 60,
+            positions_path: Optional[str] = None,
+            strategy_id: Optional[str] = None,
+            dead_mans_switch: Optional[DeadMansSwitch] = None,
+            clock: Optional[Clock] = None
     ):
         self._lp_account = lp_account
         self._base_asset = base_asset
@@ -35,10 +46,23 @@ class StrategyStream:
         self._oms = oms
         self._pools = perseverance_pools
         self._order_time = active_order_time
-        self._order_book = OrderBook(base_asset, lp_account)
-        self._chainflip_updates_stream = ChainflipUpdates(lp_account)
-        self._order_id = 0
+        self._startup_timeout = startup_timeout
+        self._clock = clock if clock is not None else get_clock()
+        self._order_book = OrderBook(
+            base_asset, lp_account, hedge=perseverance_pools.hedge, cache=perseverance_pools.cache
+        )
+        self._positions = PositionTracker(
+            self._quote_asset, pools=perseverance_pools, data_feed=data_feed, path=positions_path, clock=self._clock
+        )
+        self._order_ids = oms.order_ids.register(
+            strategy_id if strategy_id is not None else f'stream-{base_asset}',
+            on_fill=self._positions.apply_fill,
+            on_block=self._positions.end_block
+        )
+        self._chainflip_updates_stream = oms.updates_stream
+        self._dead_mans_switch = dead_mans_switch
         self._target_spread = 0.01
+        self._range_spread = 0.01
         self._limit_order_candidates = list()
         self._range_order_candidates = list()
 
@@ -53,16 +77,15 @@ class StrategyStream:
         :param side: buy or sell
         :return: LimitOrder type
         """
-        self._order_id += 1
         limit_order = LimitOrder(
             amount,
             price,
             base_asset=self._base_asset,
             quote_asset=self._quote_asset,
-            id=hex(self._order_id),
+            id=self._order_ids.next_id(),
             side=side
         )
-        logger.info(f'Created buy limit order candidate: {limit_order}')
+        logger.info('Created limit order candidate: %s', limit_order)
         return limit_order
 
     def _create_range_order_candidate(self,
@@ -76,17 +99,16 @@ class StrategyStream:
         :param upper_price: float price for the upper range
         :return: RangeOrder type
         """
-        self._order_id += 1
         range_order = RangeOrder(
             lower_price,
             upper_price,
             base_asset=self._base_asset,
             quote_asset=self._quote_asset,
-            id=hex(self._order_id),
+            id=self._order_ids.next_id(),
             amount=amount,
             type=CONSTANTS.RangeOrderType.LIQUIDITY
         )
-        logger.info(f'Created buy limit order candidate: {range_order}')
+        logger.info('Created range order candidate: %s', range_order)
         return range_order
 
     def _create_orders(self):
@@ -107,8 +129,10 @@ class StrategyStream:
         top_bid = self._order_book.top_bid
         top_ask = self._order_book.top_ask
 
-        logger.info(f'Current pool price for asset {self._base_asset}: {pool_price}, current market price: {binance_price}')
-        logger.info(f'Best current bid: {top_bid}. Best current ask: {top_ask}')
+        logger.info(
+            'Current pool price for asset %s: %s, current market price: %s', self._base_asset, pool_price, binance_price
+        )
+        logger.info('Best current bid: %s. Best current ask: %s', top_bid, top_ask)
 
         limit_order_buy = self._create_limit_order_candidate(
             amount=self._oms.book_balance[self._base_asset] * 0.001,
@@ -125,17 +149,31 @@ class StrategyStream:
 
         range_order = self._create_range_order_candidate(
             amount=self._oms.book_balance[self._base_asset] * 0.0025,
-            lower_price=pool_price - 1 * self._target_spread,
-            upper_price=pool_price + 1 * self._target_spread,
+            lower_price=pool_price - 1 * self._range_spread,
+            upper_price=pool_price + 1 * self._range_spread,
         )
         self._range_order_candidates.append(range_order)
 
+    def _in_pool(self, order) -> bool:
+        """
+        whether an order is in the strategy's pool, the order book only shows the orders of that pool
+        """
+        return order.base_asset == self._base_asset and order.quote_asset == self._quote_asset
+
+    @property
+    def positions(self) -> PositionTracker:
+        return self._positions
+
+    @property
+    def order_book(self) -> OrderBook:
+        return self._order_book
+
     def open_orders(self):
         """
         log open orders
         """
-        logger.info(f'Open limit orders: {self._oms.open_limit_orders}')
-        logger.info(f'Open range orders: {self._oms.open_range_orders}')
+        logger.info('Open limit orders: %s', self._oms.open_limit_orders)
+        logger.info('Open range orders: %s', self._oms.open_range_orders)
 
     async def cancel_orders(self):
         """
@@ -145,6 +183,20 @@ class StrategyStream:
         await self._oms.cancel_limit_orders(self._limit_order_candidates)
         await self._oms.cancel_range_orders(self._range_order_candidates)
 
+    def _start_quote_cycle(self) -> Optional[tracing.Trace]:
+        """
+        quotes are sent on a timer rather than on a price update, so each cycle gets its own trace instead of
+        reusing the trace of the last update. The age of the price quoted and its trace id are attributes
+        """
+        pair = f'{self._base_asset}-{self._quote_asset}'
+        start = time.perf_counter()
+        tick = self._pools.pools[pair].trace
+        if tick is None:
+            return tracing.get_tracer().start_trace('quote_cycle', start, pair=pair)
+        return tracing.get_tracer().start_trace(
+            'quote_cycle', start, pair=pair, tick_trace_id=tick.trace_id, tick_age=start - tick.start
+        )
+
     async def send_orders(self):
         """
         send orders to Chainflip
@@ -155,9 +207,10 @@ class StrategyStream:
                 logger.info(f'send_orders: awaiting cancellation of open orders')
                 await self.cancel_orders()
 
-            self._create_orders()
-            await self._oms.send_limit_orders(self._limit_order_candidates)
-            await self._oms.send_range_orders(self._range_order_candidates)
+            with tracing.activate(self._start_quote_cycle()):
+                self._create_orders()
+                await self._oms.send_limit_orders(self._limit_order_candidates)
+                await self._oms.send_range_orders(self._range_order_candidates)
 
         except Exception as e:
             logger.exception(f'Error sending orders" {e}')
@@ -176,7 +229,7 @@ class StrategyStream:
         update pool fees
         """
         try:
-            await self._pools.update_pool_fees()
+            await self._pools.update_pool_fees([f'{self._base_asset}-{self._quote_asset}'])
         except Exception as e:
             logger.exception(f'Error updating pool fees: {e}')
 
@@ -185,7 +238,7 @@ class StrategyStream:
         start pool websocket for price updates
         """
         try:
-            await self._pools.start_pool_stream()
+            await self._pools.start_pool_stream([f'{self._base_asset}-{self._quote_asset}'])
 
         except Exception as e:
             logger.exception(f'Error starting pools price websocket: {e}')
@@ -200,11 +253,39 @@ class StrategyStream:
         except Exception as e:
             logger.exception(f'Error starting Chainflip update stream: {e}')
 
+    async def startup(self):
+        """
+        load pool fees, the order book and balances and start the price and order fills streams concurrently,
+        return once the first prices, candles and balances are in. Only the strategy's own pool and candles are
+        waited for, the pools and feeds of other strategies sharing them may be down
+        """
+        startup = StartupOrchestrator(timeout=self._startup_timeout)
+        startup.start(self.update_pool_fees())
+        startup.start(self.start_pools_websocket())
+        startup.start(self.start_chainflip_update_stream())
+        startup.start(self.update_order_book())
+        startup.start(self._oms.get_asset_balances())
+        startup.require(self._pools.pools[f'{self._base_asset}-{self._quote_asset}'].readiness)
+        startup.require(getattr(self._data.get(self._base_asset), 'readiness', None))
+        startup.require(self._chainflip_updates_stream.readiness)
+        startup.require(self._oms.readiness)
+        await startup.run()
+
+    def quoting(self) -> bool:
+        """
+        send the heartbeat of the dead man's switch
+        :return: False while the switch is tripped and no orders should be placed
+        """
+        if self._dead_mans_switch is None:
+            return True
+        self._dead_mans_switch.heartbeat()
+        return self._dead_mans_switch.tripped is None
+
     async def sleep(self, time: int = None):
         if time is None:
-            await asyncio.sleep(self._order_time - 2)
+            await self._clock.sleep(self._order_time - 2)
         else:
-            await asyncio.sleep(time)
+            await self._clock.sleep(time)
 
     async def run_strategy(self):
         """
@@ -212,19 +293,17 @@ class StrategyStream:
         Very simple flow of events. Edit as you require.
         """
         logger.info(f'Initialised strategy: steaming quotes for {self._order_time} seconds')
-        logger.info(f'Strategy will sleep for 10 seconds to allow data to be pulled')
-        await self.update_pool_fees()
-        await self.start_pools_websocket()
-        await self.update_order_book()
-        await self._oms.check_order_book_and_cancel(self._order_book.open_lp_orders)
-        await self.start_chainflip_update_stream()
-        await self.sleep(10)
+        logger.info(f'Strategy will start quoting once prices, candles and balances are in')
+        await self.startup()
+        await self._oms.recover_orders(self._order_book.open_lp_orders, scope=self._in_pool)
         while True:
-            await self._oms.get_asset_balances()
+            await self._oms.reconcile_balances()
             await self.update_order_book()
-            await self._oms.check_order_book_and_cancel(self._order_book.open_lp_orders)
+            await self._oms.check_order_book_and_cancel(self._order_book.open_lp_orders, scope=self._in_pool)
             self._order_book.open_lp_orders.clear()
             await self.sleep(2)
+            if not self.quoting():
+                continue
             await self.send_orders()
             await self.update_order_book()
             await self.sleep()
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.format as formatter
+import chainflip.utils.logger as log
+
+from chainflip.exchange.prewitnessing import PrewitnessedSwaps
+from chainflip.exchange.stream import ChainflipUpdates
+from chainflip.testing.mock_node import MockChainflipNode
+from chainflip.utils.data_types import PrewitnessedSwap
+
+
+logger = log.setup_custom_logger('root')
+
+
+@dataclass
+class LoadProfile:
+    swaps_per_second: float
+    fills_per_block: int = 0
+    duration: float = 30.0
+    burst_probability: float = 0.0
+    burst_factor: float = 10.0
+
+    def __str__(self):
+        return f'Load - {self.swaps_per_second} swaps/s, {self.fills_per_block} fills/block, ' \
+               f'bursts {self.burst_probability} x{self.burst_factor}, {self.duration}s'
+
+
+def _percentiles(values: list, name: str) -> dict:
+    if not values:
+        return {f'{name}_p50': float('nan'), f'{name}_p99': float('nan'), f'{name}_max': float('nan')}
+    values = np.asarray(values)
+    return {
+        f'{name}_p50': float(np.percentile(values, 50)),
+        f'{name}_p99': float(np.percentile(values, 99)),
+        f'{name}_max': float(values.max())
+    }
+
+
+class LoadGenerator(object):
+    """
+    Drives the prewitnessed swap and order fill streams far above testnet load.
+    A MockChainflipNode runs on its own thread and event loop, producing a block every block_time seconds
+    with a random walk in every pool price, Poisson swap arrivals (optionally in bursts) spread over the
+    pairs and fills_per_block limit orders of the lp account crossed per pair. PrewitnessedSwaps and
+    ChainflipUpdates consume the streams on the calling event loop, with swaps drained every block as
+    StrategyJIT does. Each load level reports, in seconds:
+    - prewitness_lag: from the swap being published to it reaching PrewitnessedSwaps
+    - fill_lag: from the block being published to ChainflipUpdates having processed its fills
+    - loop_lag: how late the consuming event loop wakes up from sleeps
+    and swaps_dropped, the swaps never received plus those pushed out of the bounded swap queue.
+    Swaps are matched to their arrival by pair and amount, so a dropped swap never skews the lags of the others.
+    Lags are wall clock by design, the generator always runs in real time.
+    """
+
+    def __init__(
+            self,
+            pairs: tuple = ('ETH', 'BTC'),
+            block_time: float = 1.0,
+            price_volatility: float = 0.001,
+            mean_swap_value: float = 10000.0,
+            lp_account: str = 'cFloadGenerator',
+            loop_lag_interval: float = 0.01,
+            seed: Optional[int] = None,
+            log_level: int = logging.WARNING
+    ):
+        self._pairs = tuple(pairs)
+        self._block_time = block_time
+        self._price_volatility = price_volatility
+        self._mean_swap_value = mean_swap_value
+        self._lp_account = lp_account
+        self._loop_lag_interval = loop_lag_interval
+        self._log_level = log_level
+        self._rng = np.random.default_rng(seed)
+        self._order_ids = itertools.count(1)
+
+        self._node = MockChainflipNode(lp_account=lp_account, lp_port=0, rpc_port=0, block_time=None, seed=seed)
+        self._node_loop = None
+        self._node_thread = None
+        self._streams = dict()
+        self._updates = None
+        self._tasks = list()
+
+        # swaps are published on the node thread and received on the calling one
+        self._swaps_lock = threading.Lock()
+        self._published_swaps = dict()
+        self._swaps_injected = 0
+        self._swaps_received = 0
+        self._prewitness_lags = list()
+        self._block_times = dict()
+        self._fill_lags = list()
+        self._fills_processed = 0
+        self._loop_lags = list()
+
+    @property
+    def node(self) -> MockChainflipNode:
+        return self._node
+
+    # node thread
+
+    def _serve_node(self, started: threading.Event):
+        asyncio.set_event_loop(self._node_loop)
+        self._node_loop.run_until_complete(self._node.start())
+        started.set()
+        self._node_loop.run_forever()
+
+    def _start_node(self):
+        self._node_loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._node_thread = threading.Thread(target=self._serve_node, args=(started,), daemon=True)
+        self._node_thread.start()
+        started.wait()
+
+    def _stop_node(self):
+        asyncio.run_coroutine_threadsafe(self._node.stop(), self._node_loop).result()
+        self._node_loop.call_soon_threadsafe(self._node_loop.stop)
+        self._node_thread.join()
+        self._node_loop.close()
+
+    def _place_crossed_orders(self, base_asset: str, price: float, new_price: float, count: int):
+        side = CONSTANTS.Side.SELL if new_price > price else CONSTANTS.Side.BUY
+        exchange = self._node.exchange
+        for order_price in np.linspace(price, new_price, count + 2)[1:-1]:
+            amount = self._mean_swap_value / order_price / max(count, 1)
+            if side == CONSTANTS.Side.SELL:
+                exchange.deposit(self._lp_account, base_asset, amount)
+            else:
+                exchange.deposit(self._lp_account, 'USDC', amount * order_price)
+            exchange.set_limit_order(
+                self._lp_account, base_asset, 'USDC', side, next(self._order_ids), float(order_price), amount
+            )
+
+    async def _inject_swaps(self, profile: LoadProfile):
+        rate = profile.swaps_per_second
+        if profile.burst_probability and self._rng.random() < profile.burst_probability:
+            rate *= profile.burst_factor
+        count = self._rng.poisson(rate * self._block_time)
+        start = time.perf_counter()
+        offsets = np.sort(self._rng.uniform(0, self._block_time, count))
+        pairs = self._rng.integers(0, len(self._pairs), count)
+        from_base = self._rng.random(count) < 0.5
+        values = self._rng.exponential(self._mean_swap_value, count)
+        for offset, pair, sells_base, value in zip(offsets, pairs, from_base, values):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            base_asset = self._pairs[pair]
+            price = self._node.price(base_asset)
+            if sells_base:
+                amount = value / price
+                key = self._swap_key(
+                    base_asset, formatter.amount_in_asset(base_asset, amount) / CONSTANTS.UNIT_CONVERTER[base_asset]
+                )
+                with self._swaps_lock:
+                    self._published_swaps.setdefault(key, deque()).append(time.perf_counter())
+                    self._swaps_injected += 1
+                await self._node.inject_swap(base_asset, 'USDC', amount)
+            else:
+                await self._node.inject_swap('USDC', base_asset, value)
+        delay = start + self._block_time - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _drive(self, profile: LoadProfile) -> int:
+        blocks = max(1, int(profile.duration / self._block_time))
+        for _ in range(blocks):
+            await self._inject_swaps(profile)
+            for base_asset in self._pairs:
+                price = self._node.price(base_asset)
+                new_price = price * float(np.exp(self._rng.normal(0, self._price_volatility)))
+                if profile.fills_per_block:
+                    self._place_crossed_orders(base_asset, price, new_price, profile.fills_per_block)
+                self._node.set_price(base_asset, new_price)
+            self._block_times[self._node.block_number + 1] = time.perf_counter()
+            await self._node.produce_block()
+        return blocks
+
+    # consumers
+
+    @staticmethod
+    def _swap_key(base_asset: str, amount: float) -> tuple:
+        # rounded, the amount received may differ from the one sent in the last digit
+        return base_asset, round(amount, 9)
+
+    def _on_swap(self, swap: PrewitnessedSwap):
+        arrived = time.perf_counter()
+        key = self._swap_key(swap.base_asset, swap.amount)
+        with self._swaps_lock:
+            self._swaps_received += 1
+            published = self._published_swaps.get(key)
+            if not published:
+                return
+            self._prewitness_lags.append(arrived - published.popleft())
+            if not published:
+                del self._published_swaps[key]
+
+    def _on_block(self, block_number: int, fills: list):
+        published = self._block_times.pop(block_number, None)
+        if published is not None:
+            self._fill_lags.append(time.perf_counter() - published)
+        self._fills_processed += len(fills)
+
+    async def _consume_swaps(self):
+        while True:
+            await asyncio.sleep(self._block_time)
+            for stream in self._streams.values():
+                await stream.return_swaps()
+                await stream.remove_expired_swaps()
+
+    async def _sample_loop_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._loop_lag_interval)
+            self._loop_lags.append(max(0.0, time.perf_counter() - start - self._loop_lag_interval))
+
+    async def _start_consumers(self):
+        for base_asset in self._pairs:
+            self._streams[base_asset] = PrewitnessedSwaps(base_asset, swap_handler=self._on_swap)
+        self._updates = ChainflipUpdates(self._lp_account, block_handler=self._on_block)
+
+        await asyncio.gather(
+            *[stream.start_websocket(self._node.rpc_ws_url) for stream in self._streams.values()],
+            self._updates.start_websocket(self._node.lp_ws_url)
+        )
+        self._tasks = [
+            asyncio.create_task(self._consume_swaps()),
+            asyncio.create_task(self._sample_loop_lag())
+        ]
+
+    async def _stop_consumers(self):
+        tasks = self._tasks + [stream._swaps_stream for stream in self._streams.values()]
+        tasks.append(self._updates._update_stream)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _marks(self) -> dict:
+        return {
+            'injected': self._swaps_injected,
+            'received': self._swaps_received,
+            'prewitness_lags': len(self._prewitness_lags),
+            'evicted': sum(stream.dropped for stream in self._streams.values()),
+            'fill_lags': len(self._fill_lags),
+            'fills': self._fills_processed,
+            'loop_lags': len(self._loop_lags)
+        }
+
+    def _report(self, profile: LoadProfile, blocks: int, marks: dict) -> dict:
+        with self._swaps_lock:
+            injected = self._swaps_injected - marks['injected']
+            received = self._swaps_received - marks['received']
+            prewitness_lags = self._prewitness_lags[marks['prewitness_lags']:]
+        evicted = sum(stream.dropped for stream in self._streams.values()) - marks['evicted']
+
+        report = {
+            'swaps_per_second': profile.swaps_per_second,
+            'fills_per_block': profile.fills_per_block,
+            'blocks': blocks,
+            'swaps_injected': injected,
+            'swaps_received': received,
+            'swaps_dropped': max(injected - received, 0) + evicted,
+            'fills_processed': self._fills_processed - marks['fills']
+        }
+        report.update(_percentiles(prewitness_lags, 'prewitness_lag'))
+        report.update(_percentiles(self._fill_lags[marks['fill_lags']:], 'fill_lag'))
+        report.update(_percentiles(self._loop_lags[marks['loop_lags']:], 'loop_lag'))
+        return report
+
+    async def run(self, profiles: list, settle_time: Optional[float] = None) -> list:
+        """
+        run each load level in turn against a fresh mock node
+        :param profiles: list of LoadProfile
+        :param settle_time: optional float seconds to let streams catch up after each level, defaults to 2 blocks
+        :return: list of dict reports, one per load level
+        """
+        settle_time = settle_time if settle_time is not None else 2 * self._block_time
+        previous_level = logger.level
+        logger.setLevel(self._log_level)
+        self._start_node()
+        try:
+            await self._start_consumers()
+            reports = list()
+            for profile in profiles:
+                logger.warning(f'Load generator running {profile}')
+                marks = self._marks()
+                future = asyncio.run_coroutine_threadsafe(self._drive(profile), self._node_loop)
+                blocks = await asyncio.wrap_future(future)
+                await asyncio.sleep(settle_time)
+                reports.append(self._report(profile, blocks, marks))
+            await self._stop_consumers()
+            return reports
+        finally:
+            self._stop_node()
+            logger.setLevel(previous_level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run increasing load levels against a local mock Chainflip node')
+    parser.add_argument('--pairs', nargs='+', default=['ETH', 'BTC'])
+    parser.add_argument('--rates', nargs='+', type=float, default=[10, 100, 1000], help='swaps per second per level')
+    parser.add_argument('--fills', nargs='+', type=int, default=[10, 100, 1000], help='fills per block per level')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per level')
+    parser.add_argument('--block-time', type=float, default=1.0)
+    parser.add_argument('--burst-probability', type=float, default=0.0)
+    parser.add_argument('--burst-factor', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=None)
+    arguments = parser.parse_args()
+
+    if len(arguments.fills) == 1:
+        arguments.fills = arguments.fills * len(arguments.rates)
+    if len(arguments.fills) != len(arguments.rates):
+        parser.error('--fills must be given once or once per rate')
+
+    profiles = [
+        LoadProfile(rate, fills, arguments.duration, arguments.burst_probability, arguments.burst_factor)
+        for rate, fills in zip(arguments.rates, arguments.fills)
+    ]
+    generator = LoadGenerator(tuple(arguments.pairs), arguments.block_time, seed=arguments.seed)
+    reports = asyncio.run(generator.run(profiles))
+
+    import pandas as pd
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(pd.DataFrame(reports).set_index('swaps_per_second'))
+
+
+if __name__ == '__main__':
+    main()
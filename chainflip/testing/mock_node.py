@@ -0,0 +1,538 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+
+from collections import Counter, defaultdict
+from typing import Optional
+
+from aiohttp import web, WSMsgType
+
+import chainflip.utils.constants as CONSTANTS
+import chainflip.utils.format as formatter
+import chainflip.utils.logger as log
+
+from chainflip.backtest.exchange import SimulatedExchange, asset_balances_result
+from chainflip.backtest.matching_engine import SimulatedPool, liquidity_for_amounts
+from chainflip.utils.clock import Clock, get_clock
+
+
+logger = log.setup_custom_logger('root')
+
+DEFAULT_PRICES = {
+    'ETH': 2000.0,
+    'BTC': 60000.0,
+    'DOT': 7.0
+}
+
+DEFAULT_POOL_INFO = {
+    'limit_order_fee_hundredth_pips': 500,
+    'range_order_fee_hundredth_pips': 500
+}
+
+
+class JsonRpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def encode_price(price: float, base_asset: str, quote_asset: str = 'USDC') -> str:
+    """
+    encode a price as the u256 128.128 fixed point hex string sent by cf_subscribe_pool_price
+    :param price: float price of base asset in quote asset
+    :param base_asset: str for the base asset
+    :param quote_asset: str for the quote asset
+    :return: hex string, inverse of formatter.hex_price_to_decimal
+    """
+    raw = price * CONSTANTS.UNIT_CONVERTER[quote_asset] / CONSTANTS.UNIT_CONVERTER[base_asset]
+    return hex(int(raw * (1 << 128)))
+
+
+class MockChainflipNode(object):
+    """
+    Local stand-in for a Chainflip node and LP API.
+    Serves the json rpc methods and subscriptions used by the market maker over http and websockets on two
+    ports (LP API and node RPC), backed by the simulated matching engine. Blocks are produced every
+    block_time seconds, swaps injected with inject_swap are announced to prewitness subscribers straight away
+    and executed after the chain's confirmation blocks. Latency, jitter and an error rate can be injected
+    into every request.
+    """
+
+    def __init__(
+            self,
+            lp_account: str = 'cFmockLiquidityProvider',
+            host: str = 'localhost',
+            lp_port: int = 10589,
+            rpc_port: int = 9944,
+            block_time: Optional[float] = CONSTANTS.BLOCK_TIMINGS['Chainflip'],
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            initial_balances: Optional[dict] = None,
+            prices: Optional[dict] = None,
+            pool_info: Optional[dict] = None,
+            seed: Optional[int] = None,
+            clock: Optional[Clock] = None
+    ):
+        self._lp_account = lp_account
+        self._host = host
+        self._ports = {'lp': lp_port, 'rpc': rpc_port}
+        self._block_time = block_time
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._clock = clock if clock is not None else get_clock()
+        self._block_number = 0
+        self._prices = dict()
+        self._pending_swaps = defaultdict(list)
+        self._subscriptions = defaultdict(dict)
+        self._subscription_ids = itertools.count(1)
+        self._runners = list()
+        self._block_task = None
+        self._request_counts = Counter()
+        self._error_counts = Counter()
+
+        self._exchange = SimulatedExchange()
+        for base_asset, price in (prices or DEFAULT_PRICES).items():
+            self.add_pool(base_asset, price, pool_info)
+        for asset, amount in (initial_balances or {'USDC': 1000000.0, 'ETH': 500.0, 'BTC': 20.0}).items():
+            self._exchange.deposit(lp_account, asset, amount)
+
+        self._methods = {
+            'lp': {
+                'lp_set_limit_order': self._lp_set_limit_order,
+                'lp_update_limit_order': self._lp_update_limit_order,
+                'lp_set_range_order': self._lp_set_range_order,
+                'lp_asset_balances': self._lp_asset_balances,
+            },
+            'rpc': {
+                'cf_pool_orders': self._cf_pool_orders,
+                'cf_pool_info': self._cf_pool_info,
+                'cf_pool_liquidity': self._cf_pool_liquidity,
+                'system_health': self._system_health,
+            }
+        }
+        self._subscription_methods = {
+            'lp': {'lp_subscribe_order_fills'},
+            'rpc': {'cf_subscribe_pool_price', 'cf_subscribe_prewitness_swaps'}
+        }
+
+    @property
+    def exchange(self) -> SimulatedExchange:
+        return self._exchange
+
+    @property
+    def lp_account(self) -> str:
+        return self._lp_account
+
+    @property
+    def block_number(self) -> int:
+        return self._block_number
+
+    @property
+    def request_counts(self) -> Counter:
+        return self._request_counts
+
+    @property
+    def error_counts(self) -> Counter:
+        return self._error_counts
+
+    @property
+    def lp_url(self) -> str:
+        return f'http://{self._host}:{self._ports["lp"]}'
+
+    @property
+    def rpc_url(self) -> str:
+        return f'http://{self._host}:{self._ports["rpc"]}'
+
+    @property
+    def lp_ws_url(self) -> str:
+        return f'ws://{self._host}:{self._ports["lp"]}'
+
+    @property
+    def rpc_ws_url(self) -> str:
+        return f'ws://{self._host}:{self._ports["rpc"]}'
+
+    def add_pool(self, base_asset: str, price: float, pool_info: Optional[dict] = None):
+        """
+        add a base asset / USDC pool
+        :param base_asset: str for the base asset
+        :param price: float initial pool price
+        :param pool_info: optional dict returned by cf_pool_info, defaults to 5 bps fees
+        """
+        pool = SimulatedPool(base_asset, 'USDC', dict(pool_info or DEFAULT_POOL_INFO))
+        pool.set_price(price)
+        self._exchange.add_pool(pool)
+        self._prices[f'{pool.base_asset}-{pool.quote_asset}'] = price
+
+    def set_price(self, base_asset: str, price: float, quote_asset: str = 'USDC'):
+        """
+        set the pool price reached at the end of the next block
+        """
+        self._prices[f'{formatter.asset_to_str(base_asset)}-{formatter.asset_to_str(quote_asset)}'] = price
+
+    def price(self, base_asset: str, quote_asset: str = 'USDC') -> float:
+        return self._prices[f'{formatter.asset_to_str(base_asset)}-{formatter.asset_to_str(quote_asset)}']
+
+    async def inject_swap(self, from_asset: str, to_asset: str, amount: float, confirmation_blocks: int = None):
+        """
+        announce a swap to prewitness subscribers and queue it for execution
+        :param from_asset: str asset sold by the swap
+        :param to_asset: str asset bought by the swap
+        :param amount: float amount of from_asset
+        :param confirmation_blocks: optional integer blocks until execution, defaults to the chain confirmations
+        """
+        from_asset = formatter.asset_to_str(from_asset)
+        to_asset = formatter.asset_to_str(to_asset)
+        base_asset = to_asset if from_asset == 'USDC' else from_asset
+        if confirmation_blocks is None:
+            confirmation_blocks = CONSTANTS.CHAINFLIP_BLOCK_CONFIRMATIONS.get(base_asset, 1)
+
+        pool = self._exchange.pool(base_asset, 'USDC')
+        self._pending_swaps[self._block_number + max(confirmation_blocks, 1)].append(
+            (pool, from_asset == base_asset, amount)
+        )
+        await self._notify(
+            'cf_subscribe_prewitness_swaps',
+            [from_asset, to_asset],
+            [formatter.amount_in_asset(from_asset, amount)]
+        )
+
+    async def produce_block(self) -> list:
+        """
+        execute the swaps due in the next block, move pool prices and publish prices and fills
+        :return: list of Fill
+        """
+        self._block_number += 1
+        for pool, from_base, amount in self._pending_swaps.pop(self._block_number, list()):
+            pool.queue_swap(from_base, amount)
+        fills = self._exchange.execute_block(self._block_number, self._prices)
+
+        for key, pool in self._exchange.pools.items():
+            await self._notify(
+                'cf_subscribe_pool_price',
+                [pool.base_asset, pool.quote_asset],
+                {
+                    'price': encode_price(pool.price, pool.base_asset, pool.quote_asset),
+                    'tick': formatter.price_to_tick(pool.price, pool.base_asset)
+                }
+            )
+        await self._notify('lp_subscribe_order_fills', [], {
+            'block_hash': hex(self._block_number),
+            'block_number': self._block_number,
+            'fills': [self._format_fill(fill) for fill in fills]
+        })
+        return fills
+
+    def _format_fill(self, fill) -> dict:
+        base, quote = fill.base_asset, fill.quote_asset
+        if fill.order_type == 'range_order':
+            return {'range_order': {
+                'lp': fill.lp_account,
+                'base_asset': base,
+                'quote_asset': quote,
+                'id': fill.id,
+                'bought_amounts': {
+                    'base': hex(formatter.amount_in_asset(base, fill.base_amount)),
+                    'quote': hex(formatter.amount_in_asset(quote, fill.quote_amount))
+                },
+                'fees': hex(formatter.amount_in_asset(quote, fill.fee))
+            }}
+
+        order = self._exchange.pool(base, quote).limit_orders.get((fill.lp_account, fill.id))
+        if fill.side == CONSTANTS.Side.BUY:
+            sold, bought, fees = (quote, fill.quote_amount), (base, fill.base_amount), (base, fill.fee / fill.price)
+        else:
+            sold, bought, fees = (base, fill.base_amount), (quote, fill.quote_amount), (quote, fill.fee)
+        return {'limit_order': {
+            'lp': fill.lp_account,
+            'base_asset': base,
+            'quote_asset': quote,
+            'side': 'buy' if fill.side == CONSTANTS.Side.BUY else 'sell',
+            'id': fill.id,
+            'tick': formatter.price_to_tick(fill.price, base),
+            'sold': hex(formatter.amount_in_asset(*sold)),
+            'bought': hex(formatter.amount_in_asset(*bought)),
+            'fees': hex(formatter.amount_in_asset(*fees)),
+            'remaining': hex(formatter.amount_in_asset(sold[0], order.sell_amount if order is not None else 0))
+        }}
+
+    async def _notify(self, method: str, params: list, result):
+        for subscription_id, (websocket, subscribed_params) in list(self._subscriptions[method].items()):
+            if params and [formatter.asset_to_str(p) for p in subscribed_params] != params:
+                continue
+            try:
+                await websocket.send_str(json.dumps({
+                    'jsonrpc': '2.0',
+                    'method': method,
+                    'params': {'subscription': subscription_id, 'result': result}
+                }))
+            except ConnectionResetError:
+                self._subscriptions[method].pop(subscription_id, None)
+
+    # json rpc methods
+
+    @staticmethod
+    def _params(params, *names):
+        if isinstance(params, dict):
+            return [params.get(name) for name in names]
+        return list(params) + [None] * (len(names) - len(params))
+
+    def _lp_set_limit_order(self, params) -> dict:
+        base, quote, side, order_id, tick, sell_amount = self._params(
+            params, 'base_asset', 'quote_asset', 'side', 'id', 'tick', 'sell_amount'
+        )
+        base, quote = formatter.asset_to_str(base), formatter.asset_to_str(quote)
+        side = CONSTANTS.Side.BUY if str(side).lower() == 'buy' else CONSTANTS.Side.SELL
+        price = formatter.tick_to_price(tick, base)
+        sold_asset = quote if side == CONSTANTS.Side.BUY else base
+        sell_amount = int(str(sell_amount), 0) / CONSTANTS.UNIT_CONVERTER[sold_asset]
+        amount = sell_amount / price if side == CONSTANTS.Side.BUY else sell_amount
+        self._exchange.set_limit_order(self._lp_account, base, quote, side, order_id, price, amount, tick)
+        return {'tx_hash': hex(self._block_number), 'id': order_id, 'tick': tick}
+
+    def _lp_update_limit_order(self, params) -> dict:
+        base, quote, side, order_id, tick, amount_change = self._params(
+            params, 'base_asset', 'quote_asset', 'side', 'id', 'tick', 'amount_change'
+        )
+        base, quote = formatter.asset_to_str(base), formatter.asset_to_str(quote)
+        existing = self._exchange.pool(base, quote).limit_orders.get((self._lp_account, order_id))
+        if existing is None:
+            raise JsonRpcError(-32602, f'Limit order {order_id} does not exist')
+        sold_asset = quote if existing.side == CONSTANTS.Side.BUY else base
+        (direction, change), = amount_change.items()
+        change = int(str(change), 0) / CONSTANTS.UNIT_CONVERTER[sold_asset]
+        sell_amount = existing.sell_amount + change if 'increase' in direction.lower() else existing.sell_amount - change
+        tick = tick if tick is not None else existing.tick
+        return self._lp_set_limit_order({
+            'base_asset': base,
+            'quote_asset': quote,
+            'side': side,
+            'id': order_id,
+            'tick': tick,
+            'sell_amount': formatter.amount_in_asset(sold_asset, max(sell_amount, 0.0))
+        })
+
+    def _lp_set_range_order(self, params) -> dict:
+        base, quote, order_id, tick_range, size, size_change = self._params(
+            params, 'base_asset', 'quote_asset', 'id', 'tick_range', 'size', 'size_change'
+        )
+        base, quote = formatter.asset_to_str(base), formatter.asset_to_str(quote)
+        lower_price = formatter.tick_to_price(tick_range[0], base)
+        upper_price = formatter.tick_to_price(tick_range[1], base)
+        size = size or size_change
+        if 'Liquidity' in size:
+            liquidity = int(str(size['Liquidity']['liquidity']), 0) / CONSTANTS.UNIT_CONVERTER[base]
+        else:
+            maximum = size['AssetAmounts']['maximum']
+            liquidity = liquidity_for_amounts(
+                int(str(maximum['base']), 0) / CONSTANTS.UNIT_CONVERTER[base],
+                int(str(maximum['pair']), 0) / CONSTANTS.UNIT_CONVERTER[quote],
+                lower_price,
+                upper_price,
+                self._exchange.pool(base, quote).price
+            )
+        self._exchange.set_range_order(self._lp_account, base, quote, order_id, lower_price, upper_price, liquidity)
+        return {'tx_hash': hex(self._block_number), 'id': order_id, 'tick_range': tick_range}
+
+    def _lp_asset_balances(self, params) -> dict:
+        return asset_balances_result(self._exchange.balances(self._lp_account))
+
+    def _pool_from_params(self, params) -> SimulatedPool:
+        base, quote = self._params(params, 'base_asset', 'quote_asset')
+        return self._exchange.pool(base, quote)
+
+    def _system_health(self, params) -> dict:
+        return {'peers': 1, 'isSyncing': False, 'shouldHavePeers': True}
+
+    def _cf_pool_orders(self, params) -> dict:
+        pool = self._pool_from_params(params)
+        bids, asks, range_orders = list(), list(), list()
+        for (lp, order_id), order in pool.limit_orders.items():
+            sold_asset = pool.quote_asset if order.side == CONSTANTS.Side.BUY else pool.base_asset
+            entry = {
+                'lp': lp,
+                'id': order_id,
+                'tick': order.tick,
+                'sell_amount': hex(formatter.amount_in_asset(sold_asset, order.sell_amount))
+            }
+            (bids if order.side == CONSTANTS.Side.BUY else asks).append(entry)
+        for (lp, order_id), order in pool.range_orders.items():
+            range_orders.append({
+                'lp': lp,
+                'id': order_id,
+                'range': {
+                    'start': formatter.price_to_tick(order.lower_price, pool.base_asset),
+                    'end': formatter.price_to_tick(order.upper_price, pool.base_asset)
+                },
+                'liquidity': formatter.amount_in_asset(pool.base_asset, order.liquidity)
+            })
+        return {'limit_orders': {'asks': asks, 'bids': bids}, 'range_orders': range_orders}
+
+    def _cf_pool_info(self, params) -> dict:
+        return self._pool_from_params(params).pool_info
+
+    def _cf_pool_liquidity(self, params) -> dict:
+        pool = self._pool_from_params(params)
+        levels = {CONSTANTS.Side.BUY: defaultdict(float), CONSTANTS.Side.SELL: defaultdict(float)}
+        for order in pool.limit_orders.values():
+            levels[order.side][order.tick] += order.sell_amount
+        return {
+            'limit_orders': {
+                'bids': [
+                    {'tick': tick, 'amount': hex(formatter.amount_in_asset(pool.quote_asset, amount))}
+                    for tick, amount in sorted(levels[CONSTANTS.Side.BUY].items(), reverse=True)
+                ],
+                'asks': [
+                    {'tick': tick, 'amount': hex(formatter.amount_in_asset(pool.base_asset, amount))}
+                    for tick, amount in sorted(levels[CONSTANTS.Side.SELL].items())
+                ]
+            },
+            'range_orders': [
+                {
+                    'tick': formatter.price_to_tick(order.lower_price, pool.base_asset),
+                    'liquidity': formatter.amount_in_asset(pool.base_asset, order.liquidity)
+                }
+                for order in pool.range_orders.values()
+            ]
+        }
+
+    # transport
+
+    async def _inject_faults(self):
+        delay = self._latency + self._random.uniform(-self._jitter, self._jitter)
+        if delay > 0:
+            await self._clock.sleep(delay)
+        if self._error_rate and self._random.random() < self._error_rate:
+            raise JsonRpcError(-32603, 'Injected error')
+
+    async def _dispatch(self, api: str, payload: dict, websocket=None) -> dict:
+        method = payload.get('method')
+        response = {'jsonrpc': '2.0', 'id': payload.get('id')}
+        self._request_counts[method] += 1
+        try:
+            await self._inject_faults()
+            if method in self._subscription_methods[api]:
+                if websocket is None:
+                    raise JsonRpcError(-32601, f'{method} is only available over websockets')
+                subscription_id = next(self._subscription_ids)
+                self._subscriptions[method][subscription_id] = (websocket, payload.get('params') or list())
+                response['result'] = subscription_id
+            elif method in self._methods[api]:
+                response['result'] = self._methods[api][method](payload.get('params') or list())
+            else:
+                raise JsonRpcError(-32601, f'Method not found: {method}')
+        except JsonRpcError as e:
+            self._error_counts[method] += 1
+            response['error'] = {'code': e.code, 'message': e.message}
+        except (ValueError, KeyError, TypeError, AssertionError) as e:
+            self._error_counts[method] += 1
+            response['error'] = {'code': -32602, 'message': f'Invalid params: {e}'}
+        return response
+
+    async def _handle_websocket(self, request: web.Request, api: str) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        try:
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                response = await self._dispatch(api, json.loads(message.data), websocket)
+                await websocket.send_str(json.dumps(response))
+        finally:
+            for subscriptions in self._subscriptions.values():
+                for subscription_id, (subscribed, _) in list(subscriptions.items()):
+                    if subscribed is websocket:
+                        del subscriptions[subscription_id]
+        return websocket
+
+    def _handler(self, api: str):
+        async def handle(request: web.Request):
+            if request.headers.get('Upgrade', '').lower() == 'websocket':
+                return await self._handle_websocket(request, api)
+            payload = await request.json()
+            if isinstance(payload, list):
+                # JSON-RPC batch
+                response = list(await asyncio.gather(*(self._dispatch(api, call) for call in payload)))
+            else:
+                response = await self._dispatch(api, payload)
+            return web.json_response(response)
+        return handle
+
+    async def _produce_blocks(self):
+        while True:
+            await self._clock.sleep(self._block_time)
+            try:
+                await self.produce_block()
+            except Exception as e:
+                logger.exception(f'MockChainflipNode block production error: {e}')
+
+    async def start(self):
+        """
+        start serving the LP API and RPC ports and, if a block time is set, producing blocks
+        """
+        for api in ('lp', 'rpc'):
+            app = web.Application()
+            app.router.add_route('*', '/', self._handler(api))
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, self._host, self._ports[api])
+            await site.start()
+            self._ports[api] = runner.addresses[0][1]
+            self._runners.append(runner)
+        if self._block_time:
+            self._block_task = asyncio.create_task(self._produce_blocks())
+        logger.info(f'Mock Chainflip node serving LP API on {self.lp_url} and RPC on {self.rpc_url}')
+
+    async def stop(self):
+        if self._block_task is not None:
+            self._block_task.cancel()
+            await asyncio.gather(self._block_task, return_exceptions=True)
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+
+async def _serve(arguments):
+    node = MockChainflipNode(
+        lp_account=arguments.lp_account,
+        host=arguments.host,
+        lp_port=arguments.lp_port,
+        rpc_port=arguments.rpc_port,
+        block_time=arguments.block_time,
+        latency=arguments.latency,
+        jitter=arguments.jitter,
+        error_rate=arguments.error_rate,
+        seed=arguments.seed
+    )
+    async with node:
+        await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock Chainflip node')
+    parser.add_argument('--lp-account', default='cFmockLiquidityProvider')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--lp-port', type=int, default=10589)
+    parser.add_argument('--rpc-port', type=int, default=9944)
+    parser.add_argument('--block-time', type=float, default=CONSTANTS.BLOCK_TIMINGS['Chainflip'])
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='uniform +/- seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    parser.add_argument('--seed', type=int, default=None)
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
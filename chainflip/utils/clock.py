@@ -0,0 +1,135 @@
+import asyncio
+import datetime
+import time
+
+from typing import Optional
+
+
+class Clock(object):
+    """
+    Wall clock. Every component reads time and sleeps through a Clock so the whole system can be run on
+    virtual time in tests and simulations.
+    """
+
+    def time(self) -> float:
+        """
+        :return: float unix timestamp in seconds
+        """
+        return time.time()
+
+    def now(self) -> datetime.datetime:
+        """
+        :return: datetime for the current time
+        """
+        return datetime.datetime.now()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop running on virtual time.
+    Whenever no callback is ready to run the loop jumps straight to the next scheduled timer instead of
+    waiting for it, so sleeps complete instantly while their ordering is preserved. Real I/O still works,
+    the loop simply does not advance time while it is blocked on it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_time = 0.0
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float):
+        """
+        move virtual time forward
+        :param seconds: float seconds to advance by
+        """
+        self._virtual_time += seconds
+
+    def _run_once(self):
+        if not self._ready and self._scheduled:
+            when = self._scheduled[0].when()
+            if when > self._virtual_time:
+                self._virtual_time = when
+        super()._run_once()
+
+
+class VirtualClock(Clock):
+    """
+    Clock reading the time of a VirtualTimeEventLoop, starting from a given unix timestamp.
+    """
+
+    def __init__(self, loop: VirtualTimeEventLoop, start: Optional[float] = None):
+        self._loop = loop
+        self._start = start if start is not None else time.time()
+
+    def time(self) -> float:
+        return self._start + self._loop.time()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.time())
+
+
+class ManualClock(Clock):
+    """
+    Clock that only moves when told to, e.g. to follow block timestamps in a backtest.
+    Sleeping advances the clock by the slept time and yields to the event loop once.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._time = start
+
+    def time(self) -> float:
+        return self._time
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self._time)
+
+    def set(self, timestamp: float):
+        """
+        :param timestamp: float unix timestamp to move the clock to
+        """
+        self._time = timestamp
+
+    async def sleep(self, seconds: float):
+        self._time += seconds
+        await asyncio.sleep(0)
+
+
+_clock = Clock()
+
+
+def get_clock() -> Clock:
+    """
+    :return: the default clock used by components not given one explicitly
+    """
+    return _clock
+
+
+def set_clock(clock: Clock):
+    """
+    replace the default clock, components created afterwards use it
+    :param clock: Clock
+    """
+    global _clock
+    _clock = clock
+
+
+def run_virtual(coroutine, start: Optional[float] = None):
+    """
+    run a coroutine to completion on a VirtualTimeEventLoop with a VirtualClock as the default clock
+    :param coroutine: coroutine to run, components should be created inside it
+    :param start: optional float unix timestamp the virtual clock starts at
+    :return: result of the coroutine
+    """
+    loop = VirtualTimeEventLoop()
+    previous = get_clock()
+    set_clock(VirtualClock(loop, start))
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        set_clock(previous)
+        loop.close()
@@ -0,0 +1,188 @@
+import json
+
+from typing import Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class PoolPrice(object):
+    """
+    result of a cf_subscribe_pool_price message
+    """
+
+    __slots__ = ('price', 'tick')
+
+    def __init__(self, price: str, tick: Optional[int] = None):
+        self.price = price
+        self.tick = tick
+
+
+class JsonCodec(object):
+    """
+    Standard library json codec, always available.
+    Frames are encoded to bytes for http bodies and to str for websocket text frames. The decode_* methods
+    return the result of a subscription message, typed for the hot subscriptions.
+    """
+
+    name = 'json'
+
+    def encode(self, obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    def encode_text(self, obj) -> str:
+        return json.dumps(obj)
+
+    def decode(self, data: Union[str, bytes]):
+        return json.loads(data)
+
+    def decode_pool_price(self, data: Union[str, bytes]) -> PoolPrice:
+        result = self.decode(data)['params']['result']
+        return PoolPrice(result['price'], result.get('tick'))
+
+    def decode_prewitness_swaps(self, data: Union[str, bytes]) -> list:
+        return self.decode(data)['params']['result']
+
+    def decode_order_fills(self, data: Union[str, bytes]) -> dict:
+        return self.decode(data)['params']['result']
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson codec. orjson cannot encode integers over 64 bits (and decodes them as floats), those frames are
+    encoded with the standard library instead.
+    """
+
+    name = 'orjson'
+
+    def encode(self, obj) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            return super().encode(obj)
+
+    def encode_text(self, obj) -> str:
+        return self.encode(obj).decode()
+
+    def decode(self, data: Union[str, bytes]):
+        return orjson.loads(data)
+
+
+if msgspec is not None:
+    class _PoolPrice(msgspec.Struct):
+        price: str
+        tick: Optional[int] = None
+
+    class _PoolPriceParams(msgspec.Struct):
+        result: _PoolPrice
+
+    class _PoolPriceMessage(msgspec.Struct):
+        params: _PoolPriceParams
+
+    class _ListParams(msgspec.Struct):
+        result: list
+
+    class _ListMessage(msgspec.Struct):
+        params: _ListParams
+
+    class _DictParams(msgspec.Struct):
+        result: dict
+
+    class _DictMessage(msgspec.Struct):
+        params: _DictParams
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    msgspec codec. Subscription messages are decoded straight into structs, skipping the fields the market
+    maker does not read.
+    """
+
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._pool_price = msgspec.json.Decoder(_PoolPriceMessage)
+        self._list = msgspec.json.Decoder(_ListMessage)
+        self._dict = msgspec.json.Decoder(_DictMessage)
+
+    def encode(self, obj) -> bytes:
+        try:
+            return self._encoder.encode(obj)
+        except (TypeError, OverflowError):
+            return super().encode(obj)
+
+    def encode_text(self, obj) -> str:
+        return self.encode(obj).decode()
+
+    def decode(self, data: Union[str, bytes]):
+        return self._decoder.decode(data)
+
+    def decode_pool_price(self, data: Union[str, bytes]) -> PoolPrice:
+        result = self._pool_price.decode(data).params.result
+        return PoolPrice(result.price, result.tick)
+
+    def decode_prewitness_swaps(self, data: Union[str, bytes]) -> list:
+        return self._list.decode(data).params.result
+
+    def decode_order_fills(self, data: Union[str, bytes]) -> dict:
+        return self._dict.decode(data).params.result
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgspecCodec.name: MsgspecCodec
+}
+
+
+def available_codecs() -> list:
+    """
+    :return: list of codec names that can be used here, fastest first
+    """
+    available = list()
+    if msgspec is not None:
+        available.append(MsgspecCodec.name)
+    if orjson is not None:
+        available.append(OrjsonCodec.name)
+    available.append(JsonCodec.name)
+    return available
+
+
+def create_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    :param name: optional str codec name, defaults to the fastest available
+    :return: codec
+    """
+    if name is None:
+        name = available_codecs()[0]
+    if name not in available_codecs():
+        raise ValueError(f'Codec {name} is not available, choose from {available_codecs()}')
+    return CODECS[name]()
+
+
+_codec = create_codec()
+
+
+def get_codec() -> JsonCodec:
+    """
+    :return: the codec used by every transport and stream
+    """
+    return _codec
+
+
+def set_codec(codec: Union[str, JsonCodec]):
+    """
+    replace the default codec
+    :param codec: codec or codec name, e.g. 'json' to go back to the standard library
+    """
+    global _codec
+    _codec = create_codec(codec) if isinstance(codec, str) else codec
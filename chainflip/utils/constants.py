@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 version = 'Perseverance'
 
@@ -15,6 +15,7 @@ class APICommands(Enum):
     UpdateLimitOrder = 10
     SetLimitOrder = 11
     GetOpenSwapChannels = 12
+    CancelOrders = 13
 
 
 class RPCCommands(Enum):
@@ -50,7 +51,17 @@ ASSETS = {
     'USDC': 'USDC',
     'ETH': 'ETH',
     'BTC': 'BTC',
-    'DOT': 'DOT'
+    'DOT': 'DOT',
+    'FLIP': 'FLIP'
+}
+
+
+ASSET_CHAINS = {
+    'USDC': 'Ethereum',
+    'ETH': 'Ethereum',
+    'FLIP': 'Ethereum',
+    'BTC': 'Bitcoin',
+    'DOT': 'Polkadot'
 }
 
 
@@ -76,6 +87,14 @@ class RangeOrderType(Enum):
     ASSET = 2
 
 
+class RequestPriority(IntEnum):
+    # lower values are sent first: risk reducing requests before new risk
+    CANCEL = 0
+    AMEND = 1
+    NEW = 2
+    QUERY = 3
+
+
 DECIMALS = {
     'DOT': 10,
     'ETH': 18,
@@ -94,6 +113,8 @@ UNIT_CONVERTER = {
 
 TICK_SIZE = 2
 
+HUNDREDTH_PIPS = 10 ** 6
+
 BLOCK_TIMINGS = {
     'Chainflip': 6,
     'Bitcoin': 600,
@@ -102,6 +123,7 @@ BLOCK_TIMINGS = {
     'ETH': 6,
     'Polkadot': 6,
     'DOT': 6,
+    'FLIP': 6,
     'USDC': 6
 }
 
@@ -110,4 +132,6 @@ CHAINFLIP_BLOCK_CONFIRMATIONS = {
     'ETH': 8,
     'Bitcoin': 3,  # i.e. 3 blocks at 600 secs (10 mins) a block - on mainnet btc = 3 blocks
     'BTC': 3,
+    'USDC': 8,  # ERC20 on Ethereum
+    'FLIP': 8,  # ERC20 on Ethereum
 }
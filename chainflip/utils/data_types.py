@@ -1,17 +1,20 @@
 import datetime
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 import chainflip.utils.constants as CONSTANTS
 
+from chainflip.utils.tracing import Trace
 
-@dataclass
+
+@dataclass(slots=True)
 class PrewitnessedSwap:
     base_asset: str
     quote_asset: str
     amount: int
     end_time: datetime.datetime
+    trace: Optional[Trace] = field(default=None, repr=False, compare=False)
 
     def __lt__(self, other):
         return self.end_time < other.end_time
@@ -20,7 +23,7 @@ class PrewitnessedSwap:
         return f'Witnessed - {self.base_asset} to {self.quote_asset}, amount={self.amount}'
 
 
-@dataclass
+@dataclass(slots=True)
 class LimitOrder:
     amount: float
     price: float
@@ -37,7 +40,7 @@ class LimitOrder:
                f'lp = {self.lp_account}, timestamp = {self.timestamp}'
 
 
-@dataclass
+@dataclass(slots=True)
 class RangeOrder:
     lower_price: float
     upper_price: float
@@ -63,7 +66,32 @@ class RangeOrder:
                    f'min_amounts = {self.min_amounts}, max_amounts = {self.max_amounts}, lp = {self.lp_account}'
 
 
-@dataclass
+@dataclass(slots=True)
+class Fill:
+    base_asset: str
+    quote_asset: str
+    id: hex
+    side: CONSTANTS.Side
+    base_amount: float
+    quote_amount: float
+    fee: float = 0.0
+    order_type: str = 'limit_order'
+    block_number: Optional[int] = None
+    lp_account: Optional[str] = None
+
+    @property
+    def price(self) -> float:
+        if self.base_amount == 0:
+            return 0.0
+        return self.quote_amount / self.base_amount
+
+    def __str__(self):
+        return f'Fill - {self.base_asset}{self.quote_asset}: {self.order_type} id = {self.id}, ' \
+               f'side = {self.side.name}, base_amount = {self.base_amount}, quote_amount = {self.quote_amount}, ' \
+               f'fee = {self.fee}, block = {self.block_number}, lp = {self.lp_account}'
+
+
+@dataclass(slots=True)
 class BinanceKline:
     start_time: datetime.datetime
     end_time: datetime.datetime
@@ -1,11 +1,22 @@
+import atexit
+import copy
 import logging
+import logging.handlers
 import datetime
 import pathlib
+import queue
 
+from collections import defaultdict
+from enum import Enum
 from pathlib import Path
+from typing import Optional
 
 
 loggers = {}
+_queue_listeners = {}
+
+# arguments the listener thread can format later, the event loop cannot change them in the meantime
+_IMMUTABLE_ARGS = (str, int, float, bytes, Enum, type(None))
 
 
 def setup_custom_logger(name, log_level=logging.INFO):
@@ -23,6 +34,7 @@ def setup_custom_logger(name, log_level=logging.INFO):
     logger.setLevel(log_level)
 
     log = Path(f'{path}/../logs/{datetime.datetime.now()}.log')
+    log.parent.mkdir(parents=True, exist_ok=True)
     log.touch(exist_ok=True)
 
     fh = logging.FileHandler(log)
@@ -32,3 +44,136 @@ def setup_custom_logger(name, log_level=logging.INFO):
     logger.addHandler(handler)
     logger.addHandler(fh)
     return logger
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through every record above sample_level and one in every sample_rate records at or below it, counted
+    per message template, so the first occurrence of a message is always logged and high frequency messages
+    (price ticks, candles, per order logs) are thinned out.
+    Messages need to use lazy %s formatting for their template to be stable.
+    """
+
+    def __init__(self, sample_level: int = logging.INFO, sample_rate: int = 1):
+        super().__init__()
+        self._sample_level = sample_level
+        self._sample_rate = sample_rate
+        self._counts = defaultdict(int)
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self._sample_rate <= 1 or record.levelno > self._sample_level:
+            return True
+        key = (record.module, record.msg)
+        count = self._counts[key]
+        self._counts[key] = count + 1
+        if count % self._sample_rate == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves I/O to the listener thread and drops records instead of blocking when the queue is
+    full. Records whose arguments are all immutable scalars are enqueued unformatted and formatted by the
+    listener. Other arguments, e.g. orders or balance dicts the event loop keeps changing, are rendered into the
+    message on the calling thread, so the line shows their state at the time of the call.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args or (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _rotating_handler(handler: logging.FileHandler, max_bytes: int, backup_count: int,
+                      rotate_when: Optional[str]) -> logging.Handler:
+    if rotate_when is not None:
+        rotating = logging.handlers.TimedRotatingFileHandler(
+            handler.baseFilename, when=rotate_when, backupCount=backup_count
+        )
+    else:
+        rotating = logging.handlers.RotatingFileHandler(
+            handler.baseFilename, maxBytes=max_bytes, backupCount=backup_count
+        )
+    rotating.setFormatter(handler.formatter)
+    rotating.setLevel(handler.level)
+    handler.close()
+    return rotating
+
+
+def enable_queue_logging(name: str = 'root',
+                         max_bytes: int = 50 * 1024 * 1024,
+                         backup_count: int = 5,
+                         rotate_when: Optional[str] = None,
+                         sample_level: int = logging.INFO,
+                         sample_rate: int = 1,
+                         queue_size: int = 100000) -> LazyQueueHandler:
+    """
+    move a logger's handlers onto a background thread. The event loop thread only enqueues the record, the
+    message is formatted and written by the listener thread. File handlers are replaced by rotating ones.
+    :param name: str logger name as passed to setup_custom_logger
+    :param max_bytes: integer size a log file is rotated at
+    :param backup_count: integer rotated files kept
+    :param rotate_when: optional str to rotate on time instead of size, e.g. 'midnight' or 'H'
+    :param sample_level: integer level at or below which records are sampled
+    :param sample_rate: integer, keep one in sample_rate records per message template, 1 keeps all
+    :param queue_size: integer records buffered before new records are dropped
+    :return: LazyQueueHandler, its dropped attribute counts records dropped on a full queue
+    """
+    logger = setup_custom_logger(name)
+    if name in _queue_listeners:
+        disable_queue_logging(name)
+
+    handlers = list()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, logging.FileHandler):
+            handler = _rotating_handler(handler, max_bytes, backup_count, rotate_when)
+        handlers.append(handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_level, sample_rate))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    logger.addHandler(queue_handler)
+    _queue_listeners[name] = (listener, queue_handler, handlers)
+    return queue_handler
+
+
+def disable_queue_logging(name: str = 'root'):
+    """
+    flush the queue and write from the calling thread again
+    :param name: str logger name
+    """
+    if name not in _queue_listeners:
+        return
+    listener, queue_handler, handlers = _queue_listeners.pop(name)
+    listener.stop()
+    logger = logging.getLogger(name)
+    logger.removeHandler(queue_handler)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+
+@atexit.register
+def _stop_queue_listeners():
+    for name in list(_queue_listeners):
+        disable_queue_logging(name)
@@ -0,0 +1,73 @@
+import gc
+import os
+import resource
+import weakref
+
+from collections import defaultdict
+from typing import Callable, Optional
+
+import chainflip.utils.metrics as metrics
+
+
+RETAINED_ITEMS = metrics.Gauge(
+    'chainflip_retained_items', 'Items held by long lived collections', ('component', 'collection')
+)
+RESIDENT_BYTES = metrics.Gauge('chainflip_process_resident_bytes', 'Resident set size of the process')
+
+_tracked = defaultdict(dict)
+
+
+def _resident_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+RESIDENT_BYTES.set_function(_resident_bytes)
+
+
+def track(component: str, collection: str, size: Callable[..., int], owner: Optional[object] = None):
+    """
+    register a long lived collection for the memory report and the chainflip_retained_items gauge
+    :param component: str owner, e.g. 'order_tracker' or 'order_book.ETH'
+    :param collection: str collection name
+    :param size: callable returning the number of items currently held, given the owner when there is one
+    :param owner: optional instance holding the collection, only weakly referenced, its collections are no longer
+    reported once it is gone
+    """
+    _tracked[component][collection] = (size, weakref.ref(owner) if owner is not None else None)
+    RETAINED_ITEMS.labels(component, collection).set_function(size, owner)
+
+
+def _sizes() -> dict:
+    components = dict()
+    for component, collections in list(_tracked.items()):
+        sizes = dict()
+        for collection, (size, owner) in list(collections.items()):
+            instance = owner() if owner is not None else None
+            if owner is None:
+                sizes[collection] = size()
+            elif instance is not None:
+                sizes[collection] = size(instance)
+            else:
+                del collections[collection]
+        if sizes:
+            components[component] = sizes
+        elif not collections:
+            del _tracked[component]
+    return components
+
+
+def report() -> dict:
+    """
+    :return: dict with the process resident and peak resident bytes, garbage collector object counts per
+    generation and the items held by every tracked collection per component
+    """
+    return {
+        'resident_bytes': _resident_bytes(),
+        'peak_resident_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'gc_objects': gc.get_count(),
+        'components': _sizes()
+    }
@@ -0,0 +1,408 @@
+import asyncio
+import bisect
+import math
+import time
+import weakref
+
+from typing import Callable, Optional
+
+from aiohttp import web
+
+import chainflip.utils.logger as log
+
+
+logger = log.setup_custom_logger('root')
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DECODE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _CounterValue(object):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeValue(object):
+    __slots__ = ('value', 'function', 'owner')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.owner = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[..., float], owner: Optional[object] = None):
+        """
+        read the gauge from a function at scrape time instead of tracking it on the hot path.
+        With an owner, the function is given the owner and only a weak reference to it is kept: the registry never
+        keeps an instance alive and the gauge is dropped from the scrape once its owner is gone
+        :param function: callable returning the value, called with the owner when there is one
+        :param owner: optional instance the value is read from, e.g. the OMS registering its open orders gauge
+        """
+        self.function = function
+        self.owner = weakref.ref(owner) if owner is not None else None
+
+    @property
+    def orphaned(self) -> bool:
+        return self.owner is not None and self.owner() is None
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                if self.owner is None:
+                    return float(self.function())
+                owner = self.owner()
+                return float(self.function(owner)) if owner is not None else math.nan
+            except Exception as e:
+                logger.error(f'Gauge function error: {e}')
+                return math.nan
+        return self.value
+
+
+class _HistogramValue(object):
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric(object):
+    """
+    Metric family with optional labels. Values are plain attributes updated from the event loop thread,
+    so recording is a dict lookup and an addition with no locking.
+    """
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), registry=None):
+        self._name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._children = dict()
+        if not self._label_names:
+            self._children[()] = self._new_value()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **labels):
+        """
+        :return: the value for a set of label values, keep it to skip the lookup on hot paths
+        """
+        if labels:
+            values = tuple(labels[name] for name in self._label_names)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self._label_names):
+                raise ValueError(f'{self._name} expects labels {self._label_names}, got {key}')
+            child = self._children[key] = self._new_value()
+        return child
+
+    def clear(self):
+        if self._label_names:
+            self._children.clear()
+        else:
+            self._children[()] = self._new_value()
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self._name} {self._documentation}', f'# TYPE {self._name} {self.kind}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def _samples(self) -> list:
+        return [
+            f'{self._name}_total{_format_labels(self._label_names, key)} {_format_value(child.value)}'
+            for key, child in self._children.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_value(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+    def set_function(self, function: Callable[..., float], owner: Optional[object] = None):
+        self._children[()].set_function(function, owner)
+
+    def _samples(self) -> list:
+        for key in [key for key, child in self._children.items() if child.orphaned]:
+            if self._label_names:
+                del self._children[key]
+            else:
+                self._children[key] = self._new_value()
+        return [
+            f'{self._name}{_format_labels(self._label_names, key)} {_format_value(child.get())}'
+            for key, child in self._children.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS,
+                 registry=None):
+        self._buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_names, registry)
+
+    def _new_value(self):
+        return _HistogramValue(self._buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _samples(self) -> list:
+        samples = list()
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self._buckets + (math.inf,), child.counts):
+                cumulative += count
+                labels = _format_labels(self._label_names, key, f'le="{_format_value(bound)}"')
+                samples.append(f'{self._name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self._label_names, key)
+            samples.append(f'{self._name}_sum{labels} {_format_value(child.sum)}')
+            samples.append(f'{self._name}_count{labels} {child.count}')
+        return samples
+
+
+class MetricsRegistry(object):
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = dict()
+
+    @property
+    def metrics(self) -> dict:
+        return self._metrics
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+API_LATENCY = Histogram(
+    'chainflip_api_request_seconds', 'Latency of LP API requests by command', ('command',)
+)
+API_ERRORS = Counter(
+    'chainflip_api_errors', 'LP API requests answered with an error or failed by command', ('command',)
+)
+RPC_LATENCY = Histogram(
+    'chainflip_rpc_request_seconds', 'Latency of node RPC requests by command', ('command',)
+)
+RPC_ERRORS = Counter(
+    'chainflip_rpc_errors', 'Node RPC requests answered with an error or failed by command', ('command',)
+)
+RPC_HEDGES = Counter(
+    'chainflip_rpc_hedged_requests', 'Node RPC reads sent to a second node by method and the node answering first',
+    ('method', 'winner')
+)
+RPC_HEDGE_RATE = Gauge(
+    'chainflip_rpc_hedge_rate', 'Share of the recent hedged mode RPC reads sent to a second node', ('method',)
+)
+RPC_HEDGE_DELAY = Gauge(
+    'chainflip_rpc_hedge_delay_seconds', 'Delay before a hedged mode RPC read is sent to a second node', ('method',)
+)
+RPC_CACHE_REQUESTS = Counter(
+    'chainflip_rpc_cache_requests', 'Node RPC reads served by the block cache by method and result',
+    ('method', 'result')
+)
+RPC_CACHE_INVALIDATIONS = Counter(
+    'chainflip_rpc_cache_invalidations', 'Block cache invalidations by reason, new block or max age', ('reason',)
+)
+WS_MESSAGES = Counter(
+    'chainflip_ws_messages', 'Websocket messages received by subscription', ('subscription', 'pair')
+)
+WS_DECODE_SECONDS = Histogram(
+    'chainflip_ws_decode_seconds', 'Time to decode a websocket message by subscription', ('subscription', 'pair'),
+    buckets=DECODE_BUCKETS
+)
+OMS_IN_FLIGHT = Gauge(
+    'chainflip_oms_in_flight_requests', 'Order requests sent by the OMS and not yet acknowledged', ('order_type',)
+)
+OMS_OPEN_ORDERS = Gauge(
+    'chainflip_oms_open_orders', 'Orders tracked as open by the OMS', ('order_type',)
+)
+OMS_TIME_TO_FLAT = Histogram(
+    'chainflip_oms_time_to_flat_seconds', 'Time from a cancel-all to every order acknowledged closed', ('trigger',)
+)
+OMS_CANCEL_ALL = Counter(
+    'chainflip_oms_cancel_all', 'Cancel-all runs by trigger and result, flat or timeout', ('trigger', 'result')
+)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    'chainflip_scheduler_queue_depth', 'Outbound API requests waiting to be sent by priority', ('priority',)
+)
+SCHEDULER_IN_FLIGHT = Gauge(
+    'chainflip_scheduler_in_flight', 'Outbound API requests sent and not answered yet'
+)
+SCHEDULER_WAIT = Histogram(
+    'chainflip_scheduler_wait_seconds', 'Time outbound API requests wait in the queue by priority', ('priority',)
+)
+ENDPOINT_LATENCY = Gauge(
+    'chainflip_endpoint_latency_seconds', 'Moving average latency of each node endpoint', ('kind', 'endpoint')
+)
+ENDPOINT_HEALTHY = Gauge(
+    'chainflip_endpoint_healthy', 'Whether a node endpoint is in rotation', ('kind', 'endpoint')
+)
+ENDPOINT_FAILOVERS = Counter(
+    'chainflip_endpoint_failovers', 'Requests failed over to another node endpoint', ('kind',)
+)
+STRATEGY_RUNNING = Gauge(
+    'chainflip_strategy_running', 'Whether a supervised strategy or feed is running', ('name',)
+)
+STRATEGY_RESTARTS = Counter(
+    'chainflip_strategy_restarts', 'Restarts of a supervised strategy or feed after it failed', ('name',)
+)
+LEDGER_BALANCE = Gauge(
+    'chainflip_ledger_balance', 'LP balance in the local ledger by asset, free or reserved', ('asset', 'state')
+)
+LEDGER_RECONCILIATIONS = Counter(
+    'chainflip_ledger_reconciliations', 'Reconciliations of the local ledger against the exchange', ('result',)
+)
+PREWITNESS_QUEUE_DEPTH = Gauge(
+    'chainflip_prewitness_queue_depth', 'Prewitnessed swaps waiting to be consumed', ('pair',)
+)
+ORDER_BOOK_SIZE = Gauge(
+    'chainflip_order_book_orders', 'Orders in the last pool order book snapshot', ('pair', 'side')
+)
+EVENT_LOOP_LAG = Histogram(
+    'chainflip_event_loop_lag_seconds', 'How late the event loop runs a timer', buckets=LATENCY_BUCKETS
+)
+LOOP_STALL = Histogram(
+    'chainflip_loop_stall_seconds', 'How late the loop watchdog heartbeat runs', buckets=LATENCY_BUCKETS
+)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5, histogram: Histogram = EVENT_LOOP_LAG):
+    """
+    sleep for interval in a loop and record how late every wake up is
+    :param interval: float seconds between samples
+    :param histogram: Histogram the lag is recorded in
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+class MetricsServer(object):
+    """
+    Local HTTP endpoint serving a MetricsRegistry at /metrics in the Prometheus text format.
+    Reports maps further paths to functions returning a dict served as JSON, e.g. {'/memory': memory.report}.
+    """
+
+    def __init__(self,
+                 registry: Optional[MetricsRegistry] = None,
+                 host: str = 'localhost',
+                 port: int = 9100,
+                 reports: Optional[dict] = None):
+        self._registry = registry if registry is not None else REGISTRY
+        self._host = host
+        self._port = port
+        self._reports = reports if reports is not None else dict()
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self._host}:{self._port}/metrics'
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self._registry.render(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    @staticmethod
+    def _report_handler(function: Callable[[], dict]):
+        async def handle(request: web.Request) -> web.Response:
+            return web.json_response(function())
+        return handle
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        for path, function in self._reports.items():
+            app.router.add_get(path, self._report_handler(function))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+        logger.info(f'Serving metrics on {self.url}')
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,43 @@
+from typing import Callable
+
+
+class ObjectPool(object):
+    """
+    Free list of reusable objects, e.g. the order book entries rebuilt on every refresh.
+    acquire re-runs __init__ on a released object instead of allocating a new one, which saves the allocation
+    and keeps the garbage collector from running on every large refresh.
+    Released objects must no longer be referenced elsewhere.
+    """
+
+    def __init__(self, factory: Callable, max_size: int = 100000):
+        self._factory = factory
+        self._init = factory.__init__
+        self._free = list()
+        self._max_size = max_size
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._free)
+
+    def acquire(self, *args, **kwargs):
+        """
+        :return: a released object initialised with the arguments, or a new one when none are free
+        """
+        if self._free:
+            obj = self._free.pop()
+            self._init(obj, *args, **kwargs)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self._factory(*args, **kwargs)
+
+    def release(self, obj):
+        if len(self._free) < self._max_size:
+            self._free.append(obj)
+
+    def release_all(self, objects):
+        free = self._max_size - len(self._free)
+        if free > 0:
+            self._free.extend(objects[:free] if len(objects) > free else objects)
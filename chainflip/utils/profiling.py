@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from collections import Counter, deque
+from typing import Optional
+
+import chainflip.utils.logger as log
+import chainflip.utils.metrics as metrics
+
+
+logger = log.setup_custom_logger('root')
+
+
+class Stall(object):
+    """
+    A period the event loop did not get back to the watchdog in time, with what it was running.
+    """
+
+    __slots__ = ('start', 'duration', 'task', 'stack')
+
+    def __init__(self, start: float, duration: float, task: str, stack: list):
+        self.start = start
+        self.duration = duration
+        self.task = task
+        self.stack = stack
+
+    def __str__(self):
+        return f'Event loop stalled for {self.duration * 1000:.1f} ms in {self.task}'
+
+
+class LoopWatchdog(object):
+    """
+    Event loop lag watchdog.
+    A heartbeat task wakes up every interval and records how late it ran in the loop stall histogram.
+    A watchdog thread checks the heartbeat and, once it is more than threshold late, captures the task
+    and stack the loop thread is running, so a stall is attributed to what caused it (JSON decoding,
+    logging, sorting ...). Stalls are logged as warnings once they end and kept in stalls.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, max_stalls: int = 1000):
+        self._threshold = threshold
+        self._interval = interval
+        self._stalls = deque(maxlen=max_stalls)
+        self._heartbeat = time.perf_counter()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._stall = None
+
+    @property
+    def stalls(self) -> deque:
+        return self._stalls
+
+    def _running_task(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return 'no task (callback or event loop internals)'
+        return f'{task.get_name()} {task.get_coro().__qualname__}'
+
+    async def _beat(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            now = time.perf_counter()
+            metrics.LOOP_STALL.observe(max(0.0, now - start - self._interval))
+            self._heartbeat = now
+            stall = self._stall
+            if stall is not None:
+                self._stall = None
+                stall.duration = now - stall.start
+                self._stalls.append(stall)
+                logger.warning('%s\n%s', stall, ''.join(stall.stack))
+
+    def _watch(self):
+        while not self._stopped.wait(self._interval / 2):
+            late = time.perf_counter() - self._heartbeat - self._interval
+            if late < self._threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else list()
+            self._stall = Stall(self._heartbeat + self._interval, late, self._running_task(), stack)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        start watching an event loop, call from the thread running it
+        :param loop: optional event loop, defaults to the current one
+        """
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._task = self._loop.create_task(self._beat(), name='loop_watchdog')
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name='loop_watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler(object):
+    """
+    Low overhead statistical profiler.
+    A background thread samples the stack of the profiled thread every interval seconds and counts the
+    collapsed stacks, which dump writes in the format read by flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self._interval = interval
+        self._thread_id = thread_id
+        self._stacks = Counter()
+        self._samples = 0
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def samples(self) -> int:
+        return self._samples
+
+    @property
+    def stacks(self) -> Counter:
+        return self._stacks
+
+    def _sample(self):
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            labels = list()
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self._stacks[';'.join(reversed(labels))] += 1
+            self._samples += 1
+
+    def start(self, thread_id: Optional[int] = None):
+        """
+        :param thread_id: optional thread to profile, defaults to the calling thread
+        """
+        if thread_id is not None or self._thread_id is None:
+            self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name='sampling_profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path: str) -> int:
+        """
+        write collapsed stacks, one 'frame;frame;frame count' line per distinct stack
+        :param path: str output file
+        :return: integer samples written
+        """
+        stacks = list(self._stacks.items())
+        with open(path, 'w') as f:
+            for stack, count in sorted(stacks):
+                f.write(f'{stack} {count}\n')
+        logger.info('Wrote %s profiler samples to %s', sum(count for _, count in stacks), path)
+        return sum(count for _, count in stacks)
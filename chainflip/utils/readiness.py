@@ -0,0 +1,82 @@
+import asyncio
+
+from typing import Optional
+
+
+class Readiness(object):
+    """
+    One-shot readiness signal of a component: first price received, subscription confirmed, first balance
+    loaded ... Components set it once, anything can wait on it. A component failing before it got ready
+    fails the readiness, so waiting on it raises instead of running into the timeout.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._ready = False
+        self._error = None
+        self._future = None
+
+    def __str__(self):
+        return f'Readiness - {self._name}: {"ready" if self._ready else "not ready"}'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def set(self):
+        if self._ready or self._error is not None:
+            return
+        self._ready = True
+        if self._future is not None and not self._future.done():
+            self._future.set_result(self._name)
+
+    def fail(self, error: Exception):
+        """
+        :param error: exception raised to the waiters, ignored once ready
+        """
+        if self._ready or self._error is not None:
+            return
+        self._error = error
+        if self._future is not None and not self._future.done():
+            self._future.set_exception(error)
+
+    def watch(self, task: asyncio.Task):
+        """
+        fail the readiness when the task producing it ends before it got ready
+        :param task: asyncio.Task, e.g. a websocket listener
+        """
+        def done(task: asyncio.Task):
+            if task.cancelled():
+                self.fail(RuntimeError(f'{self._name} was cancelled before it was ready'))
+            elif task.exception() is not None:
+                self.fail(task.exception())
+            else:
+                self.fail(RuntimeError(f'{self._name} stopped before it was ready'))
+        task.add_done_callback(done)
+
+    def future(self) -> asyncio.Future:
+        """
+        :return: future resolved with the name once ready, bound to the running event loop
+        """
+        if self._future is None:
+            self._future = asyncio.get_running_loop().create_future()
+            if self._ready:
+                self._future.set_result(self._name)
+            elif self._error is not None:
+                self._future.set_exception(self._error)
+        return self._future
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        :param timeout: optional float seconds
+        :return: True once ready, False on timeout
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(self.future()), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
@@ -0,0 +1,238 @@
+import contextlib
+import contextvars
+import json
+import time
+import uuid
+
+from collections import OrderedDict, deque
+from typing import Optional
+
+import numpy as np
+
+import chainflip.utils.memory as memory
+import chainflip.utils.metrics as metrics
+
+
+TRACE_STAGE_SECONDS = metrics.Histogram(
+    'chainflip_trace_stage_seconds', 'Tick to trade latency by pipeline stage', ('stage',)
+)
+
+_current_trace = contextvars.ContextVar('chainflip_trace', default=None)
+
+
+class Trace(object):
+    """
+    Correlation id and ingress time of a market event (pool price update or prewitnessed swap) followed
+    through the strategy, the OMS and the fill stream.
+    """
+
+    __slots__ = ('trace_id', 'origin', 'start', 'attributes')
+
+    def __init__(self, origin: str, start: float, attributes: dict):
+        self.trace_id = uuid.uuid4().hex
+        self.origin = origin
+        self.start = start
+        self.attributes = attributes
+
+    def __str__(self):
+        return f'Trace - {self.origin} {self.trace_id}'
+
+
+class Span(object):
+    __slots__ = ('trace_id', 'span_id', 'name', 'start', 'end', 'attributes')
+
+    def __init__(self, trace_id: str, name: str, start: float, end: float, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _order_key(order_id):
+    if isinstance(order_id, str):
+        try:
+            return int(order_id, 0)
+        except ValueError:
+            return order_id
+    return order_id
+
+
+class Tracer(object):
+    """
+    Tick to trade tracer.
+    A trace is started at websocket receive and carried with the event it produced (Pool.trace,
+    PrewitnessedSwap.trace). Strategies activate it while deciding, the current trace is a context variable
+    so the OMS tasks created meanwhile inherit it. Stages recorded:
+    - ingress: websocket receive to decoded
+    - decision: ingress to the OMS submitting the order
+    - submit_to_ack: OMS submit to the LP API acknowledging it
+    - tick_to_ack: ingress to acknowledged
+    - ack_to_fill and tick_to_fill: once the order shows up in the order fills stream
+    Strategies quoting on a timer (StrategyStream) start a quote_cycle trace per cycle instead, its tick_to
+    stages run from the start of the cycle and the age of the price quoted is the tick_age attribute.
+    Durations are kept in bounded windows for percentiles and exported to the metrics endpoint, spans are
+    kept in a bounded buffer and can be exported as JSON lines.
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 100000, max_samples: int = 10000,
+                 max_orders: int = 10000):
+        self._enabled = enabled
+        self._spans = deque(maxlen=max_spans)
+        self._max_samples = max_samples
+        self._samples = dict()
+        self._histograms = dict()
+        self._orders = OrderedDict()
+        self._max_orders = max_orders
+        self._epoch = time.time() - time.perf_counter()
+        memory.track('tracer', 'spans', lambda tracer: len(tracer._spans), self)
+        memory.track(
+            'tracer', 'samples', lambda tracer: sum(len(samples) for samples in tracer._samples.values()), self
+        )
+        memory.track('tracer', 'orders', lambda tracer: len(tracer._orders), self)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def spans(self) -> deque:
+        return self._spans
+
+    def start_trace(self, origin: str, start: Optional[float] = None, **attributes) -> Optional[Trace]:
+        """
+        :param origin: str event type, e.g. pool_price or prewitness_swap
+        :param start: optional float time.perf_counter() the event was received at, defaults to now
+        :param attributes: attributes attached to every span of the trace
+        :return: Trace or None when tracing is disabled
+        """
+        if not self._enabled:
+            return None
+        return Trace(origin, start if start is not None else time.perf_counter(), attributes)
+
+    def record(self, trace: Optional[Trace], stage: str, start: float, end: Optional[float] = None, **attributes):
+        """
+        record a stage of a trace
+        :param trace: Trace, ignored when None
+        :param stage: str stage name
+        :param start: float time.perf_counter() the stage started
+        :param end: optional float time.perf_counter() the stage ended, defaults to now
+        """
+        if trace is None:
+            return
+        end = end if end is not None else time.perf_counter()
+        if attributes:
+            attributes = {**trace.attributes, **attributes}
+        else:
+            attributes = trace.attributes
+        self._spans.append(Span(trace.trace_id, stage, start, end, attributes))
+
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self._max_samples)
+            self._histograms[stage] = TRACE_STAGE_SECONDS.labels(stage)
+        samples.append(end - start)
+        self._histograms[stage].observe(end - start)
+
+    def bind_order(self, order_id, trace: Trace, acknowledged: float):
+        """
+        remember which trace placed an order so its fill can be attributed
+        """
+        self._orders[_order_key(order_id)] = (trace, acknowledged)
+        if len(self._orders) > self._max_orders:
+            self._orders.popitem(last=False)
+
+    def record_fill(self, order_id, **attributes):
+        """
+        record ack_to_fill and tick_to_fill for a filled order placed under a trace
+        """
+        traced = self._orders.pop(_order_key(order_id), None)
+        if traced is None:
+            return
+        trace, acknowledged = traced
+        now = time.perf_counter()
+        self.record(trace, 'ack_to_fill', acknowledged, now, **attributes)
+        self.record(trace, 'tick_to_fill', trace.start, now, **attributes)
+
+    def percentiles(self, quantiles: tuple = (50, 90, 99)) -> dict:
+        """
+        :return: dict of stage to count, p<quantile> and max seconds over the recent window
+        """
+        result = dict()
+        for stage, samples in self._samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+            stats = {'count': len(values)}
+            for quantile, value in zip(quantiles, np.percentile(values, quantiles)):
+                stats[f'p{quantile}'] = float(value)
+            stats['max'] = float(values.max())
+            result[stage] = stats
+        return result
+
+    def export_spans(self, path: str) -> int:
+        """
+        write the buffered spans as JSON lines with unix nanosecond timestamps
+        :param path: str output file
+        :return: integer spans written
+        """
+        with open(path, 'w') as f:
+            for span in self._spans:
+                f.write(json.dumps({
+                    'trace_id': span.trace_id,
+                    'span_id': span.span_id,
+                    'name': span.name,
+                    'start_time_unix_nano': int((span.start + self._epoch) * 1e9),
+                    'end_time_unix_nano': int((span.end + self._epoch) * 1e9),
+                    'attributes': span.attributes
+                }) + '\n')
+        return len(self._spans)
+
+    def clear(self):
+        self._spans.clear()
+        self._samples.clear()
+        self._orders.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    :return: the tracer used by every component
+    """
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """
+    replace the default tracer, e.g. with Tracer(enabled=False)
+    :param tracer: Tracer
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def current_trace() -> Optional[Trace]:
+    """
+    :return: the trace active in the current context, if any
+    """
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def activate(trace: Optional[Trace]):
+    """
+    make a trace current while deciding on an event. Tasks created inside the block inherit it.
+    :param trace: Trace or None
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
@@ -1,10 +1,63 @@
+import argparse
 import asyncio
 import signal
 
-from chainflip.run_stream_strategy_perseverance import run_stream_strategy
+import chainflip.utils.codec as codecs
+import chainflip.utils.logger as log
+import chainflip.utils.profiling as profiling
+
+from chainflip.exchange.endpoints import EndpointRegistry
+from chainflip.run_stream_strategy_perseverance import STREAM_ASSETS, run_stream_strategies
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Run the Chainflip stream strategy on every configured pool')
+    parser.add_argument('--queue-logging', action='store_true',
+                        help='format and write logs on a background thread with rotating log files')
+    parser.add_argument('--log-sample-rate', type=int, default=1,
+                        help='with --queue-logging, keep one in N info and debug records per message')
+    parser.add_argument('--codec', choices=codecs.available_codecs(), default=None,
+                        help='json codec for http bodies and websocket frames, defaults to the fastest installed')
+    parser.add_argument('--uvloop', action='store_true',
+                        help='run on the uvloop event loop when it is installed')
+    parser.add_argument('--watchdog-ms', type=float, default=None,
+                        help='log the task and stack running whenever the event loop stalls for more than N ms')
+    parser.add_argument('--profile', metavar='PATH', default=None,
+                        help='run the sampling profiler and write collapsed stacks to PATH on exit and on SIGUSR1')
+    parser.add_argument('--profile-interval', type=float, default=0.005,
+                        help='seconds between profiler samples')
+    parser.add_argument('--journal', metavar='DIR', default=None,
+                        help='journal orders to DIR and recover the open orders from it on restart')
+    parser.add_argument('--rpc-url', action='append', default=None,
+                        help='RPC node url, repeat for several nodes: reads go to the fastest healthy one')
+    parser.add_argument('--lp-url', action='append', default=None,
+                        help='LP API url, repeat for failover nodes in order of preference')
+    parser.add_argument('--assets', nargs='+', default=list(STREAM_ASSETS), metavar='ASSET',
+                        help='base assets of the pools quoted against USDC, one strategy each in this process')
+    parser.add_argument('--hedge-reads', action='store_true',
+                        help='send pool reads slower than their p95 latency to a second RPC node as well')
+    return parser.parse_args()
+
+
+def install_uvloop() -> bool:
+    try:
+        import uvloop
+    except ImportError:
+        print('uvloop is not installed, running on the default asyncio event loop')
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
 
 
 def main():
+    arguments = parse_arguments()
+    if arguments.queue_logging:
+        log.enable_queue_logging(sample_rate=arguments.log_sample_rate)
+    if arguments.codec is not None:
+        codecs.set_codec(arguments.codec)
+    if arguments.uvloop:
+        install_uvloop()
+
     mm_id = "Your MM ID"
     loop = asyncio.get_event_loop()
 
@@ -19,7 +72,34 @@ def main():
     for sig in [signal.SIGINT, signal.SIGTERM]:
         loop.add_signal_handler(sig, lambda: asyncio.create_task(graceful_shutdown(sig, loop)))
 
-    loop.run_until_complete(run_stream_strategy(mm_id))
+    watchdog = None
+    if arguments.watchdog_ms is not None:
+        watchdog = profiling.LoopWatchdog(threshold=arguments.watchdog_ms / 1000)
+        watchdog.start(loop)
+
+    profiler = None
+    if arguments.profile is not None:
+        profiler = profiling.SamplingProfiler(interval=arguments.profile_interval)
+        profiler.start()
+        loop.add_signal_handler(signal.SIGUSR1, profiler.dump, arguments.profile)
+
+    try:
+        registry = None
+        if arguments.rpc_url or arguments.lp_url:
+            registry = EndpointRegistry(rpc_urls=arguments.rpc_url, lp_urls=arguments.lp_url)
+        loop.run_until_complete(run_stream_strategies(
+            mm_id,
+            base_assets=tuple(asset.upper() for asset in arguments.assets),
+            journal_dir=arguments.journal,
+            endpoint_registry=registry,
+            hedge_reads=arguments.hedge_reads
+        ))
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+        if profiler is not None:
+            profiler.stop()
+            profiler.dump(arguments.profile)
 
 
 if __name__ == '__main__':
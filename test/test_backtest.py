@@ -0,0 +1,120 @@
+import asyncio
+
+from unittest import TestCase
+
+import numpy as np
+
+
+class TestSimulatedPool(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.backtest.matching_engine import SimulatedPool
+        self.CONSTANTS = CONSTANTS
+        self.pool = SimulatedPool('ETH', 'USDC', {'limit_order_fee_hundredth_pips': 1000})
+        self.pool.set_price(2000.0)
+
+    def test_swap_fills_limit_orders_better_than_pool_price(self):
+        self.pool.set_limit_order('lp', 1, self.CONSTANTS.Side.BUY, 2010.0, 2010.0 * 2)
+        self.pool.set_limit_order('lp', 2, self.CONSTANTS.Side.BUY, 1990.0, 1990.0 * 2)
+        self.pool.queue_swap(from_base=True, amount=1.0)
+
+        fills = self.pool.execute_block(1, 2000.0)
+        self.assertEqual(len(fills), 1)
+        self.assertEqual(fills[0].id, 1)
+        self.assertAlmostEqual(fills[0].base_amount, 0.999)
+        self.assertAlmostEqual(fills[0].price, 2010.0, delta=1.0)
+
+    def test_same_tick_orders_fill_pro_rata(self):
+        self.pool.set_limit_order('lp_1', 1, self.CONSTANTS.Side.SELL, 1990.0, 1.0)
+        self.pool.set_limit_order('lp_2', 1, self.CONSTANTS.Side.SELL, 1990.0, 3.0)
+        self.pool.queue_swap(from_base=False, amount=1990.0 * 2)
+
+        fills = {fill.lp_account: fill.base_amount for fill in self.pool.execute_block(1)}
+        self.assertAlmostEqual(fills['lp_2'] / fills['lp_1'], 3.0)
+
+    def test_price_move_crosses_limit_orders(self):
+        self.pool.set_limit_order('lp', 1, self.CONSTANTS.Side.SELL, 2050.0, 0.5)
+        self.pool.set_limit_order('lp', 2, self.CONSTANTS.Side.SELL, 2150.0, 0.5)
+
+        fills = self.pool.execute_block(1, 2100.0)
+        self.assertEqual([fill.id for fill in fills], [1])
+        self.assertAlmostEqual(fills[0].base_amount, 0.5)
+        self.assertNotIn(('lp', 1), self.pool.limit_orders)
+        self.assertIn(('lp', 2), self.pool.limit_orders)
+
+    def test_range_order_amounts(self):
+        from chainflip.backtest.matching_engine import range_order_amounts, liquidity_for_amounts
+        base, quote = range_order_amounts(100.0, 1900.0, 2100.0, 2000.0)
+        self.assertGreater(base, 0)
+        self.assertGreater(quote, 0)
+        self.assertAlmostEqual(liquidity_for_amounts(base, quote, 1900.0, 2100.0, 2000.0), 100.0)
+
+        base, quote = range_order_amounts(100.0, 1900.0, 2100.0, 2500.0)
+        self.assertEqual(base, 0)
+
+
+class TestBacktester(TestCase):
+
+    def setUp(self) -> None:
+        from chainflip.backtest.market_data import MarketHistory
+        blocks = 300
+        rng = np.random.default_rng(7)
+        price = 2000 * np.exp(np.cumsum(rng.normal(0, 0.001, blocks)))
+        swap_row = np.sort(rng.integers(0, blocks, 100))
+        swap_from_base = rng.random(100) < 0.5
+        swap_amount = np.where(swap_from_base, 1.0, 2000.0)
+        self.history = MarketHistory(
+            'ETH', 'USDC', np.arange(blocks), 6.0 * np.arange(blocks), price, price, swap_row, swap_from_base,
+            swap_amount
+        )
+
+    def test_history_swaps_in_block(self):
+        from_base, amounts = self.history.swaps_in_block(int(self.history.swap_row[0]))
+        self.assertGreater(len(amounts), 0)
+        self.assertEqual(len(from_base), len(amounts))
+
+    def test_stream_strategy_backtest(self):
+        from chainflip.backtest.backtester import Backtester
+        backtester = Backtester(self.history, initial_balances={'ETH': 10, 'USDC': 20000})
+        result = asyncio.run(backtester.run(backtester.stream_strategy(active_order_time=18, target_spread=1.0)))
+
+        self.assertEqual(len(result), 300)
+        self.assertGreater(result.summary()['fills'], 0)
+        final_value = result.columns['base_inventory'][-1] * self.history.market_price[-1] \
+            + result.columns['quote_inventory'][-1]
+        self.assertAlmostEqual(result.columns['pnl'][-1], final_value - (10 * self.history.market_price[-1] + 20000))
+
+    def test_unknown_parameter(self):
+        from chainflip.backtest.backtester import Backtester
+        backtester = Backtester(self.history)
+        with self.assertRaises(ValueError):
+            backtester.stream_strategy(not_a_parameter=1)
+
+
+class TestParameterSweep(TestCase):
+
+    def test_parameter_grid(self):
+        from chainflip.backtest.sweep import parameter_grid
+        grid = parameter_grid({'target_spread': [1, 2], 'active_order_time': [12, 18, 30]})
+        self.assertEqual(len(grid), 6)
+        self.assertIn({'target_spread': 2, 'active_order_time': 18}, grid)
+
+    def test_results_table_resume(self):
+        import tempfile
+        from chainflip.backtest.sweep import ResultsTable
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/results.jsonl'
+            table = ResultsTable(path)
+            table.append({'target_spread': 1}, {'pnl': 1.5})
+            with open(path, 'a') as f:
+                f.write('{"parameters": {"target_')
+
+            resumed = ResultsTable(path)
+            self.assertEqual(len(resumed), 1)
+            self.assertIn({'target_spread': 1}, resumed)
+            self.assertNotIn({'target_spread': 2}, resumed)
+            self.assertEqual(resumed.columns['pnl'], [1.5])
+
+            resumed.append({'target_spread': 2}, {'pnl': -0.5})
+            self.assertEqual(ResultsTable(path).columns['pnl'], [1.5, -0.5])
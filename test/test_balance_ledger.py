@@ -0,0 +1,130 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+
+class TestBalanceLedger(TestCase):
+
+    def setUp(self) -> None:
+        from chainflip.market_maker.balance_ledger import BalanceLedger
+        from chainflip.utils.clock import ManualClock
+
+        self.clock = ManualClock()
+        self.ledger = BalanceLedger(reconcile_interval=60, clock=self.clock)
+        self.ledger.reconcile({'ETH': 10.0, 'USDC': 20000.0})
+
+    def test_reservations_prevent_over_commitment(self):
+        self.assertTrue(self.ledger.reserve(('limit_order', 1), 'ETH', 6.0))
+        self.assertFalse(self.ledger.reserve(('limit_order', 2), 'ETH', 6.0))
+        self.assertEqual(self.ledger.free['ETH'], 4.0)
+        self.assertEqual(self.ledger.reserved['ETH'], 6.0)
+
+        # updating an order replaces its reservation
+        self.assertTrue(self.ledger.reserve(('limit_order', 1), 'ETH', 9.0))
+        self.assertEqual(self.ledger.free['ETH'], 1.0)
+
+        self.assertEqual(self.ledger.release(('limit_order', 1)), 9.0)
+        self.assertEqual(self.ledger.free['ETH'], 10.0)
+        self.assertEqual(self.ledger.reserved['ETH'], 0.0)
+
+    def test_fills_and_reconciliation(self):
+        self.ledger.reserve(('limit_order', 1), 'ETH', 4.0)
+        self.ledger.acknowledge(('limit_order', 1))
+        self.ledger.fill(('limit_order', 1), 'ETH', 1.5, 'USDC', 3000.0)
+        self.assertEqual(self.ledger.reserved['ETH'], 2.5)
+        self.assertEqual(self.ledger.free['USDC'], 23000.0)
+        self.assertFalse(self.ledger.due())
+
+        # the exchange agrees, an order not acknowledged yet is only reserved locally
+        self.ledger.reserve(('limit_order', 2), 'USDC', 1000.0)
+        self.assertEqual(self.ledger.reconcile({'ETH': 6.0, 'USDC': 23000.0}), {})
+        self.assertEqual(self.ledger.free['USDC'], 22000.0)
+
+        # a fill of an order the ledger does not know about is only picked up by reconciling
+        self.ledger.fill(('limit_order', 3), 'USDC', 100.0, 'ETH', 0.05)
+        self.assertTrue(self.ledger.due())
+        self.assertEqual(self.ledger.reconcile({'ETH': 6.05, 'USDC': 22900.0}), {'USDC': -100.0})
+        self.assertFalse(self.ledger.due())
+        self.clock.set(self.clock.time() + 60)
+        self.assertTrue(self.ledger.due())
+
+
+class TestOMSBalanceLedger(IsolatedAsyncioTestCase):
+
+    async def test_ledger_follows_the_exchange(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.stream import ChainflipUpdates
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            updates = ChainflipUpdates(node.lp_account, fill_handler=oms.apply_fill)
+            await updates.start_websocket(node.lp_ws_url)
+            self.assertTrue(await oms.reconcile_balances())
+            self.assertFalse(await oms.reconcile_balances())
+            self.assertEqual(oms.book_balance['ETH'], 500.0)
+
+            price = node.price('ETH')
+            sell = LimitOrder(10.0, price * 0.999, 'ETH', 'USDC', id=1, side=CONSTANTS.Side.SELL)
+            too_large = LimitOrder(491.0, price, 'ETH', 'USDC', id=2, side=CONSTANTS.Side.SELL)
+            await oms.send_limit_orders([sell, too_large])
+            await asyncio.sleep(0.1)
+            self.assertEqual(list(oms.open_limit_orders), [1])
+            self.assertEqual(oms.book_balance['ETH'], 490.0)
+
+            await node.inject_swap('USDC', 'ETH', price * 5, confirmation_blocks=1)
+            fills = await node.produce_block()
+            await asyncio.sleep(0.1)
+            self.assertTrue(fills)
+            exchange = node.exchange.balances(node.lp_account)
+            for asset in ('ETH', 'USDC'):
+                self.assertAlmostEqual(oms.book_balance[asset], exchange[asset], places=6)
+
+            await oms.delete_limit_order(sell)
+            self.assertAlmostEqual(oms.book_balance['ETH'], exchange['ETH'], places=6)
+            self.assertTrue(await oms.reconcile_balances(force=True))
+            self.assertAlmostEqual(oms.book_balance['ETH'], exchange['ETH'], places=6)
+
+            updates._update_stream.cancel()
+            await asyncio.gather(updates._update_stream, return_exceptions=True)
+
+    async def test_failed_amend_keeps_the_open_order_reserved(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.utils.data_types import LimitOrder
+
+        calls = list()
+        rejecting = False
+
+        async def api(command, *args):
+            calls.append(command)
+            return {'error': {'code': -32000, 'message': 'rejected'}} if rejecting else {'result': {}}
+
+        oms = OMS('test', 'cFlp', api_calls=api)
+        ledger = oms._order_tracker.ledger
+        ledger.reconcile({'ETH': 10.0})
+        order = LimitOrder(4.0, 2000.0, 'ETH', 'USDC', id=1, side=CONSTANTS.Side.SELL)
+        await oms.create_new_limit_order(order)
+        before = (ledger.free['ETH'], ledger.reserved['ETH'])
+        self.assertEqual(before, (6.0, 4.0))
+
+        rejecting = True
+        await oms.update_limit_order(order, price=2100.0, amount=5.0)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((ledger.free['ETH'], ledger.reserved['ETH']), before)
+        tracked = oms.open_limit_orders[1]
+        self.assertEqual((tracked.price, tracked.amount), (2000.0, 4.0))
+
+        # refused by the ledger, nothing is sent
+        await oms.update_limit_order(order, amount=20.0)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((ledger.free['ETH'], ledger.reserved['ETH']), before)
+        self.assertEqual((tracked.price, tracked.amount), (2000.0, 4.0))
+
+        rejecting = False
+        await oms.update_limit_order(order, amount=5.0)
+        self.assertEqual((ledger.free['ETH'], ledger.reserved['ETH']), (5.0, 5.0))
+        self.assertEqual(oms.open_limit_orders[1].amount, 5.0)
@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+
+class TestBenchmarkCompare(TestCase):
+
+    def setUp(self) -> None:
+        import benchmarks.runner as runner
+        self.runner = runner
+
+    def test_flags_regressions_beyond_threshold(self):
+        baseline = {'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}}
+        current = {'results': {'a': {'median': 1.05}, 'b': {'median': 1.5}, 'd': {'median': 1.0}}}
+        statuses = {row[0]: row[4] for row in self.runner.compare(baseline, current, threshold=0.1)}
+        self.assertEqual(statuses, {'a': 'ok', 'b': 'REGRESSION', 'c': 'missing', 'd': 'new'})
+
+    def test_run_selected_benchmark(self):
+        report = self.runner.run('format.tick_to_price', min_time=0.001, repeats=2)
+        self.assertEqual(list(report['results']), ['format.tick_to_price'])
+        self.assertGreater(report['results']['format.tick_to_price']['median'], 0)
+
+    def test_memory_selected_benchmark(self):
+        results = self.runner.run_memory('order_book.process_order_book[orders=100]', number=2)
+        result = results['order_book.process_order_book[orders=100]']
+        self.assertGreater(result['peak_bytes'], 0)
+        self.assertGreaterEqual(result['gc_collections'], 0)
+
+    def test_every_benchmark_has_a_baseline(self):
+        baseline = self.runner.load(self.runner.BASELINE_PATH)
+        self.assertEqual(sorted(set(self.runner.discover()) - set(baseline['results'])), [])
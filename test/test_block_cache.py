@@ -0,0 +1,53 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestBlockCache(IsolatedAsyncioTestCase):
+
+    async def test_reads_once_per_block(self):
+        import chainflip.utils.metrics as metrics
+        from chainflip.exchange.cache import BlockCache
+        from chainflip.exchange.rpc import RpcCall
+        from chainflip.exchange.stream import ChainflipUpdates
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.constants import RPCCommands
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, latency=0.05) as node:
+            cache = BlockCache()
+            updates = ChainflipUpdates(node.lp_account)
+            updates.add_block_listener(cache.new_block)
+            rpc = RpcCall('test', url=node.rpc_url, cache=cache)
+            coalesced = metrics.RPC_CACHE_REQUESTS.labels('cf_pool_orders', 'coalesced').value
+
+            responses = await asyncio.gather(*(rpc(RPCCommands.PoolOrders, 'ETH', 'USDC') for _ in range(3)))
+            self.assertTrue(all(response is responses[0] for response in responses))
+            self.assertEqual(metrics.RPC_CACHE_REQUESTS.labels('cf_pool_orders', 'coalesced').value - coalesced, 2)
+            await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            await rpc(RPCCommands.PoolOrders, 'BTC', 'USDC')
+            self.assertEqual(node.request_counts['cf_pool_orders'], 2)
+
+            await updates._process_websocket_message({'block_number': 7, 'fills': []})
+            self.assertEqual((cache.block_number, len(cache)), (7, 0))
+            await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertEqual(node.request_counts['cf_pool_orders'], 3)
+
+    async def test_errors_are_not_cached_and_entries_expire(self):
+        from chainflip.exchange.cache import BlockCache
+        from chainflip.utils.clock import ManualClock
+
+        clock = ManualClock(0.0)
+        cache = BlockCache(max_age=6, clock=clock)
+        sent = list()
+
+        async def fetch():
+            sent.append(clock.time())
+            return {'error': {'message': 'busy'}} if len(sent) == 1 else {'result': len(sent)}
+
+        self.assertIn('error', await cache.get('cf_pool_info', b'{}', fetch))
+        self.assertEqual(await cache.get('cf_pool_info', b'{}', fetch), {'result': 2})
+        self.assertEqual(await cache.get('cf_pool_info', b'{}', fetch), {'result': 2})
+        # no block reported for max_age seconds
+        clock.set(6.0)
+        self.assertEqual(await cache.get('cf_pool_info', b'{}', fetch), {'result': 3})
+        self.assertEqual(sent, [0.0, 0.0, 6.0])
@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+import time
+
+from unittest import TestCase
+
+
+class TestVirtualClock(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.clock as clock
+        self.clock = clock
+
+    def test_sleeps_complete_instantly_in_order(self):
+        events = list()
+
+        async def sleeper(name: str, seconds: float):
+            await self.clock.get_clock().sleep(seconds)
+            events.append((name, self.clock.get_clock().time()))
+
+        async def run():
+            await asyncio.gather(sleeper('slow', 1800), sleeper('fast', 6), sleeper('medium', 60))
+
+        start = time.monotonic()
+        self.clock.run_virtual(run(), start=1000.0)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual([name for name, _ in events], ['fast', 'medium', 'slow'])
+        self.assertAlmostEqual(events[-1][1], 2800.0)
+        self.assertIsInstance(self.clock.get_clock(), self.clock.Clock)
+        self.assertNotIsInstance(self.clock.get_clock(), self.clock.VirtualClock)
+
+    def test_thirty_minute_strategy_loop(self):
+        from chainflip.exchange.prewitnessing import PrewitnessedSwaps
+        from chainflip.utils.data_types import PrewitnessedSwap
+
+        async def run():
+            clock = self.clock.get_clock()
+            stream = PrewitnessedSwaps('ETH', 'USDC')
+            returned = 0
+            stop = clock.time() + 30 * 60
+            while clock.time() < stop:
+                stream.swaps.append(PrewitnessedSwap(
+                    'ETH', 'USDC', 1.0, clock.now() + datetime.timedelta(seconds=stream.block_time)
+                ))
+                returned += len(await stream.return_swaps())
+                await clock.sleep(1)
+            return returned
+
+        start = time.monotonic()
+        returned = self.clock.run_virtual(run())
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertGreater(returned, 1700)
+
+    def test_manual_clock(self):
+        clock = self.clock.ManualClock(100.0)
+        asyncio.run(clock.sleep(5))
+        self.assertEqual(clock.time(), 105.0)
+        clock.set(200.0)
+        self.assertEqual(clock.now(), datetime.datetime.fromtimestamp(200.0))
@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+
+class TestCodec(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.codec as codecs
+        self.codecs = codecs
+        self.price_frame = '{"jsonrpc":"2.0","method":"cf_subscribe_pool_price",' \
+                           '"params":{"subscription":1,"result":{"price":"0x2a","tick":-195000}}}'
+        self.fills_frame = '{"jsonrpc":"2.0","method":"lp_subscribe_order_fills",' \
+                           '"params":{"subscription":2,"result":{"block_hash":"0x1","block_number":1,"fills":[]}}}'
+        self.swaps_frame = '{"jsonrpc":"2.0","method":"cf_subscribe_prewitness_swaps",' \
+                           '"params":{"subscription":3,"result":[1500000000]}}'
+
+    def test_codecs_decode_subscriptions_alike(self):
+        for name in self.codecs.available_codecs():
+            codec = self.codecs.create_codec(name)
+            price = codec.decode_pool_price(self.price_frame)
+            self.assertEqual((price.price, price.tick), ('0x2a', -195000), name)
+            self.assertEqual(codec.decode_order_fills(self.fills_frame)['block_number'], 1, name)
+            self.assertEqual(codec.decode_prewitness_swaps(self.swaps_frame.encode()), [1500000000], name)
+
+    def test_encode_round_trip(self):
+        data = {'id': 1, 'jsonrpc': '2.0', 'params': {'amount': 10 ** 20, 'price': 2000.5}}
+        for name in self.codecs.available_codecs():
+            codec = self.codecs.create_codec(name)
+            self.assertEqual(self.codecs.JsonCodec().decode(codec.encode(data)), data, name)
+            self.assertIsInstance(codec.encode_text(data), str)
+
+    def test_set_codec(self):
+        default = self.codecs.get_codec()
+        try:
+            self.codecs.set_codec('json')
+            self.assertEqual(self.codecs.get_codec().name, 'json')
+            with self.assertRaises(ValueError):
+                self.codecs.set_codec('missing')
+        finally:
+            self.codecs.set_codec(default)
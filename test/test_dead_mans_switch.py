@@ -0,0 +1,101 @@
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestCancelAll(IsolatedAsyncioTestCase):
+
+    async def test_cancel_all_goes_flat_in_one_batch(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder, RangeOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            await oms.get_asset_balances()
+            for order_id in range(1, 11):
+                base_asset = 'ETH' if order_id % 2 else 'BTC'
+                price = node.price(base_asset)
+                side = CONSTANTS.Side.SELL if order_id % 3 else CONSTANTS.Side.BUY
+                await oms.create_new_limit_order(LimitOrder(0.1, price * 1.01, base_asset, 'USDC', order_id, side))
+            price = node.price('ETH')
+            await oms.create_new_range_order(RangeOrder(
+                price * 0.9, price * 1.1, 'ETH', 'USDC', id=11, amount=0.01, type=CONSTANTS.RangeOrderType.LIQUIDITY
+            ))
+            # an order the OMS does not know about, e.g. placed by a previous run
+            node.exchange.set_limit_order(node.lp_account, 'ETH', 'USDC', CONSTANTS.Side.SELL, 99, price * 1.2, 1.0)
+            untracked = LimitOrder(1.0, price * 1.2, 'ETH', 'USDC', 99, CONSTANTS.Side.SELL)
+            requests = node.request_counts['lp_set_limit_order']
+
+            report = await oms.cancel_all([untracked], trigger='test')
+
+            self.assertEqual(len(report['cancelled']), 12)
+            self.assertEqual(report['outstanding'], [])
+            self.assertEqual(report['time_to_flat'], oms.worst_time_to_flat)
+            self.assertEqual(node.request_counts['lp_set_limit_order'] - requests, 11)
+            for base_asset in ('ETH', 'BTC'):
+                pool = node.exchange.pool(base_asset, 'USDC')
+                self.assertEqual(dict(pool.limit_orders), {})
+                self.assertEqual(dict(pool.range_orders), {})
+            self.assertEqual((dict(oms.open_limit_orders), dict(oms.open_range_orders)), ({}, {}))
+            self.assertAlmostEqual(sum(oms._order_tracker.ledger.reserved.values()), 0)
+
+    async def test_scoped_cancel_all_leaves_other_pools_quoting(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            await oms.get_asset_balances()
+            for order_id, base_asset in enumerate(('ETH', 'ETH', 'BTC', 'BTC'), start=1):
+                price = node.price(base_asset)
+                await oms.create_new_limit_order(
+                    LimitOrder(0.01, price * 1.01, base_asset, 'USDC', order_id, CONSTANTS.Side.SELL)
+                )
+
+            report = await oms.cancel_all(trigger='test', scope=lambda order: order.base_asset == 'ETH')
+
+            self.assertEqual(sorted(order.id for order in report['cancelled']), [1, 2])
+            self.assertEqual(dict(node.exchange.pool('ETH', 'USDC').limit_orders), {})
+            self.assertEqual(len(node.exchange.pool('BTC', 'USDC').limit_orders), 2)
+            self.assertEqual(sorted(oms.open_limit_orders), [3, 4])
+
+
+class TestDeadMansSwitch(IsolatedAsyncioTestCase):
+
+    async def test_trips_on_a_stale_feed_and_rearms(self):
+        from chainflip.market_maker.dead_mans_switch import DeadMansSwitch
+        from chainflip.utils.clock import ManualClock
+
+        class Oms(object):
+            def __init__(self):
+                self.triggers = list()
+
+            async def cancel_all(self, orders=None, trigger='manual', **kwargs):
+                self.triggers.append(trigger)
+                return {'cancelled': [], 'outstanding': [], 'time_to_flat': 0.0}
+
+        clock = ManualClock(0.0)
+        oms = Oms()
+        feed = {'last_update': None}
+        switch = DeadMansSwitch(oms, heartbeat_timeout=30, clock=clock)
+        switch.watch('pool price', lambda: feed['last_update'], timeout=10)
+        switch.heartbeat()
+
+        clock.set(5.0)
+        self.assertIsNone(switch.check())
+        clock.set(11.0)
+        self.assertEqual(switch.check()[0], 'stale_feed')
+        await switch.trip(*switch.check())
+        self.assertEqual((switch.tripped, oms.triggers), ('stale_feed', ['stale_feed']))
+
+        feed['last_update'] = clock.time()
+        switch.heartbeat()
+        self.assertIsNone(switch.check())
+        switch.rearm()
+        clock.set(45.0)
+        feed['last_update'] = clock.time()
+        self.assertEqual(switch.check()[0], 'heartbeat')
@@ -0,0 +1,56 @@
+import socket
+
+from unittest import IsolatedAsyncioTestCase
+
+
+def closed_port_url() -> str:
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return f'http://localhost:{s.getsockname()[1]}'
+
+
+class TestEndpointRegistry(IsolatedAsyncioTestCase):
+
+    async def test_reads_go_to_the_fastest_healthy_node(self):
+        from chainflip.exchange.endpoints import EndpointRegistry
+        from chainflip.exchange.rpc import RpcCall
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.constants import RPCCommands
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, latency=0.05) as slow, \
+                MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as fast:
+            down = closed_port_url()
+            registry = EndpointRegistry(rpc_urls=[slow.rpc_url, down, fast.rpc_url], lp_urls=[slow.lp_url])
+            await registry.check_all()
+            await registry.check_all()
+            await registry.check_all()
+
+            self.assertEqual(registry.read().url, fast.rpc_url)
+            self.assertEqual(
+                [endpoint.url for endpoint in registry.candidates('rpc')], [fast.rpc_url, slow.rpc_url, down]
+            )
+            self.assertFalse(registry.candidates('rpc')[-1].healthy)
+            self.assertEqual(registry.read().ws_url, fast.rpc_ws_url)
+
+            response = await RpcCall('test', endpoints=registry)(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertIn('result', response)
+            self.assertEqual(fast.request_counts['cf_pool_orders'], 1)
+            self.assertEqual(slow.request_counts['cf_pool_orders'], 0)
+
+    async def test_writes_fail_over(self):
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.endpoints import EndpointRegistry
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.constants import APICommands
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            down = closed_port_url()
+            registry = EndpointRegistry(rpc_urls=[node.rpc_url], lp_urls=[down, node.lp_url], unhealthy_after=2)
+            api = ApiCall('test', endpoints=registry)
+
+            for _ in range(2):
+                self.assertIn('result', await api(APICommands.AssetBalances))
+            self.assertEqual(node.request_counts['lp_asset_balances'], 2)
+            # the preferred LP API is out of rotation after two failures, writes are pinned to the next one
+            self.assertEqual(registry.write().url, node.lp_url)
+            self.assertEqual(registry.write().ws_url, node.lp_ws_url)
@@ -0,0 +1,60 @@
+import time
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestHedgedReads(IsolatedAsyncioTestCase):
+
+    async def test_slow_node_is_hedged_and_the_budget_caps_hedges(self):
+        import chainflip.utils.metrics as metrics
+        from chainflip.exchange.endpoints import EndpointRegistry
+        from chainflip.exchange.rpc import HedgePolicy, RpcCall
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.constants import RPCCommands
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, latency=0.5) as slow, \
+                MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as fast:
+            registry = EndpointRegistry(rpc_urls=[slow.rpc_url, fast.rpc_url], lp_urls=[fast.lp_url])
+            # the slow node looked fastest so far, reads go to it first
+            registry.endpoints['rpc'][0].latency = 0.001
+            registry.endpoints['rpc'][1].latency = 0.002
+            policy = HedgePolicy(initial_delay=0.02, max_rate=0.5)
+            rpc = RpcCall('test', endpoints=registry, hedge=policy)
+            wins = metrics.RPC_HEDGES.labels('cf_pool_orders', 'hedge').value
+
+            start = time.perf_counter()
+            response = await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertLess(time.perf_counter() - start, 0.4)
+            self.assertIn('result', response)
+            self.assertEqual((slow.request_counts['cf_pool_orders'], fast.request_counts['cf_pool_orders']), (1, 1))
+            self.assertEqual(metrics.RPC_HEDGES.labels('cf_pool_orders', 'hedge').value - wins, 1)
+            self.assertEqual(policy.hedge_rate('cf_pool_orders'), 1.0)
+
+            # methods not in the policy and reads past the hedge budget go to one node only
+            await rpc(RPCCommands.PoolInfo, 'ETH', 'USDC')
+            self.assertEqual(slow.request_counts['cf_pool_info'] + fast.request_counts['cf_pool_info'], 1)
+            self.assertIsNone(policy.delay('cf_pool_orders'))
+            await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertEqual(slow.request_counts['cf_pool_orders'] + fast.request_counts['cf_pool_orders'], 3)
+            self.assertEqual(policy.hedge_rate('cf_pool_orders'), 0.5)
+
+            # unhedged reads bring the rate back under the budget and hedging resumes
+            await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertLess(policy.hedge_rate('cf_pool_orders'), 0.5)
+            self.assertIsNotNone(policy.delay('cf_pool_orders'))
+            registry.endpoints['rpc'][0].latency = 0.001
+            registry.endpoints['rpc'][1].latency = 0.002
+            await rpc(RPCCommands.PoolOrders, 'ETH', 'USDC')
+            self.assertEqual(slow.request_counts['cf_pool_orders'] + fast.request_counts['cf_pool_orders'], 6)
+            self.assertEqual(metrics.RPC_HEDGES.labels('cf_pool_orders', 'hedge').value - wins, 2)
+
+    def test_delay_follows_the_latency_quantile(self):
+        from chainflip.exchange.rpc import HedgePolicy
+
+        policy = HedgePolicy(window=100, min_samples=10, initial_delay=0.05)
+        self.assertEqual(policy.delay('cf_pool_orders'), 0.05)
+        for i in range(100):
+            policy.observe('cf_pool_orders', (i + 1) / 1000, False)
+        self.assertAlmostEqual(policy.delay('cf_pool_orders'), 0.095)
+        self.assertEqual(policy.hedge_rate('cf_pool_orders'), 0.0)
+        self.assertFalse(policy.hedges('cf_pool_info'))
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import tempfile
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestOrderJournal(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    @staticmethod
+    def order(order_id, amount: float = 1.0):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.utils.data_types import LimitOrder
+
+        return LimitOrder(amount, 2000.0, 'ETH', 'USDC', id=order_id, side=CONSTANTS.Side.SELL)
+
+    async def test_flushes_on_the_journal_clock(self):
+        from chainflip.market_maker.journal import OrderJournal
+        from chainflip.utils.clock import ManualClock
+
+        clock = ManualClock(0.0)
+        journal = OrderJournal(self.directory.name, flush_interval=30, clock=clock)
+        journal.intent(self.order('0x1'))
+        path = os.path.join(self.directory.name, OrderJournal.JOURNAL)
+        for _ in range(100):
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                break
+            await asyncio.sleep(0.001)
+        self.assertGreater(os.path.getsize(path), 0)
+        self.assertEqual(clock.time(), 30.0)
+        await journal.close()
+
+    async def test_replay_after_restart(self):
+        from chainflip.market_maker.journal import OrderJournal
+
+        journal = OrderJournal(self.directory.name, flush_interval=0.01)
+        for order_id in ('0x1', '0x2', '0x3', '0x4'):
+            journal.intent(self.order(order_id))
+        journal.ack(self.order('0x1'))
+        journal.ack(self.order('0x2'))
+        journal.amend(self.order('0x2', amount=2.0))
+        journal.reject(self.order('0x3'))
+        journal.fill('limit_order', {'id': 1, 'sold': '0xde0b6b3a7640000', 'remaining': '0x0'})
+        await asyncio.sleep(0.05)
+        # a write torn by the crash
+        with open(os.path.join(self.directory.name, OrderJournal.JOURNAL), 'a') as f:
+            f.write('{"seq": 10, "event": "ack", "ord')
+
+        recovered = OrderJournal(self.directory.name)
+        self.assertEqual(recovered.state.seq, 9)
+        self.assertEqual(recovered.state.last_order_id, 4)
+        self.assertEqual([(order.id, order.amount) for order in recovered.state.orders(pending=False)], [('0x2', 2.0)])
+        self.assertEqual([order.id for order in recovered.state.orders()], ['0x2', '0x4'])
+
+        recovered.intent(self.order('0x5'))
+        await recovered.close()
+        self.assertEqual(OrderJournal(self.directory.name).state.seq, 10)
+
+    async def test_snapshot_compacts_the_journal(self):
+        from chainflip.market_maker.journal import OrderJournal
+
+        journal = OrderJournal(self.directory.name, flush_interval=0.01, snapshot_every=100)
+        for order_id in range(1, 251):
+            journal.intent(self.order(order_id))
+            journal.ack(self.order(order_id))
+            if order_id % 2:
+                journal.cancel(self.order(order_id))
+        await journal.close()
+
+        with open(os.path.join(self.directory.name, OrderJournal.JOURNAL)) as f:
+            self.assertLess(len(f.readlines()), 150)
+        recovered = OrderJournal(self.directory.name)
+        self.assertEqual(recovered.state.seq, 625)
+        self.assertEqual(recovered.state.last_order_id, 250)
+        self.assertEqual(sorted(order.id for order in recovered.state.orders()), list(range(2, 251, 2)))
+
+    async def test_recover_only_reconciles_the_delta(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.journal import OrderJournal
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            journal = OrderJournal(self.directory.name, flush_interval=0.01)
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url), journal=journal)
+            await oms.get_asset_balances()
+            for order_id in (1, 2):
+                await oms.create_new_limit_order(self.order(order_id, amount=5.0))
+            await journal.close()
+
+            # while stopped, order 2 is closed and an order unknown to the journal is placed
+            node.exchange.set_limit_order(node.lp_account, 'ETH', 'USDC', CONSTANTS.Side.SELL, 2, 2000.0, 0.0)
+            node.exchange.set_limit_order(node.lp_account, 'ETH', 'USDC', CONSTANTS.Side.SELL, 9, 2000.0, 3.0)
+
+            journal = OrderJournal(self.directory.name, flush_interval=0.01)
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url), journal=journal)
+            await oms.get_asset_balances()
+            pool = node.exchange.pool('ETH', 'USDC')
+            open_orders = [self.order(order_id, state.sell_amount) for (_, order_id), state in pool.limit_orders.items()]
+            recovered = await oms.recover_orders(open_orders)
+            await asyncio.sleep(0.1)
+
+            self.assertEqual([order.id for order in recovered], [1])
+            self.assertEqual(list(oms.open_limit_orders), [1])
+            self.assertEqual([order_id for _, order_id in pool.limit_orders], [1])
+            self.assertEqual(oms._order_tracker.ledger.reserved['ETH'], 5.0)
+            self.assertEqual(journal.state.last_order_id, 2)
+            self.assertEqual([order.id for order in journal.state.orders()], [1])
+            await journal.close()
+
+    async def test_recover_one_pool_leaves_the_other_pools_journaled(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.journal import OrderJournal
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            journal = OrderJournal(self.directory.name, flush_interval=0.01)
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url), journal=journal)
+            await oms.get_asset_balances()
+            await oms.create_new_limit_order(self.order(1, amount=1.0))
+            btc = LimitOrder(0.01, node.price('BTC') * 1.01, 'BTC', 'USDC', 2, CONSTANTS.Side.SELL)
+            await oms.create_new_limit_order(btc)
+            await journal.close()
+
+            journal = OrderJournal(self.directory.name, flush_interval=0.01)
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url), journal=journal)
+            await oms.get_asset_balances()
+            eth_pool = node.exchange.pool('ETH', 'USDC')
+            eth_orders = [
+                self.order(order_id, state.sell_amount) for (_, order_id), state in eth_pool.limit_orders.items()
+            ]
+            # each strategy recovers its own pool from its own order book
+            for base_asset, orders in (('ETH', eth_orders), ('BTC', [btc])):
+                await oms.recover_orders(orders, scope=lambda order, asset=base_asset: order.base_asset == asset)
+            await asyncio.sleep(0.1)
+
+            self.assertEqual(sorted(oms.open_limit_orders), [1, 2])
+            self.assertEqual(sorted(order.id for order in journal.state.orders()), [1, 2])
+            self.assertEqual(len(node.exchange.pool('BTC', 'USDC').limit_orders), 1)
+            await journal.close()
@@ -0,0 +1,25 @@
+import math
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestLoadGenerator(IsolatedAsyncioTestCase):
+
+    async def test_short_run_reports_every_swap_and_fill(self):
+        from chainflip.testing.load_generator import LoadGenerator, LoadProfile
+
+        generator = LoadGenerator(pairs=('ETH', 'BTC'), block_time=0.1, seed=7)
+        reports = await generator.run(
+            [LoadProfile(swaps_per_second=100, fills_per_block=2, duration=0.5)], settle_time=0.3
+        )
+
+        report, = reports
+        self.assertEqual(report['blocks'], 5)
+        self.assertGreater(report['swaps_injected'], 0)
+        self.assertEqual(report['swaps_received'], report['swaps_injected'])
+        self.assertEqual(report['swaps_dropped'], 0)
+        self.assertGreater(report['fills_processed'], 0)
+        for lag in ('prewitness_lag', 'fill_lag'):
+            self.assertFalse(math.isnan(report[f'{lag}_p50']))
+            self.assertLessEqual(0, report[f'{lag}_p50'])
+            self.assertLess(report[f'{lag}_max'], 0.5)
@@ -0,0 +1,57 @@
+import logging
+
+from unittest import TestCase
+
+
+class TestQueueLogging(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.logger as log
+        self.log = log
+        self.logger = log.setup_custom_logger('test_queue_logging')
+        self.logger.propagate = False
+        self.path = next(h.baseFilename for h in self.logger.handlers if isinstance(h, logging.FileHandler))
+
+    def tearDown(self) -> None:
+        self.log.disable_queue_logging('test_queue_logging')
+
+    def test_sampled_records_written_by_listener(self):
+        handler = self.log.enable_queue_logging('test_queue_logging', sample_rate=3)
+        self.assertEqual(self.logger.handlers, [handler])
+        for i in range(9):
+            self.logger.info('pool price: %s', 2000 + i)
+        self.logger.warning('stream closed')
+        self.log.disable_queue_logging('test_queue_logging')
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        prices = [line for line in lines if 'pool price' in line]
+        self.assertEqual(len(prices), 3)
+        self.assertTrue(prices[0].endswith('pool price: 2000'))
+        self.assertIn('stream closed', lines[-1])
+        self.assertNotIn(handler, self.logger.handlers)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = self.log.enable_queue_logging('test_queue_logging', queue_size=1)
+        self.log._queue_listeners['test_queue_logging'][0].stop()
+        for i in range(5):
+            self.logger.info('order %s', i)
+        self.assertEqual(handler.dropped, 4)
+        self.log._queue_listeners['test_queue_logging'][0].start()
+
+    def test_mutable_arguments_rendered_when_logged(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.utils.data_types import LimitOrder
+
+        self.log.enable_queue_logging('test_queue_logging')
+        self.log._queue_listeners['test_queue_logging'][0].stop()
+        order = LimitOrder(amount=1.5, price=2000.0, base_asset='ETH', quote_asset='USDC', id='0x1',
+                           side=CONSTANTS.Side.BUY)
+        self.logger.info('creating limit order - %s', order)
+        order.amount = 0
+        self.log._queue_listeners['test_queue_logging'][0].start()
+        self.log.disable_queue_logging('test_queue_logging')
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertIn('amount = 1.5', lines[-1])
@@ -0,0 +1,107 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.metrics as metrics
+        self.metrics = metrics
+        self.registry = metrics.MetricsRegistry()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.metrics.Histogram('latency_seconds', 'Latency', ('command',), buckets=(0.1, 1.0),
+                                           registry=self.registry)
+        child = histogram.labels('SetLimitOrder')
+        for value in (0.05, 0.5, 0.5, 5.0):
+            child.observe(value)
+
+        text = self.registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{command="SetLimitOrder",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{command="SetLimitOrder",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{command="SetLimitOrder",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{command="SetLimitOrder"} 4', text)
+
+    def test_counter_and_gauge_function(self):
+        counter = self.metrics.Counter('messages', 'Messages', ('subscription',), registry=self.registry)
+        counter.labels(subscription='cf_subscribe_pool_price').inc()
+        counter.labels('cf_subscribe_pool_price').inc(2)
+        queue = [1, 2, 3]
+        gauge = self.metrics.Gauge('depth', 'Depth', registry=self.registry)
+        gauge.set_function(lambda: len(queue))
+
+        text = self.registry.render()
+        self.assertIn('messages_total{subscription="cf_subscribe_pool_price"} 3', text)
+        self.assertIn('depth 3', text)
+        with self.assertRaises(ValueError):
+            self.metrics.Gauge('depth', 'Depth', registry=self.registry)
+
+
+    def test_gauge_owners_are_weakly_referenced(self):
+        import gc
+        import weakref
+
+        class Queue(object):
+            def __init__(self, *items):
+                self.items = list(items)
+
+        gauge = self.metrics.Gauge('queue_depth', 'Depth', ('queue',), registry=self.registry)
+        first, second = Queue(1, 2), Queue(1, 2, 3)
+        gauge.labels('first').set_function(lambda queue: len(queue.items), owner=first)
+        gauge.labels('second').set_function(lambda queue: len(queue.items), owner=second)
+        self.assertIn('queue_depth{queue="first"} 2', self.registry.render())
+
+        reference = weakref.ref(first)
+        del first
+        gc.collect()
+        self.assertIsNone(reference())
+        text = self.registry.render()
+        self.assertNotIn('queue="first"', text)
+        self.assertIn('queue_depth{queue="second"} 3', text)
+
+    def test_components_are_not_kept_alive_by_their_gauges(self):
+        import gc
+        import weakref
+        import chainflip.utils.memory as memory
+        from chainflip.exchange.prewitnessing import PrewitnessedSwaps
+        from chainflip.exchange.scheduler import RequestScheduler
+        from chainflip.market_maker.balance_ledger import BalanceLedger
+
+        ledger = BalanceLedger()
+        ledger.reconcile({'ETH': 1.5})
+        components = [ledger, RequestScheduler(), PrewitnessedSwaps('ETH', 'TEST')]
+        self.assertIn('chainflip_ledger_balance{asset="ETH",state="free"} 1.5', self.metrics.REGISTRY.render())
+        self.assertIn('prewitness.ETH-TEST', memory.report()['components'])
+
+        references = [weakref.ref(component) for component in components]
+        del ledger, components
+        gc.collect()
+        self.assertEqual([reference() for reference in references], [None, None, None])
+        self.assertNotIn('prewitness.ETH-TEST', memory.report()['components'])
+        self.assertNotIn('pair="ETH-TEST"', self.metrics.REGISTRY.render())
+
+
+class TestMetricsServer(IsolatedAsyncioTestCase):
+
+    async def test_scrape_api_latency(self):
+        import aiohttp
+        import chainflip.utils.constants as CONSTANTS
+        import chainflip.utils.metrics as metrics
+        from chainflip.exchange.api import ApiCall
+        from chainflip.testing.mock_node import MockChainflipNode
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            await ApiCall('test', url=node.lp_url)(CONSTANTS.APICommands.AssetBalances)
+
+        server = metrics.MetricsServer(port=0, reports={'/memory': lambda: {'components': {}}})
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(server.url) as response:
+                    text = await response.text()
+                async with session.get(server.url.replace('/metrics', '/memory')) as response:
+                    report = await response.json()
+        finally:
+            await server.stop()
+        self.assertIn('chainflip_api_request_seconds_count{command="AssetBalances"}', text)
+        self.assertEqual(report, {'components': {}})
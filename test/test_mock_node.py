@@ -0,0 +1,72 @@
+import json
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestMockChainflipNode(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        from chainflip.testing.mock_node import MockChainflipNode
+        self.node = MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, seed=1)
+        await self.node.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.node.stop()
+
+    async def test_limit_order_round_trip(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.rpc import RpcCall
+
+        api = ApiCall('test', url=self.node.lp_url)
+        await api(CONSTANTS.APICommands.SetLimitOrder, 'ETH', 'USDC', CONSTANTS.Side.SELL, 1, 2100.0, 1.5)
+        self.assertNotIn('error', api.response)
+
+        rpc = RpcCall('test', url=self.node.rpc_url)
+        response = await rpc(CONSTANTS.RPCCommands.PoolOrders, 'ETH', 'USDC')
+        asks = response['result']['limit_orders']['asks']
+        self.assertEqual(len(asks), 1)
+        self.assertAlmostEqual(int(asks[0]['sell_amount'], 16) / 10 ** 18, 1.5)
+
+        await api(CONSTANTS.APICommands.AssetBalances)
+        self.assertNotIn('error', api.response)
+
+    async def test_subscriptions_and_swaps(self):
+        import aiohttp
+        import chainflip.utils.constants as CONSTANTS
+        import chainflip.utils.format as formatter
+
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.node.rpc_ws_url) as prices, \
+                    session.ws_connect(self.node.lp_ws_url) as fills:
+                await prices.send_str(json.dumps(
+                    {'id': 1, 'jsonrpc': '2.0', 'method': 'cf_subscribe_pool_price', 'params': ['ETH', 'USDC']}
+                ))
+                await fills.send_str(json.dumps(
+                    {'id': 1, 'jsonrpc': '2.0', 'method': 'lp_subscribe_order_fills', 'params': []}
+                ))
+                self.assertIn('result', json.loads((await prices.receive()).data))
+                self.assertIn('result', json.loads((await fills.receive()).data))
+
+                self.node.exchange.set_limit_order(
+                    self.node.lp_account, 'ETH', 'USDC', CONSTANTS.Side.SELL, 1, 2100.0, 1.0
+                )
+                self.node.set_price('ETH', 2200.0)
+                await self.node.produce_block()
+
+                price = json.loads((await prices.receive()).data)['params']['result']['price']
+                self.assertAlmostEqual(formatter.hex_price_to_decimal(price, 'ETH'), 2200.0, delta=0.01)
+                block = json.loads((await fills.receive()).data)['params']['result']
+                self.assertEqual(block['block_number'], 1)
+                self.assertEqual(block['fills'][0]['limit_order']['id'], 1)
+
+    async def test_injected_errors(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.testing.mock_node import MockChainflipNode
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, error_rate=1.0) as node:
+            api = ApiCall('test', url=node.lp_url)
+            await api(CONSTANTS.APICommands.AssetBalances)
+            self.assertIn('error', api.response)
+            self.assertEqual(node.error_counts['lp_asset_balances'], 1)
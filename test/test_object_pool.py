@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+
+class TestObjectPool(TestCase):
+
+    def test_acquire_reuses_released(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.utils.data_types import LimitOrder
+        from chainflip.utils.object_pool import ObjectPool
+
+        pool = ObjectPool(LimitOrder, max_size=1)
+        first = pool.acquire(1.0, 2000.0, 'ETH', 'USDC', 1, CONSTANTS.Side.BUY, lp_account='cFlp1')
+        pool.release_all([first, LimitOrder(1.0, 2000.0, 'ETH', 'USDC', 2, CONSTANTS.Side.BUY)])
+        self.assertEqual(pool.size, 1)
+
+        second = pool.acquire(0.5, 2100.0, 'ETH', 'USDC', 3, CONSTANTS.Side.SELL)
+        self.assertIs(second, first)
+        self.assertEqual(second, LimitOrder(0.5, 2100.0, 'ETH', 'USDC', 3, CONSTANTS.Side.SELL))
+        self.assertEqual((pool.created, pool.reused), (1, 1))
+
+    def test_order_book_keeps_own_orders(self):
+        from benchmarks.bench_order_book import synthetic_pool_orders
+        from chainflip.market_maker.order_book import OrderBook
+
+        order_book = OrderBook('ETH', lp_id='cFlp0')
+        order_book._process_order_book(synthetic_pool_orders(1000))
+        own = [(order, order.id, order.price) for order in order_book.open_lp_orders]
+        self.assertTrue(own)
+        top_bid = order_book.top_bid
+        top_bid_price = top_bid.price
+
+        order_book._process_order_book(synthetic_pool_orders(1000, seed=2))
+        self.assertEqual(top_bid.price, top_bid_price)
+        self.assertEqual(order_book._entries.reused, 0)
+
+        order_book._process_order_book(synthetic_pool_orders(1000, seed=3))
+        for order, order_id, price in own:
+            self.assertEqual((order.id, order.price, order.lp_account), (order_id, price, 'cFlp0'))
+        self.assertGreater(order_book._entries.reused, 0)
+        self.assertEqual(len(order_book.range_orders), 10)
+        recycled = order_book._next_snapshot()
+        self.assertEqual((recycled.top_bid, recycled.top_ask), (None, None))
@@ -0,0 +1,85 @@
+import asyncio
+import tempfile
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+
+class TestOrderIdAllocator(TestCase):
+
+    def test_partitions_do_not_collide(self):
+        from chainflip.market_maker.order_ids import OrderIdAllocator
+
+        allocator = OrderIdAllocator()
+        stream = allocator.register('stream-ETH')
+        jit = allocator.register('jit-ETH-USDC')
+        stream_ids = {stream.next_id() for _ in range(1000)}
+        jit_ids = {jit.next_id() for _ in range(1000)}
+
+        self.assertEqual(len(stream_ids), 1000)
+        self.assertFalse(stream_ids & jit_ids)
+        self.assertIs(allocator.owner(max(jit_ids)), jit)
+        self.assertIs(allocator.owner(hex(min(stream_ids))), stream)
+        self.assertIsNone(allocator.owner(1))
+        with self.assertRaises(ValueError):
+            allocator.register('stream-ETH')
+
+    def test_ids_continue_after_a_restart(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.market_maker.journal import OrderJournal
+        from chainflip.market_maker.order_ids import OrderIdAllocator
+        from chainflip.utils.clock import ManualClock
+        from chainflip.utils.data_types import LimitOrder
+
+        with tempfile.TemporaryDirectory() as directory:
+            clock = ManualClock(0.0)
+            journal = OrderJournal(directory)
+            partition = OrderIdAllocator(journal, clock=clock).register('stream-ETH')
+            issued = [partition.next_id() for _ in range(5)]
+            for order_id in issued:
+                journal.intent(LimitOrder(1.0, 2000.0, 'ETH', 'USDC', order_id, CONSTANTS.Side.SELL))
+
+            # the clock of the restarted process has not moved past the ids allocated before the crash
+            recovered = OrderJournal(directory)
+            allocator = OrderIdAllocator(recovered, clock=clock)
+            other = allocator.register('jit-ETH-USDC')
+            restarted = allocator.register('stream-ETH')
+            self.assertEqual(restarted.index, partition.index)
+            self.assertNotEqual(other.index, partition.index)
+            self.assertGreater(restarted.next_id(), max(issued))
+
+
+class TestFillRouting(IsolatedAsyncioTestCase):
+
+    async def test_fills_reach_the_owning_strategy(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            fills = {'ask': [], 'bid': []}
+            acks = list()
+            ask = oms.order_ids.register('ask', on_ack=acks.append, on_fill=fills['ask'].append)
+            bid = oms.order_ids.register('bid', on_fill=fills['bid'].append)
+            updates = oms.updates_stream
+            await updates.start_websocket(node.lp_ws_url)
+            await updates.start_websocket(node.lp_ws_url)
+
+            price = node.price('ETH')
+            sell = LimitOrder(10.0, price * 0.999, 'ETH', 'USDC', ask.next_id(), CONSTANTS.Side.SELL)
+            buy = LimitOrder(10.0, price * 0.9, 'ETH', 'USDC', bid.next_id(), CONSTANTS.Side.BUY)
+            await oms.create_new_limit_order(sell)
+            await oms.create_new_limit_order(buy)
+            await node.inject_swap('USDC', 'ETH', price * 5, confirmation_blocks=1)
+            await node.produce_block()
+            await asyncio.sleep(0.1)
+
+            self.assertEqual([order.id for order in acks], [sell.id])
+            self.assertTrue(fills['ask'])
+            self.assertEqual({fill['limit_order']['id'] for fill in fills['ask']}, {sell.id})
+            self.assertEqual(fills['bid'], [])
+
+            updates._update_stream.cancel()
+            await asyncio.gather(updates._update_stream, return_exceptions=True)
@@ -0,0 +1,49 @@
+import json
+
+from unittest import TestCase
+
+
+class TestLimitOrderTemplate(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.constants as CONSTANTS
+        import chainflip.utils.format as formatter
+        from chainflip.exchange.payloads import LimitOrderTemplate
+        self.CONSTANTS = CONSTANTS
+        self.formatter = formatter
+        self.template = LimitOrderTemplate
+
+    def _expected(self, side, order_id, price, amount, **extra):
+        if side == self.CONSTANTS.Side.SELL:
+            sell_amount = self.formatter.amount_in_asset('ETH', amount)
+        else:
+            sell_amount = self.formatter.amount_in_asset('USDC', amount * price)
+        return {
+            'id': 'maker "1"',
+            'jsonrpc': '2.0',
+            'method': 'lp_set_limit_order',
+            'params': {
+                'base_asset': 'ETH',
+                'quote_asset': 'USDC',
+                'side': side.name.lower(),
+                'id': order_id,
+                'tick': self.formatter.price_to_tick(price, 'ETH'),
+                'sell_amount': sell_amount,
+                'wait_for': 'NoWait',
+                **extra
+            }
+        }
+
+    def test_render_matches_request(self):
+        for side in (self.CONSTANTS.Side.BUY, self.CONSTANTS.Side.SELL):
+            template = self.template('maker "1"', 'ETH', 'USDC', side)
+            body = template.render(7, 2012.5, 1.25)
+            self.assertEqual(json.loads(body), self._expected(side, 7, 2012.5, 1.25))
+            body = template.render('0x7', 1987.0, 0.5, dispatch_at=120)
+            self.assertEqual(json.loads(body), self._expected(side, '0x7', 1987.0, 0.5, dispatch_at=120))
+
+    def test_tick_cache_is_bounded(self):
+        template = self.template('maker', 'ETH', 'USDC', self.CONSTANTS.Side.SELL, max_ticks=2)
+        template.prepare(2000.0, 2001.0, 2002.0)
+        self.assertEqual(template.tick(2002.0), self.formatter.price_to_tick(2002.0, 'ETH'))
+        self.assertLessEqual(len(template._ticks), 2)
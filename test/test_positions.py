@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tempfile
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+
+def limit_order_fill(side: str, sold: float, bought: float, fees: float = 0.0, order_id: int = 1) -> dict:
+    import chainflip.utils.format as formatter
+
+    sold_asset, bought_asset = ('USDC', 'ETH') if side == 'buy' else ('ETH', 'USDC')
+    return {'limit_order': {
+        'lp': 'lp', 'base_asset': 'ETH', 'quote_asset': 'USDC', 'side': side, 'id': order_id,
+        'sold': hex(formatter.amount_in_asset(sold_asset, sold)),
+        'bought': hex(formatter.amount_in_asset(bought_asset, bought)),
+        'fees': hex(formatter.amount_in_asset(bought_asset, fees))
+    }}
+
+
+class TestPositionTracker(TestCase):
+
+    def test_average_cost_and_realized_pnl(self):
+        from chainflip.market_maker.positions import Position
+
+        position = Position('ETH')
+        position.trade(2.0, 2000.0)
+        position.trade(2.0, 2200.0)
+        self.assertEqual(position.average_cost, 2100.0)
+        position.trade(-3.0, 2300.0)
+        self.assertAlmostEqual(position.realized_pnl, 600.0)
+        self.assertEqual(position.quantity, 1.0)
+        position.trade(-2.0, 2000.0)
+        self.assertAlmostEqual(position.realized_pnl, 500.0)
+        self.assertEqual((position.quantity, position.average_cost), (-1.0, 2000.0))
+        self.assertEqual(position.unrealized_pnl(1900.0), 100.0)
+
+    def test_fills_marks_and_time_series(self):
+        from chainflip.market_maker.positions import PositionTracker, load_time_series
+
+        class Feed(object):
+            data = type('Candle', (object,), {'close': 2050.0})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'positions.jsonl')
+            tracker = PositionTracker(data_feed={'ETH': Feed()}, path=path)
+            tracker.on_block(1, [limit_order_fill('buy', sold=4000.0, bought=2.0, fees=0.002)])
+            tracker.on_block(2, [])
+            tracker.on_block(3, [limit_order_fill('sell', sold=1.0, bought=2100.0, fees=2.1)])
+            tracker.close()
+
+            snapshot = tracker.snapshot()
+            eth = snapshot['positions']['ETH']
+            self.assertAlmostEqual(eth['quantity'], 1.002)
+            self.assertAlmostEqual(eth['average_cost'], 2000.0)
+            self.assertAlmostEqual(eth['fees'], 0.002 * 2000.0 + 2.1)
+            self.assertAlmostEqual(eth['realized_pnl'], 100.0)
+            self.assertIsNone(eth['unrealized_pnl_pool'])
+            self.assertAlmostEqual(eth['unrealized_pnl_market'], 1.002 * 50.0)
+            self.assertAlmostEqual(snapshot['cash'], -4000.0 + 2102.1)
+
+            series = load_time_series(path)
+            self.assertEqual(list(series.block_number), [1, 2, 3])
+            self.assertEqual(list(series.fills), [1, 1, 2])
+
+
+class TestPositionsFromOrderFills(IsolatedAsyncioTestCase):
+
+    async def test_positions_follow_the_exchange(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.stream import ChainflipUpdates
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.market_maker.positions import PositionTracker
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            positions = PositionTracker()
+            updates = ChainflipUpdates(node.lp_account, block_handler=positions.on_block)
+            await updates.start_websocket(node.lp_ws_url)
+            before = dict(node.exchange.balances(node.lp_account))
+
+            price = node.price('ETH')
+            await oms.create_new_limit_order(LimitOrder(10.0, price * 0.999, 'ETH', 'USDC', 1, CONSTANTS.Side.SELL))
+            await node.inject_swap('USDC', 'ETH', price * 5, confirmation_blocks=1)
+            await node.produce_block()
+            await oms.delete_limit_order(LimitOrder(0.0, price * 0.999, 'ETH', 'USDC', 1, CONSTANTS.Side.SELL))
+            await asyncio.sleep(0.1)
+
+            after = node.exchange.balances(node.lp_account)
+            position = positions.positions['ETH']
+            self.assertLess(position.quantity, 0)
+            self.assertAlmostEqual(position.quantity, after['ETH'] - before['ETH'], places=6)
+            self.assertAlmostEqual(positions.cash, after['USDC'] - before['USDC'], places=4)
+            self.assertGreater(position.fees, 0)
+
+            updates._update_stream.cancel()
+            await asyncio.gather(updates._update_stream, return_exceptions=True)
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+
+def _block(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopWatchdog(IsolatedAsyncioTestCase):
+
+    async def test_stall_records_running_task(self):
+        import chainflip.utils.metrics as metrics
+        import chainflip.utils.profiling as profiling
+        lag_samples = metrics.EVENT_LOOP_LAG.labels().count
+        stall_samples = metrics.LOOP_STALL.labels().count
+        watchdog = profiling.LoopWatchdog(threshold=0.05, interval=0.01)
+        watchdog.start()
+
+        async def decode_messages():
+            _block(0.2)
+
+        await asyncio.create_task(decode_messages(), name='ws_reader')
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+
+        self.assertEqual(len(watchdog.stalls), 1)
+        stall = watchdog.stalls[0]
+        self.assertGreaterEqual(stall.duration, 0.15)
+        self.assertIn('ws_reader', stall.task)
+        self.assertIn('decode_messages', stall.task)
+        self.assertTrue(any('_block' in line for line in stall.stack))
+        # the watchdog has its own histogram, the metrics server's event loop lag is left alone
+        self.assertEqual(metrics.EVENT_LOOP_LAG.labels().count, lag_samples)
+        self.assertGreater(metrics.LOOP_STALL.labels().count, stall_samples)
+
+
+class TestSamplingProfiler(TestCase):
+
+    def test_collapsed_stacks(self):
+        import chainflip.utils.profiling as profiling
+        profiler = profiling.SamplingProfiler(interval=0.001)
+        profiler.start()
+        _block(0.1)
+        profiler.stop()
+
+        self.assertGreater(profiler.samples, 10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.folded')
+            written = profiler.dump(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(written, profiler.samples)
+        self.assertTrue(any('test_collapsed_stacks' in line and '_block' in line for line in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+
+class TestOrderTrackerRetention(TestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.market_maker.order_tracker import OrderTracker
+        from chainflip.utils.clock import ManualClock
+        from chainflip.utils.data_types import LimitOrder
+
+        self.clock = ManualClock()
+        self.tracker = OrderTracker(max_orders=3, ttl=60, clock=self.clock)
+        self.order = lambda order_id: LimitOrder(
+            amount=1.0, price=2000.0, base_asset='ETH', quote_asset='USDC', id=order_id, side=CONSTANTS.Side.BUY
+        )
+
+    def test_size_limit_evicts_least_recently_updated(self):
+        for order_id in range(3):
+            self.tracker.add_limit_order(self.order(order_id))
+        self.tracker.add_limit_order(self.order(0))
+        self.tracker.add_limit_order(self.order(3))
+        self.assertEqual(list(self.tracker.limit_orders), [2, 0, 3])
+        self.assertEqual(self.tracker.evicted, 1)
+
+    def test_ttl_and_reconcile(self):
+        self.tracker.add_limit_order(self.order(1))
+        self.clock.set(self.clock.time() + 30)
+        self.tracker.add_limit_order(self.order(2))
+        self.tracker.add_limit_order(self.order(3))
+        self.clock.set(self.clock.time() + 31)
+        self.assertEqual([order.id for order in self.tracker.expire()], [1])
+
+        self.clock.set(self.clock.time() + 5)
+        dropped = self.tracker.reconcile([self.order(3)], grace=10)
+        self.assertEqual([order.id for order in dropped], [2])
+        self.assertEqual(list(self.tracker.limit_orders), [3])
+        self.tracker.remove_limit_order_by_key(3)
+        self.assertEqual(self.tracker.limit_orders, {})
+
+    def test_reconcile_only_drops_orders_in_scope(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.utils.data_types import LimitOrder
+
+        eth = self.order(1)
+        btc = LimitOrder(amount=1.0, price=60000.0, base_asset='BTC', quote_asset='USDC', id=2,
+                         side=CONSTANTS.Side.SELL)
+        for order in (eth, btc):
+            self.assertTrue(self.tracker.reserve(order))
+            self.tracker.add_limit_order(order)
+        free = dict(self.tracker.ledger.free)
+
+        # the ETH strategy only sees the ETH pool order book, where its order is no longer open
+        self.clock.set(self.clock.time() + 13)
+        dropped = self.tracker.reconcile([], scope=lambda order: order.base_asset == 'ETH')
+        self.assertEqual([order.id for order in dropped], [1])
+        self.assertEqual(list(self.tracker.limit_orders), [2])
+        self.assertEqual(self.tracker.ledger.free['BTC'], free['BTC'])
+        self.assertGreater(self.tracker.ledger.free['USDC'], free['USDC'])
+
+
+class TestMemoryReport(TestCase):
+
+    def test_report_tracked_collections(self):
+        import chainflip.utils.memory as memory
+        import chainflip.utils.metrics as metrics
+
+        items = [1, 2, 3]
+        memory.track('test_component', 'items', lambda: len(items))
+        report = memory.report()
+        self.assertEqual(report['components']['test_component'], {'items': 3})
+        self.assertGreater(report['peak_resident_bytes'], 0)
+        self.assertIn(
+            'chainflip_retained_items{component="test_component",collection="items"} 3', metrics.REGISTRY.render()
+        )
@@ -0,0 +1,84 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestRequestScheduler(IsolatedAsyncioTestCase):
+
+    async def test_strict_priorities(self):
+        from chainflip.exchange.scheduler import RequestScheduler
+        from chainflip.utils.constants import RequestPriority
+
+        scheduler = RequestScheduler(max_in_flight=1)
+        release = asyncio.Event()
+        sent = list()
+
+        async def request(name: str):
+            sent.append(name)
+            if name == 'blocking':
+                await release.wait()
+            return name
+
+        blocking = asyncio.create_task(scheduler.submit(RequestPriority.QUERY, request, 'blocking'))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(scheduler.submit(priority, request, priority.name.lower()))
+            for priority in (RequestPriority.QUERY, RequestPriority.NEW, RequestPriority.NEW,
+                             RequestPriority.AMEND, RequestPriority.CANCEL)
+        ]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queue_depth(RequestPriority.NEW), 2)
+        self.assertEqual(scheduler.in_flight, 1)
+
+        release.set()
+        results = await asyncio.gather(blocking, *queued)
+        self.assertEqual(sent, ['blocking', 'cancel', 'amend', 'new', 'new', 'query'])
+        self.assertEqual(results[-1], 'cancel')
+        self.assertEqual((scheduler.in_flight, scheduler.queue_depth(RequestPriority.NEW)), (0, 0))
+
+    async def test_max_in_flight_and_rate(self):
+        from chainflip.exchange.scheduler import RequestScheduler
+        from chainflip.utils.clock import ManualClock
+        from chainflip.utils.constants import RequestPriority
+
+        clock = ManualClock(0.0)
+        scheduler = RequestScheduler(max_in_flight=3, rate=10, burst=5, clock=clock)
+        in_flight = list()
+        peak = 0
+
+        async def request(i: int):
+            nonlocal peak
+            in_flight.append(i)
+            peak = max(peak, len(in_flight))
+            await asyncio.sleep(0.001)
+            in_flight.remove(i)
+            if i == 13:
+                raise ValueError('rejected')
+            return i
+
+        results = await asyncio.gather(
+            *(scheduler.submit(RequestPriority.NEW, request, i) for i in range(20)), return_exceptions=True
+        )
+        self.assertEqual(peak, 3)
+        self.assertIsInstance(results[13], ValueError)
+        self.assertEqual([result for result in results if isinstance(result, int)], [i for i in range(20) if i != 13])
+        # 5 sent from the burst, the other 15 at 10 per second
+        self.assertAlmostEqual(clock.time(), 1.5, delta=0.11)
+
+    async def test_concurrent_calls_get_their_own_responses(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.scheduler import RequestScheduler
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.constants import RequestPriority
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None, latency=0.02, jitter=0.015,
+                                     seed=3) as node:
+            api = ApiCall('test', url=node.lp_url)
+            scheduler = RequestScheduler(max_in_flight=8)
+            responses = await asyncio.gather(*(
+                scheduler.submit(RequestPriority.NEW, api, CONSTANTS.APICommands.SetLimitOrder, 'ETH', 'USDC',
+                                 CONSTANTS.Side.SELL, order_id, 2000.0 + order_id, 1.0)
+                for order_id in range(1, 9)
+            ))
+        self.assertEqual([response['result']['id'] for response in responses], list(range(1, 9)))
@@ -0,0 +1,57 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestStartupOrchestrator(IsolatedAsyncioTestCase):
+
+    async def test_ready_on_first_price_and_balances(self):
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.pools import Pool
+        from chainflip.exchange.stream import ChainflipUpdates
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.market_maker.startup import StartupOrchestrator
+        from chainflip.testing.mock_node import MockChainflipNode
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=0.2) as node:
+            pool = Pool('ETH')
+            updates = ChainflipUpdates(node.lp_account)
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+
+            startup = StartupOrchestrator(timeout=5)
+            startup.start(pool.start_websocket('test', node.rpc_ws_url))
+            startup.start(updates.start_websocket(node.lp_ws_url))
+            startup.start(oms.get_asset_balances())
+            for readiness in (pool.readiness, updates.readiness, oms.readiness):
+                startup.require(readiness)
+            ready_after = await startup.run()
+
+            self.assertEqual(set(ready_after), {'ETH-USDC pool price', 'order fills', 'asset balances'})
+            self.assertLess(max(ready_after.values()), 2)
+            self.assertIsNotNone(pool.price)
+            for task in (pool._price_stream, updates._update_stream):
+                task.cancel()
+            await asyncio.gather(pool._price_stream, updates._update_stream, return_exceptions=True)
+
+    async def test_timeout_and_failure(self):
+        from chainflip.exchange.pools import Pool
+        from chainflip.market_maker.startup import StartupOrchestrator, StartupError
+        from chainflip.testing.mock_node import MockChainflipNode
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            pool = Pool('ETH')
+            startup = StartupOrchestrator(timeout=0.3)
+            startup.start(pool.start_websocket('test', node.rpc_ws_url, timeout=None))
+            startup.require(pool.readiness)
+            with self.assertRaises(StartupError) as error:
+                await startup.run()
+            self.assertEqual(error.exception.not_ready, ['ETH-USDC pool price'])
+            pool._price_stream.cancel()
+            await asyncio.gather(pool._price_stream, return_exceptions=True)
+
+        pool = Pool('ETH')
+        startup = StartupOrchestrator(timeout=5)
+        startup.start(pool.start_websocket('test', 'ws://localhost:1', timeout=None))
+        startup.require(pool.readiness)
+        with self.assertRaises(StartupError):
+            await startup.run()
@@ -0,0 +1,40 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestStrategySupervisor(IsolatedAsyncioTestCase):
+
+    async def test_failures_are_isolated_and_restarted(self):
+        from chainflip.market_maker.supervisor import StrategySupervisor
+        from chainflip.utils.clock import ManualClock
+
+        clock = ManualClock(0.0)
+        supervisor = StrategySupervisor(restart_delay=1, max_restarts=2, clock=clock)
+        runs = {'healthy': 0, 'flaky': 0, 'broken': 0}
+        cleaned_up = list()
+
+        async def quote(name: str):
+            runs[name] += 1
+            if name == 'broken' or (name == 'flaky' and runs[name] < 3):
+                raise ValueError(f'{name} run {runs[name]}')
+            while True:
+                await clock.sleep(1)
+
+        async def flat(error: Exception):
+            cleaned_up.append(str(error))
+
+        for name in runs:
+            supervisor.add(name, lambda name=name: quote(name), on_failure=flat)
+        task = asyncio.create_task(supervisor.run())
+        while clock.time() < 30:
+            await clock.sleep(1)
+
+        self.assertEqual(supervisor.running, {'healthy', 'flaky'})
+        self.assertEqual(runs, {'healthy': 1, 'flaky': 3, 'broken': 3})
+        self.assertEqual(supervisor.failures, {'healthy': 0, 'flaky': 2, 'broken': 3})
+        self.assertEqual(cleaned_up.count('broken run 1'), 1)
+        self.assertFalse(task.done())
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
@@ -0,0 +1,78 @@
+import json
+import tempfile
+
+from unittest import IsolatedAsyncioTestCase
+
+
+class TestTickToTradeTracing(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        import chainflip.utils.tracing as tracing
+        self.tracing = tracing
+        self.previous = tracing.get_tracer()
+        self.tracer = tracing.Tracer()
+        tracing.set_tracer(self.tracer)
+
+    def tearDown(self) -> None:
+        self.tracing.set_tracer(self.previous)
+
+    async def test_trace_from_price_update_to_fill(self):
+        import chainflip.utils.constants as CONSTANTS
+        from chainflip.exchange.api import ApiCall
+        from chainflip.exchange.stream import ChainflipUpdates
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.testing.mock_node import MockChainflipNode
+        from chainflip.utils.data_types import LimitOrder
+
+        async with MockChainflipNode(lp_port=0, rpc_port=0, block_time=None) as node:
+            oms = OMS('test', node.lp_account, api_calls=ApiCall('test', url=node.lp_url))
+            trace = self.tracer.start_trace('pool_price', pair='ETH-USDC')
+            order = LimitOrder(
+                amount=0.5, price=2100.0, base_asset='ETH', quote_asset='USDC', id='0x7', side=CONSTANTS.Side.SELL
+            )
+            with self.tracing.activate(trace):
+                await oms.create_new_limit_order(order)
+            self.assertIsNone(self.tracing.current_trace())
+
+            updates = ChainflipUpdates(node.lp_account)
+            await updates._process_websocket_message({
+                'block_number': 1,
+                'fills': [{'limit_order': {'lp': node.lp_account, 'id': 7}}]
+            })
+
+        stages = self.tracer.percentiles()
+        for stage in ('decision', 'submit_to_ack', 'tick_to_ack', 'ack_to_fill', 'tick_to_fill'):
+            self.assertEqual(stages[stage]['count'], 1)
+        self.assertGreaterEqual(stages['tick_to_fill']['p50'], stages['tick_to_ack']['p50'])
+
+        with tempfile.NamedTemporaryFile('r', suffix='.jsonl') as f:
+            self.assertEqual(self.tracer.export_spans(f.name), 5)
+            spans = [json.loads(line) for line in f]
+        self.assertEqual({span['trace_id'] for span in spans}, {trace.trace_id})
+        self.assertEqual(spans[0]['attributes']['pair'], 'ETH-USDC')
+
+    def test_stream_quote_cycles_get_their_own_trace(self):
+        from chainflip.exchange.api import ApiCall
+        from chainflip.market_maker.order_management import OMS
+        from chainflip.market_maker.pool_handler import ChainflipPools
+        from chainflip.strategy.stream_prices import StrategyStream
+
+        pools = ChainflipPools('test')
+        pools.add_pool('ETH', 'USDC')
+        strategy = StrategyStream('test', 'ETH', dict(), OMS('test', 'test', api_calls=ApiCall('test')), pools)
+        self.assertEqual(strategy._start_quote_cycle().attributes, {'pair': 'ETH-USDC'})
+
+        tick = self.tracer.start_trace('pool_price', pair='ETH-USDC')
+        pools.pools['ETH-USDC']._trace = tick
+        first, second = strategy._start_quote_cycle(), strategy._start_quote_cycle()
+        self.assertNotEqual(first.trace_id, second.trace_id)
+        self.assertNotEqual(first.trace_id, tick.trace_id)
+        self.assertEqual((first.origin, first.attributes['tick_trace_id']), ('quote_cycle', tick.trace_id))
+        self.assertGreaterEqual(second.attributes['tick_age'], first.attributes['tick_age'])
+
+    def test_disabled_tracer(self):
+        tracer = self.tracing.Tracer(enabled=False)
+        trace = tracer.start_trace('pool_price')
+        self.assertIsNone(trace)
+        tracer.record(trace, 'ingress', 0.0)
+        self.assertEqual(tracer.percentiles(), {})